@@ -1,37 +1,109 @@
-from .analysis import Analysis, AnalysesHub
+from .analysis import Analysis, AnalysesHub, default_analyses
+from ..misc.autoimport import lazy_import_attributes
 from ..misc.ux import deprecated
 
 def register_analysis(cls, name):
     AnalysesHub.register_default(name, cls)
 
-from .cfg import CFGFast, CFGEmulated, CFG, CFGArchOptions, CFGFastSoot
-from .cdg import CDG
-from .ddg import DDG
-from .vfg import VFG
-from .boyscout import BoyScout
-#from .girlscout import GirlScout
-from .backward_slice import BackwardSlice
-from .veritesting import Veritesting
-from .vsa_ddg import VSA_DDG
-from .bindiff import BinDiff
-from .loopfinder import LoopFinder
-from .congruency_check import CongruencyCheck
-from .static_hooker import StaticHooker
-from .reassembler import Reassembler
-from .binary_optimizer import BinaryOptimizer
-from .disassembly import Disassembly
-from .variable_recovery import VariableRecovery, VariableRecoveryFast
-from .identifier import Identifier
-from .callee_cleanup_finder import CalleeCleanupFinder
-from .reaching_definitions import ReachingDefinitionsAnalysis
-from .calling_convention import CallingConventionAnalysis
-from .code_tagging import CodeTagging
-from .stack_pointer_tracker import StackPointerTracker
-from .dominance_frontier import DominanceFrontier
-from .decompiler import Decompiler
-from .soot_class_hierarchy import SootClassHierarchy
-from .propagator import PropagatorAnalysis
-from .xrefs import XRefsAnalysis
-from .init_finder import InitializationFinder
-from .complete_calling_conventions import CompleteCallingConventionsAnalysis
-from .typehoon import Typehoon
+# analyses are imported the first time they are used, either through the analyses hub of a project or as attributes of
+# this package
+
+# analysis name -> the submodule that registers it
+_ANALYSIS_MODULES = {
+    'CFGFast': 'cfg',
+    'CFGEmulated': 'cfg',
+    'CFG': 'cfg',
+    'CFB': 'cfg',
+    'CFBlanket': 'cfg',
+    'CFGFastSoot': 'cfg',
+    'CDG': 'cdg',
+    'DDG': 'ddg',
+    'VFG': 'vfg',
+    'BoyScout': 'boyscout',
+    'BackwardSlice': 'backward_slice',
+    'Veritesting': 'veritesting',
+    'VSA_DDG': 'vsa_ddg',
+    'BinDiff': 'bindiff',
+    'LoopFinder': 'loopfinder',
+    'CongruencyCheck': 'congruency_check',
+    'StaticHooker': 'static_hooker',
+    'Reassembler': 'reassembler',
+    'BinaryOptimizer': 'binary_optimizer',
+    'Disassembly': 'disassembly',
+    'VariableRecovery': 'variable_recovery',
+    'VariableRecoveryFast': 'variable_recovery',
+    'Identifier': 'identifier',
+    'CalleeCleanupFinder': 'callee_cleanup_finder',
+    'ReachingDefinitions': 'reaching_definitions',
+    'CallingConvention': 'calling_convention',
+    'CodeTagging': 'code_tagging',
+    'StackPointerTracker': 'stack_pointer_tracker',
+    'DominanceFrontier': 'dominance_frontier',
+    'Decompiler': 'decompiler',
+    'Clinic': 'decompiler',
+    'AILBlockSimplifier': 'decompiler',
+    'AILCallSiteMaker': 'decompiler',
+    'AILSimplifier': 'decompiler',
+    'StructuredCodeGenerator': 'decompiler',
+    'Structurer': 'decompiler',
+    'RecursiveStructurer': 'decompiler',
+    'RegionIdentifier': 'decompiler',
+    'RegionSimplifier': 'decompiler',
+    'StackCanarySimplifier': 'decompiler',
+    'BasePointerSaveSimplifier': 'decompiler',
+    'MultiSimplifier': 'decompiler',
+    'DivSimplifier': 'decompiler',
+    'ModSimplifier': 'decompiler',
+    'EagerReturnsSimplifier': 'decompiler',
+    'ConstantDereferencesSimplifier': 'decompiler',
+    'SootClassHierarchy': 'soot_class_hierarchy',
+    'Propagator': 'propagator',
+    'XRefs': 'xrefs',
+    'InitializationFinder': 'init_finder',
+    'InitFinder': 'init_finder',
+    'CompleteCallingConventions': 'complete_calling_conventions',
+    'Typehoon': 'typehoon',
+}
+
+for _name, _module in _ANALYSIS_MODULES.items():
+    default_analyses.add_lazy_plugin(_name, "%s.%s" % (__name__, _module))
+del _name, _module
+
+# attribute name -> the submodule that defines it
+lazy_import_attributes(__name__, {
+    'CFGFast': 'cfg',
+    'CFGEmulated': 'cfg',
+    'CFG': 'cfg',
+    'CFGArchOptions': 'cfg',
+    'CFGFastSoot': 'cfg',
+    'CDG': 'cdg',
+    'DDG': 'ddg',
+    'VFG': 'vfg',
+    'BoyScout': 'boyscout',
+    'BackwardSlice': 'backward_slice',
+    'Veritesting': 'veritesting',
+    'VSA_DDG': 'vsa_ddg',
+    'BinDiff': 'bindiff',
+    'LoopFinder': 'loopfinder',
+    'CongruencyCheck': 'congruency_check',
+    'StaticHooker': 'static_hooker',
+    'Reassembler': 'reassembler',
+    'BinaryOptimizer': 'binary_optimizer',
+    'Disassembly': 'disassembly',
+    'VariableRecovery': 'variable_recovery',
+    'VariableRecoveryFast': 'variable_recovery',
+    'Identifier': 'identifier',
+    'CalleeCleanupFinder': 'callee_cleanup_finder',
+    'ReachingDefinitionsAnalysis': 'reaching_definitions',
+    'CallingConventionAnalysis': 'calling_convention',
+    'CodeTagging': 'code_tagging',
+    'StackPointerTracker': 'stack_pointer_tracker',
+    'DominanceFrontier': 'dominance_frontier',
+    'Decompiler': 'decompiler',
+    'SootClassHierarchy': 'soot_class_hierarchy',
+    'PropagatorAnalysis': 'propagator',
+    'XRefsAnalysis': 'xrefs',
+    'InitializationFinder': 'init_finder',
+    'CompleteCallingConventionsAnalysis': 'complete_calling_conventions',
+    'Typehoon': 'typehoon',
+})
@@ -1,5 +1,6 @@
 import sys
 import contextlib
+import importlib
 from collections import defaultdict
 from inspect import Signature
 import progressbar
@@ -231,5 +232,45 @@ class Analysis:
         return '<%s Analysis Result at %#x>' % (self._name, id(self))
 
 
-default_analyses = VendorPreset()
+class AnalysesPreset(VendorPreset):
+    """
+    A preset of analyses, some of which may not be imported yet. The module of such an analysis is imported the first
+    time that the analysis is requested, and is expected to register the analysis with the default preset.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lazy_plugins = { }  # analysis name -> module name
+
+    def add_lazy_plugin(self, name, module_name):
+        """
+        Add an analysis that is registered by a module that is not imported yet.
+
+        :param str name:        Name of the analysis.
+        :param str module_name: Absolute name of the module that registers the analysis when it is imported.
+        """
+        if name not in self._default_plugins:
+            self._lazy_plugins[name] = module_name
+
+    def list_default_plugins(self):
+        return set(self._default_plugins) | set(self._lazy_plugins)
+
+    def request_plugin(self, name):
+        module_name = self._lazy_plugins.get(name, None)
+        if module_name is not None:
+            if name not in self._default_plugins:
+                importlib.import_module(module_name)
+                if name not in self._default_plugins and name in default_analyses._default_plugins:
+                    # this is a copy of the default preset, and the analysis registered itself with the original
+                    self._default_plugins[name] = default_analyses._default_plugins[name]
+            del self._lazy_plugins[name]
+        return super().request_plugin(name)
+
+    def copy(self):
+        result = super().copy()
+        result._lazy_plugins = dict(self._lazy_plugins)
+        return result
+
+
+default_analyses = AnalysesPreset()
 AnalysesHub.register_preset('default', default_analyses)
@@ -1830,7 +1830,8 @@ class CFGEmulated(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-metho
             # remove all existing jobs that has the same block ID
             if next((en for en in self.jobs if en.block_id == pw.block_id), None):
                 # TODO: this is very hackish. Reimplement this logic later
-                self._job_info_queue = [entry for entry in self._job_info_queue if entry.job.block_id != pw.block_id]
+                for entry in [ entry for entry in self._job_info_queue if entry.job.block_id == pw.block_id ]:
+                    self._job_info_queue.remove(entry)
 
         # register the job
         self._register_analysis_job(pw.func_addr, pw)
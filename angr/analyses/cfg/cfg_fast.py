@@ -1,6 +1,8 @@
+import bisect
 import itertools
 import logging
 import math
+import multiprocessing
 import re
 import string
 from typing import List, Optional
@@ -23,6 +25,7 @@ from ...errors import (AngrCFGError, AngrSkipJobNotice, AngrUnsupportedSyscallEr
                        SimTranslationError, SimValueError, SimOperationError, SimError, SimIRSBNoDecodeError,
                        )
 from ...utils.constants import DEFAULT_STATEMENT
+from ...engines.vex import VEXLifter
 from ..forward_analysis import ForwardAnalysis
 from .cfg_arch_options import CFGArchOptions
 from .cfg_base import CFGBase
@@ -31,6 +34,15 @@ from .segment_list import SegmentList
 
 VEX_IRSB_MAX_SIZE = 400
 
+# The CFGFast instance that forked block-lifting workers operate on. Only set in the parent process while a worker pool
+# is alive.
+_PARALLEL_LIFTING_CFG = None
+
+
+def _lift_function_blocks_worker(args):
+    func_addrs, all_func_addrs, max_blocks = args
+    return _PARALLEL_LIFTING_CFG._lift_function_blocks(func_addrs, all_func_addrs, max_blocks)
+
 
 l = logging.getLogger(name=__name__)
 
@@ -428,6 +440,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
     tag = "CFGFast"
 
+    # the maximum number of blocks that worker processes may lift ahead of time
+    MAX_PREFETCHED_BLOCKS = 100000
+
     def __init__(self,
                  binary=None,
                  objects=None,
@@ -459,6 +474,8 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
                  use_patches=False,
                  elf_eh_frame=True,
                  exceptions=True,
+                 workers=None,
+                 dirty_regions=None,
                  start=None,  # deprecated
                  end=None,  # deprecated
                  collect_data_references=None, # deprecated
@@ -504,6 +521,15 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
         :param bool detect_tail_calls:  Enable aggressive tail-call optimization detection.
         :param bool elf_eh_frame:       Retrieve function starts (and maybe sizes later) from the .eh_frame of ELF
                                         binaries.
+        :param int workers:             Number of worker processes that lift the blocks of all known function starts
+                                        (from symbols, .eh_frame, and function prologues) in parallel before CFG
+                                        recovery starts. Graph recovery itself always happens in the current process.
+                                        Requires the "fork" start method of multiprocessing.
+        :param iterable dirty_regions:  A list of tuples in the form of (start address, end address) describing memory
+                                        regions that have changed (e.g. patched or hooked) since `model` was
+                                        generated. When specified, CFGFast updates `model` in place: only functions
+                                        overlapping with dirty regions, and whatever their new edges reach, are
+                                        re-lifted and re-scanned.
         :param int start:               (Deprecated) The beginning address of CFG recovery.
         :param int end:                 (Deprecated) The end address of CFG recovery.
         :param CFGArchOptions arch_options: Architecture-specific options.
@@ -614,6 +640,14 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
         self._collect_data_ref = data_references or self._cross_references
 
         self._use_patches = use_patches
+        self._workers = workers
+
+        if dirty_regions is not None:
+            if model is None:
+                raise AngrCFGError('"dirty_regions" can only be used together with an existing CFG "model".')
+            # the complete scan of the original analysis already covered all regions that are not dirty
+            self._force_complete_scan = False
+        self._dirty_regions = list(dirty_regions) if dirty_regions is not None else None
 
         self._arch_options = arch_options if arch_options is not None else CFGArchOptions(
                 self.project.arch, **extra_arch_options)
@@ -652,6 +686,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
         self._function_returns = None
         self._function_exits = None
         self._gp_value: Optional[int] = None
+        # IRSBs (without statements) lifted ahead of time by worker processes, and the size limits they were lifted with,
+        # keyed by block address
+        self._prefetched_irsbs = { }
 
         # A mapping between address and the actual data in memory
         # self._memory_data = { }
@@ -978,8 +1015,14 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
     def _pre_analysis(self):
 
-        # Call _initialize_cfg() before self.functions is used.
-        self._initialize_cfg()
+        if self._dirty_regions is not None:
+            # functions that do not overlap with any dirty region are kept
+            functions = self.kb.functions
+            self._initialize_cfg()
+            self.kb.functions = functions
+        else:
+            # Call _initialize_cfg() before self.functions is used.
+            self._initialize_cfg()
 
         # Scan for __x86_return_thunk and friends
         self._known_thunks = self._find_thunks()
@@ -1011,23 +1054,31 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
         starting_points = set()
 
-        # clear all existing functions
-        self.kb.functions.clear()
+        if self._dirty_regions is not None:
+            # only re-scan functions that overlap with dirty regions
+            starting_points, edge_jobs = self._invalidate_dirty_regions()
+            for job in edge_jobs:
+                self._insert_job(job)
+                self._register_analysis_job(job.func_addr, job)
+
+        else:
+            # clear all existing functions
+            self.kb.functions.clear()
 
-        if self._use_symbols:
-            starting_points |= self._function_addresses_from_symbols
+            if self._use_symbols:
+                starting_points |= self._function_addresses_from_symbols
 
-        if self._use_elf_eh_frame:
-            starting_points |= self._function_addresses_from_eh_frame
+            if self._use_elf_eh_frame:
+                starting_points |= self._function_addresses_from_eh_frame
 
-        if self._extra_function_starts:
-            starting_points |= set(self._extra_function_starts)
+            if self._extra_function_starts:
+                starting_points |= set(self._extra_function_starts)
 
         # Sort it
         starting_points = sorted(list(starting_points), reverse=False)
 
-        if self._start_at_entry and self.project.entry is not None and self._inside_regions(self.project.entry) and \
-                self.project.entry not in starting_points:
+        if self._dirty_regions is None and self._start_at_entry and self.project.entry is not None and \
+                self._inside_regions(self.project.entry) and self.project.entry not in starting_points:
             # make sure self.project.entry is inserted
             starting_points = [ self.project.entry ] + starting_points
 
@@ -1048,6 +1099,88 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
             # make function_prologue_addrs a set for faster lookups
             self._function_prologue_addrs = set(self._function_prologue_addrs)
 
+        if self._workers is not None and self._workers > 1:
+            func_addrs = set(starting_points)
+            if self._function_prologue_addrs:
+                func_addrs |= self._function_prologue_addrs
+            self._lift_functions_in_parallel(sorted(func_addrs))
+
+    def _invalidate_dirty_regions(self):
+        """
+        Remove all functions that overlap with any dirty region from the existing CFG model and the function manager,
+        and mark the remaining code as traced so that it will not be scanned again.
+
+        :return:    A tuple of (a set of addresses of removed functions, a list of CFGJobs that restore edges from
+                    remaining nodes to the removed functions).
+        :rtype:     tuple
+        """
+
+        dirty_regions = sorted(self._dirty_regions)
+
+        def _is_dirty(addr, size):
+            addr = get_real_address_if_arm(self.project.arch, addr)
+            return any(start < addr + max(size, 1) and addr < end for start, end in dirty_regions)
+
+        dirty_func_addrs = set()
+        for node in self._nodes.values():
+            if _is_dirty(node.addr, node.size):
+                dirty_func_addrs.add(node.function_address)
+
+        removed_nodes = [ node for node in self._nodes.values() if node.function_address in dirty_func_addrs ]
+        removed_nodes_set = set(removed_nodes)
+
+        # edges from remaining nodes into removed functions are restored by re-scanning their destinations
+        edge_jobs = [ ]
+        for node in removed_nodes:
+            if node not in self.graph:
+                continue
+            for src, _, data in self.graph.in_edges(node, data=True):
+                if src in removed_nodes_set:
+                    continue
+                jumpkind = data.get('jumpkind', 'Ijk_Boring')
+                if jumpkind == 'Ijk_Ret':
+                    # return edges are re-created by _make_return_edges()
+                    continue
+                edge_jobs.append(CFGJob(node.addr, node.function_address, jumpkind,
+                                        src_node=src,
+                                        src_ins_addr=data.get('ins_addr', None),
+                                        src_stmt_idx=data.get('stmt_idx', None),
+                                        ))
+
+        for node in removed_nodes:
+            if node in self.graph:
+                self.graph.remove_node(node)
+            self._nodes.pop(node.block_id, None)
+            nodes = self._nodes_by_addr.get(node.addr, None)
+            if nodes is not None:
+                if node in nodes:
+                    nodes.remove(node)
+                if not nodes:
+                    del self._nodes_by_addr[node.addr]
+            self.model.jump_tables.pop(node.addr, None)
+            for ins_addr in node.instruction_addrs:
+                self.model.insn_addr_to_memory_data.pop(ins_addr, None)
+
+        for addr in list(self.model.memory_data):
+            if _is_dirty(addr, self.model.memory_data[addr].size or 1):
+                del self.model.memory_data[addr]
+
+        for func_addr in dirty_func_addrs:
+            if func_addr in self.kb.functions:
+                del self.kb.functions[func_addr]
+
+        # all remaining nodes are considered as traced
+        for node in self._nodes.values():
+            real_addr = get_real_address_if_arm(self.project.arch, node.addr)
+            self._traced_addresses.add(real_addr)
+            if node.size:
+                self._seg_list.occupy(real_addr, node.size, "code")
+
+        l.debug("Invalidated %d functions (%d nodes) that overlap with dirty regions.", len(dirty_func_addrs),
+                len(removed_nodes))
+
+        return dirty_func_addrs, edge_jobs
+
     def _pre_job_handling(self, job):  # pylint:disable=arguments-differ
         """
         Some pre job-processing tasks, like update progress bar.
@@ -1216,6 +1349,9 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
     def _post_analysis(self):
 
+        # prefetched blocks that are never used
+        self._prefetched_irsbs.clear()
+
         self._make_completed_functions()
 
         if self._normalize:
@@ -3532,7 +3668,11 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
             lifted_block = None
             try:
                 lifted_block = self._lift(addr, size=distance, collect_data_refs=True, strict_block_end=True)
-                irsb = lifted_block.vex_nostmt
+                irsb, irsb_limit = self._prefetched_irsbs.pop(addr, (None, None))
+                if irsb is not None and self._prefetched_irsb_matches(irsb, irsb_limit, distance):
+                    lifted_block._vex_nostmt = irsb  # pylint:disable=protected-access
+                else:
+                    irsb = lifted_block.vex_nostmt
                 irsb_string = lifted_block.bytes[:irsb.size]
             except SimTranslationError:
                 nodecode = True
@@ -3738,6 +3878,167 @@ class CFGFast(ForwardAnalysis, CFGBase):    # pylint: disable=abstract-method
 
         return result
 
+    def _may_prefetch_blocks(self):
+        if self._use_patches or self._base_state is not None:
+            # bytes do not come from the loader memory. let _lift() handle them
+            return False
+        return isinstance(self.project.factory.default_engine, VEXLifter)
+
+    def _lift_functions_in_parallel(self, func_addrs):
+        """
+        Lift all blocks that are reachable from each function start without following calls, using a pool of forked
+        worker processes. Lifted blocks are stored in self._prefetched_irsbs and are consumed by _generate_cfgnode().
+
+        :param list func_addrs: A sorted list of function starting addresses.
+        :return:                None
+        """
+
+        global _PARALLEL_LIFTING_CFG  # pylint:disable=global-statement
+
+        if not func_addrs or not self._may_prefetch_blocks():
+            return
+        try:
+            ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            l.warning('Parallel block lifting requires the "fork" start method, which is unavailable on this platform. '
+                      'Blocks will be lifted in the current process.')
+            return
+
+        # contiguous chunks keep neighboring functions (which often share blocks) in the same worker, and having more
+        # chunks than workers balances the load
+        chunk_size = max(1, math.ceil(len(func_addrs) / (self._workers * 8)))
+        chunks = [ func_addrs[i:i + chunk_size] for i in range(0, len(func_addrs), chunk_size) ]
+
+        # each worker lifts at most its share of the blocks that may be kept
+        max_blocks_per_chunk = max(1, self.MAX_PREFETCHED_BLOCKS // len(chunks))
+
+        _PARALLEL_LIFTING_CFG = self
+        try:
+            with ctx.Pool(processes=self._workers) as pool:
+                for lifted in pool.imap_unordered(_lift_function_blocks_worker,
+                                                  [ (chunk, func_addrs, max_blocks_per_chunk) for chunk in chunks ]):
+                    for addr, irsb_and_limit in lifted.items():
+                        if len(self._prefetched_irsbs) >= self.MAX_PREFETCHED_BLOCKS:
+                            break
+                        if addr not in self._prefetched_irsbs:
+                            self._prefetched_irsbs[addr] = irsb_and_limit
+        except Exception:  # pylint:disable=broad-except
+            l.warning("Parallel block lifting failed. Blocks will be lifted in the current process.", exc_info=True)
+        finally:
+            _PARALLEL_LIFTING_CFG = None
+
+        l.debug("Lifted %d blocks from %d functions in %d worker processes.", len(self._prefetched_irsbs),
+                len(func_addrs), self._workers)
+
+    def _lift_function_blocks(self, func_addrs, all_func_addrs, max_blocks, max_blocks_per_function=10000):
+        """
+        Lift all blocks that are reachable from each function start through direct jumps, branches, and call
+        fall-through edges. This runs inside worker processes.
+
+        Blocks are lifted with the same size limit that _generate_cfgnode() computes from the sections and the known
+        function starts, so that the scan can use them without lifting them again.
+
+        :param list func_addrs:             Function starting addresses.
+        :param list all_func_addrs:         A sorted list of all known function starting addresses.
+        :param int max_blocks:              The maximum number of blocks to lift.
+        :param int max_blocks_per_function: The maximum number of blocks to lift for each function.
+        :return:                            A dict of block addresses to tuples of IRSBs (without statements) and the
+                                            size limits they were lifted with.
+        :rtype:                             dict
+        """
+
+        engine = self.project.factory.default_engine
+        clemory = self.project.loader.memory
+        extra_stop_points = set(self._known_thunks)
+
+        lifted = { }
+        for func_addr in func_addrs:
+            stack = [ func_addr ]
+            block_count = 0
+            while stack and block_count < max_blocks_per_function and len(lifted) < max_blocks:
+                addr = stack.pop()
+                if addr in lifted or not self._inside_regions(addr):
+                    continue
+                if self.project.is_hooked(addr) or self.project.simos.is_syscall_addr(addr):
+                    continue
+                size = self._static_block_size_limit(addr, all_func_addrs)
+                if size is not None and size <= 0:
+                    continue
+                try:
+                    irsb = engine.lift_vex(addr=addr, clemory=clemory, size=size,
+                                           extra_stop_points=extra_stop_points,
+                                           opt_level=1, cross_insn_opt=False, strict_block_end=True,
+                                           collect_data_refs=True, skip_stmts=True)
+                except SimEngineError:
+                    continue
+                lifted[addr] = irsb, size
+                block_count += 1
+
+                if irsb.size == 0 or irsb.jumpkind == 'Ijk_NoDecode':
+                    continue
+                for _, _, exit_stmt in irsb.exit_statements:
+                    stack.append(exit_stmt.dst.value)
+                if irsb.jumpkind == 'Ijk_Boring':
+                    if irsb.default_exit_target is not None:
+                        stack.append(irsb.default_exit_target)
+                elif irsb.jumpkind == 'Ijk_Call' or irsb.jumpkind.startswith('Ijk_Sys'):
+                    # do not follow calls into other functions. only the fall-through successor
+                    stack.append(addr + irsb.size)
+        return lifted
+
+    @staticmethod
+    def _prefetched_irsb_matches(irsb, irsb_limit, distance):
+        """
+        Check if a block that a worker process lifted with the size limit `irsb_limit` is identical to the block that
+        would be lifted now with the size limit `distance`.
+
+        Workers stop blocks at all function starts that are known before the scan, including the ones found by matching
+        function prologues, while the scan only stops blocks at the functions that it has created so far. A block that
+        was cut at the limit of the worker may therefore be shorter than the block that the scan lifts.
+
+        :param pyvex.IRSB irsb:     The prefetched IRSB.
+        :param int irsb_limit:      The size limit that the IRSB was lifted with, or None if there was no limit.
+        :param int distance:        The size limit of the block that would be lifted now, or None if there is no limit.
+        :return:                    True if the prefetched IRSB can be used instead.
+        :rtype:                     bool
+        """
+
+        if irsb_limit == distance:
+            return True
+        if distance is not None and irsb.size > distance:
+            return False
+        # the block ended before the limit of the worker, so it was not cut short
+        return irsb_limit is None or irsb.size < irsb_limit
+
+    def _static_block_size_limit(self, addr, func_addrs):
+        """
+        Compute the maximum size of a block from the end of its section and the next function start, the same way as
+        _generate_cfgnode() does before any new functions are found.
+
+        :param int addr:        Address of the block.
+        :param list func_addrs: A sorted list of function starting addresses.
+        :return:                The maximum size, or None if there is no limit.
+        :rtype:                 int or None
+        """
+
+        real_addr = get_real_address_if_arm(self.project.arch, addr)
+        distance = None
+
+        obj = self.project.loader.find_object_containing(addr, membership_check=False)
+        if obj:
+            section = obj.find_section_containing(addr)
+            if section is not None:
+                distance = min(section.vaddr + section.memsize - real_addr, VEX_IRSB_MAX_SIZE)
+
+        i = bisect.bisect_right(func_addrs, addr)
+        if i < len(func_addrs):
+            next_func_addr = func_addrs[i] & (~1) if is_arm_arch(self.project.arch) else func_addrs[i]
+            distance_to_func = next_func_addr - real_addr
+            if distance_to_func != 0:
+                distance = distance_to_func if distance is None else min(distance, distance_to_func)
+
+        return distance
+
     def _lift(self, addr, *args, opt_level=1, cross_insn_opt=False, **kwargs): # pylint:disable=arguments-differ
         kwargs['extra_stop_points'] = set(self._known_thunks)
         if self._use_patches:
@@ -131,12 +131,14 @@ class CFGUtils:
         # find all strongly connected components in the graph
         sccs = [ scc for scc in networkx.strongly_connected_components(graph) if len(scc) > 1 ]
 
+        node_to_scc_index = { n: i for i, scc in enumerate(sccs) for n in scc }
+
         # collapse all strongly connected components
         for src, dst in graph.edges():
-            scc_index = CFGUtils._components_index_node(sccs, src)
+            scc_index = node_to_scc_index.get(src, None)
             if scc_index is not None:
                 src = SCCPlaceholder(scc_index)
-            scc_index = CFGUtils._components_index_node(sccs, dst)
+            scc_index = node_to_scc_index.get(dst, None)
             if scc_index is not None:
                 dst = SCCPlaceholder(scc_index)
 
@@ -1,5 +1,12 @@
-from typing import Optional
+from typing import Optional, Dict, List
+from collections import defaultdict
+import io
 import logging
+import multiprocessing
+import pickle
+import weakref
+
+import networkx
 
 from ..knowledge_plugins.cfg import CFGModel
 from ..analyses.cfg import CFGUtils
@@ -7,19 +14,103 @@ from . import Analysis, register_analysis
 
 _l = logging.getLogger(name=__name__)
 
+# the analysis that a worker process analyzes functions for. it is inherited from the parent process when forking.
+_worker_analysis = None
+
+
+def _init_worker(analysis_ref):
+    global _worker_analysis  # pylint:disable=global-statement
+    _worker_analysis = analysis_ref()
+
+
+class _KBPickler(pickle.Pickler):
+    """
+    A pickler that does not serialize the project or the variable manager of the knowledge base. Both sides of the pool
+    have them already.
+    """
+    def __init__(self, analysis, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.analysis = analysis
+
+    def persistent_id(self, obj):
+        if obj is self.analysis.project:
+            return "project"
+        if obj is self.analysis.kb.variables:
+            return "variables"
+        return None
+
+
+class _KBUnpickler(pickle.Unpickler):
+    def __init__(self, analysis, file):
+        super().__init__(file)
+        self.analysis = analysis
+
+    def persistent_load(self, pid):
+        if pid == "project":
+            return self.analysis.project
+        if pid == "variables":
+            return self.analysis.kb.variables
+        raise pickle.UnpicklingError("Unsupported persistent ID %r." % pid)
+
+
+def _analyze_batch(batch):
+    """
+    Analyze a batch of groups of functions in a worker process.
+
+    :param list batch:  A list of (function addresses, calling conventions of callees) tuples. Functions in the same group
+                        are analyzed in order.
+    :return:            A serialized list of (results, global variable manager) tuples, one for each group. results is a
+                        list of (function address, calling convention, variable manager of the function) tuples.
+    """
+    analysis = _worker_analysis
+    kb = analysis.kb
+    out = [ ]
+    for func_addrs, callee_ccs in batch:
+        for addr, cc in callee_ccs.items():
+            if kb.functions.contains_addr(addr):
+                kb.functions.get_by_addr(addr).calling_convention = cc
+        if analysis._recover_variables:
+            # start from an empty global variable manager, so that only new global variables are sent back
+            del kb.variables['global']
+
+        results = [ ]
+        for addr in func_addrs:
+            cc = analysis._analyze_function(kb.functions.get_by_addr(addr))
+            manager = kb.variables.function_managers.get(addr, None) if analysis._recover_variables else None
+            results.append((addr, cc, manager))
+        out.append((results, kb.variables['global'] if analysis._recover_variables else None))
+
+    f = io.BytesIO()
+    _KBPickler(analysis, f).dump(out)
+    return f.getvalue()
+
 
 class CompleteCallingConventionsAnalysis(Analysis):
 
     def __init__(self, recover_variables=False, low_priority=False, force=False, cfg: Optional[CFGModel]=None,
-                 analyze_callsites: bool=False):
+                 analyze_callsites: bool=False, workers: Optional[int]=None):
+        """
+        :param recover_variables:   Run VariableRecoveryFast on functions before determining their calling conventions.
+        :param low_priority:        Release the GIL regularly.
+        :param force:               Determine calling conventions of functions that already have one.
+        :param cfg:                 The CFG model to use.
+        :param analyze_callsites:   Analyze call sites of functions as well.
+        :param workers:             Number of worker processes to analyze independent functions in. Functions are
+                                    analyzed in this process if it is None or 1, or if processes cannot be forked on
+                                    this platform.
+        """
 
         self._recover_variables = recover_variables
         self._low_priority = low_priority
         self._force = force
         self._cfg = cfg
         self._analyze_callsites = analyze_callsites
+        self._workers = workers
 
-        self._analyze()
+        if workers is not None and workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            self._analyze_parallel()
+        else:
+            self._analyze()
 
     def _analyze(self):
         """
@@ -42,25 +133,123 @@ class CompleteCallingConventionsAnalysis(Analysis):
                     # skil all alignments
                     continue
 
-                # if it's a normal function, we attempt to perform variable recovery
-                if self._recover_variables and self.function_needs_variable_recovery(func):
-                    _l.info("Performing variable recovery on %r...", func)
-                    _ = self.project.analyses.VariableRecoveryFast(func, kb=self.kb, low_priority=self._low_priority)
-
-                # determine the calling convention of each function
-                cc_analysis = self.project.analyses.CallingConvention(func, cfg=self._cfg,
-                                                                      analyze_callsites=self._analyze_callsites)
-                if cc_analysis.cc is not None:
-                    _l.info("Determined calling convention for %r.", func)
-                    func.calling_convention = cc_analysis.cc
-                else:
-                    _l.info("Cannot determine calling convention for %r.", func)
+                self._analyze_function(func)
 
             percentage = (idx + 1) / total_funcs * 100.0
             self._update_progress(percentage)
             if self._low_priority:
                 self._release_gil(idx, 1, 0.000001)
 
+    def _analyze_function(self, func):
+        """
+        Determine the calling convention of a function, after recovering its variables if necessary.
+
+        :return:    The calling convention, or None if it cannot be determined.
+        """
+
+        # if it's a normal function, we attempt to perform variable recovery
+        if self._recover_variables and self.function_needs_variable_recovery(func):
+            _l.info("Performing variable recovery on %r...", func)
+            _ = self.project.analyses.VariableRecoveryFast(func, kb=self.kb, low_priority=self._low_priority)
+
+        # determine the calling convention of each function
+        cc_analysis = self.project.analyses.CallingConvention(func, cfg=self._cfg,
+                                                              analyze_callsites=self._analyze_callsites)
+        if cc_analysis.cc is not None:
+            _l.info("Determined calling convention for %r.", func)
+            func.calling_convention = cc_analysis.cc
+        else:
+            _l.info("Cannot determine calling convention for %r.", func)
+        return cc_analysis.cc
+
+    def _analyze_parallel(self):
+        """
+        Infer calling conventions for all functions in the current project, in worker processes.
+
+        Strongly connected components of the call graph are grouped into wavefronts: a component is in wavefront 0 if
+        it calls no functions outside of itself, and otherwise in the wavefront after the last wavefront of its
+        callees. Components in the same wavefront do not depend on each other, and are analyzed concurrently. Functions
+        in the same component are analyzed in the same order as `_analyze` does.
+
+        Worker processes are forked once, and inherit the project and the knowledge base. Calling conventions that are
+        determined in earlier wavefronts are sent along with the functions that call them, and calling conventions and
+        variables that are determined in workers are merged into the knowledge base of this process.
+        """
+
+        callgraph = self.kb.functions.callgraph
+        sorted_funcs = CFGUtils.quasi_topological_sort_nodes(callgraph)
+        order = { addr: idx for idx, addr in enumerate(reversed(sorted_funcs)) }
+        total_funcs = len(sorted_funcs)
+
+        self._update_progress(0)
+
+        components = networkx.condensation(networkx.DiGraph(callgraph))
+        wavefront_of = { }
+        wavefronts: Dict[int,List[int]] = defaultdict(list)
+        for component in reversed(list(networkx.topological_sort(components))):
+            wavefront = max((wavefront_of[succ] + 1 for succ in components.successors(component)), default=0)
+            wavefront_of[component] = wavefront
+            wavefronts[wavefront].append(component)
+
+        ctx = multiprocessing.get_context('fork')
+        pool = ctx.Pool(self._workers, initializer=_init_worker, initargs=(weakref.ref(self), ))
+        determined = { }  # function address -> calling conventions determined in this run
+        done = 0
+        try:
+            for wavefront in range(len(wavefronts)):
+                groups = [ ]
+                for component in wavefronts[wavefront]:
+                    members = sorted(components.nodes[component]['members'], key=lambda addr: order.get(addr, 0))
+                    done += len(members)
+                    func_addrs = [ ]
+                    for addr in members:
+                        func = self.kb.functions.get_by_addr(addr)
+                        if (func.calling_convention is None or self._force) and not func.alignment:
+                            func_addrs.append(addr)
+                    if not func_addrs:
+                        continue
+                    callee_ccs = { }
+                    for addr in func_addrs:
+                        for callee in callgraph.successors(addr):
+                            if callee in determined:
+                                callee_ccs[callee] = determined[callee]
+                    groups.append((func_addrs, callee_ccs))
+
+                if len(groups) == 1:
+                    # not worth a round trip to a worker
+                    for addr in groups[0][0]:
+                        cc = self._analyze_function(self.kb.functions.get_by_addr(addr))
+                        if cc is not None:
+                            determined[addr] = cc
+                else:
+                    # a few batches per worker, so that large components do not stall the entire wavefront
+                    batch_size = max(1, len(groups) // (self._workers * 4))
+                    pending = [ pool.apply_async(_analyze_batch, (groups[i:i + batch_size], ))
+                                for i in range(0, len(groups), batch_size) ]
+                    for p in pending:
+                        for results, global_manager in _KBUnpickler(self, io.BytesIO(p.get())).load():
+                            self._merge_results(results, global_manager, determined)
+
+                self._update_progress(done / total_funcs * 100.0)
+                if self._low_priority:
+                    self._release_gil(wavefront, 1, 0.000001)
+        finally:
+            pool.terminate()
+
+    def _merge_results(self, results, global_manager, determined):
+        """
+        Merge the results of a group of functions that are analyzed in a worker process into the knowledge base.
+        """
+
+        if global_manager is not None:
+            self.kb.variables['global'].merge_global_variables(global_manager)
+        for addr, cc, manager in results:
+            if manager is not None:
+                self.kb.variables.function_managers[addr] = manager
+            if cc is not None:
+                self.kb.functions.get_by_addr(addr).calling_convention = cc
+                determined[addr] = cc
+
     #
     # Static methods
     #
@@ -48,7 +48,7 @@ class AILSimplifier(Analysis):
         """
         Find variables that are definitely equivalent and then eliminate the unnecessary copies.
         """
-        prop = self.project.analyses.Propagator(func=self.func, func_graph=self.func_graph)
+        prop = self.project.analyses.Propagator(func=self.func, func_graph=self.func_graph, sparse=True)
         if not prop.equivalence:
             return
 
@@ -145,7 +145,7 @@ class AILSimplifier(Analysis):
             if (func()) ...
         """
 
-        prop = self.project.analyses.Propagator(func=self.func, func_graph=self.func_graph)
+        prop = self.project.analyses.Propagator(func=self.func, func_graph=self.func_graph, sparse=True)
         if not prop.equivalence:
             return
 
@@ -6,7 +6,7 @@ from ...errors import AngrForwardAnalysisError
 from ...errors import AngrSkipJobNotice, AngrDelayJobNotice, AngrJobMergingFailureNotice, AngrJobWideningFailureNotice
 
 
-from .job_info import JobInfo
+from .job_info import JobInfo, JobInfoQueue
 
 class ForwardAnalysis:
     """
@@ -29,7 +29,7 @@ class ForwardAnalysis:
     """
 
     def __init__(self, order_jobs=False, allow_merging=False, allow_widening=False, status_callback=None,
-                 graph_visitor=None
+                 graph_visitor=None, allow_loop_head_widening=False
                  ):
         """
         Constructor
@@ -39,12 +39,16 @@ class ForwardAnalysis:
         :param bool allow_widening: If job widening is allowed.
         :param graph_visitor:       A graph visitor to provide successors.
         :type graph_visitor:        GraphVisitor or None
+        :param bool allow_loop_head_widening:   If input states should be widened with _widen_states() instead of merged
+                                                at the widening points of the graph visitor (loop heads, by default).
+                                                Only used when a graph visitor is provided.
         :return: None
         """
 
         self._order_jobs = order_jobs
         self._allow_merging = allow_merging
         self._allow_widening = allow_widening
+        self._allow_loop_head_widening = allow_loop_head_widening
         self._status_callback = status_callback
         self._graph_visitor = graph_visitor
 
@@ -56,7 +60,7 @@ class ForwardAnalysis:
         self._should_abort = False
 
         # All remaining jobs
-        self._job_info_queue = [ ]
+        self._job_info_queue = JobInfoQueue(key=self._job_sorting_key if order_jobs else None)
 
         # A map between job key to job. Jobs with the same key will be merged by calling _merge_jobs()
         self._job_map = { }
@@ -271,7 +275,10 @@ class ForwardAnalysis:
         for succ in successors:
             if succ in self._state_map:
                 to_merge = [ self._state_map[succ], input_state ]
-                r = self._merge_states(succ, *to_merge)
+                if self._allow_loop_head_widening and self._graph_visitor.is_widening_point(succ):
+                    r = self._widen_states(*to_merge)
+                else:
+                    r = self._merge_states(succ, *to_merge)
                 if type(r) is tuple and len(r) == 2:
                     merged_state, reached_fixedpoint = r
                 else:
@@ -356,14 +363,16 @@ class ForwardAnalysis:
                 continue
             except AngrSkipJobNotice:
                 # consume and skip this job
-                self._job_info_queue = self._job_info_queue[1:]
+                if job_info in self._job_info_queue:
+                    self._job_info_queue.remove(job_info)
                 self._job_map.pop(self._job_key(job_info.job), None)
                 continue
 
             # remove the job info from the map
             self._job_map.pop(self._job_key(job_info.job), None)
 
-            self._job_info_queue = self._job_info_queue[1:]
+            if job_info in self._job_info_queue:
+                self._job_info_queue.remove(job_info)
 
             self._process_job_and_get_successors(job_info)
 
@@ -451,11 +460,7 @@ class ForwardAnalysis:
             job_info = JobInfo(key, job)
             self._job_map[key] = job_info
 
-        if self._order_jobs:
-            self._binary_insert(self._job_info_queue, job_info, lambda elem: self._job_sorting_key(elem.job))
-
-        else:
-            self._job_info_queue.append(job_info)
+        self._job_info_queue.append(job_info)
 
     def _peek_job(self, pos):
         """
@@ -497,9 +502,10 @@ class ForwardAnalysis:
         if hi is None:
             hi = len(lst)
 
+        elem_key = key(elem)
         while lo < hi:
             mid = (lo + hi) // 2
-            if key(lst[mid]) < key(elem):
+            if key(lst[mid]) < elem_key:
                 lo = mid + 1
             else:
                 hi = mid
@@ -1,3 +1,6 @@
+import heapq
+
+
 class JobInfo:
     """
     Stores information of each job.
@@ -56,3 +59,110 @@ class JobInfo:
         elif widened:
             job_type = 'widened'
         self.jobs.append((job, job_type))
+
+
+class JobInfoQueue:
+    """
+    A queue of JobInfo instances, kept in a heap. Without a sort key, job infos are popped in the order they are
+    appended. With a sort key, job infos are popped by the sort keys of their jobs, and job infos with equal keys are
+    popped in the reverse order they are appended.
+
+    Removal is lazy: removed job infos stay in the heap, marked as removed, until they reach the top or until the heap
+    is compacted.
+    """
+
+    __slots__ = ('_heap', '_entries', '_counter', '_key', '_removed', )
+
+    def __init__(self, key=None):
+        """
+        :param key: A function that takes a job and returns its sort key, or None to keep the queue first-in-first-out.
+        """
+
+        self._heap = [ ]
+        # id(job_info) -> its entry in the heap. job infos are compared by their keys, not by their identities.
+        self._entries = { }
+        self._counter = 0
+        self._key = key
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, job_info):
+        return id(job_info) in self._entries
+
+    def __iter__(self):
+        """
+        Iterate over all job infos in the order they will be popped. It takes O(n log n) time.
+        """
+
+        for entry in sorted(self._entries.values()):
+            yield entry[-1]
+
+    def __getitem__(self, pos):
+        if pos == 0:
+            self._prune()
+            if self._heap:
+                return self._heap[0][-1]
+            raise IndexError('The job queue is empty.')
+        return list(self)[pos]
+
+    def append(self, job_info):
+        """
+        Add a job info to the queue. If it is already in the queue, it is moved to its new position.
+
+        :param JobInfo job_info: The job info to add.
+        :return:                 None
+        """
+
+        if id(job_info) in self._entries:
+            self.remove(job_info)
+
+        self._counter += 1
+        if self._key is None:
+            entry = [ self._counter, job_info ]
+        else:
+            entry = [ self._key(job_info.job), -self._counter, job_info ]
+        self._entries[id(job_info)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def pop(self):
+        """
+        Remove the first job info from the queue and return it.
+
+        :return: The first job info.
+        :rtype:  JobInfo
+        """
+
+        self._prune()
+        if not self._heap:
+            raise IndexError('The job queue is empty.')
+        job_info = heapq.heappop(self._heap)[-1]
+        del self._entries[id(job_info)]
+        return job_info
+
+    def remove(self, job_info):
+        """
+        Remove a job info from the queue. A ValueError is raised if it is not in the queue.
+
+        :param JobInfo job_info: The job info to remove.
+        :return:                 None
+        """
+
+        try:
+            entry = self._entries.pop(id(job_info))
+        except KeyError:
+            raise ValueError('%r is not in the job queue.' % job_info) from None
+        entry[-1] = None
+        self._removed += 1
+
+        if self._removed > len(self._entries):
+            # more than half of the heap is removed entries
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+            self._removed = 0
+
+    def _prune(self):
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+            self._removed -= 1
@@ -1,4 +1,4 @@
-from claripy.utils.orderedset import OrderedSet
+import heapq
 
 from ....misc.ux import deprecated
 
@@ -7,11 +7,17 @@ class GraphVisitor:
     """
     A graph visitor takes a node in the graph and returns its successors. Typically it visits a control flow graph, and
     returns successors of a CFGNode each time. This is the base class of all graph visitors.
+
+    Nodes that are waiting to be visited are kept in a heap, ordered by their positions in `sort_nodes()`, so that a
+    node is always visited after the nodes that come before it in the traversal order.
     """
     def __init__(self):
-        self._sorted_nodes = OrderedSet()
+        # a heap of (index, node) tuples, and the nodes in it
+        self._worklist = [ ]
+        self._pending_nodes = set()
         self._node_to_index = { }
         self._reached_fixedpoint = set()
+        self._widening_points = set()
 
     #
     # Interfaces
@@ -50,6 +56,19 @@ class GraphVisitor:
 
         raise NotImplementedError()
 
+    def find_widening_points(self):
+        """
+        Get the nodes where abstract states should be widened instead of merged. By default, these are all loop heads,
+        i.e. nodes that have a predecessor that does not come before them in the traversal order. Predecessors that are
+        not traversed at all (e.g. outside of the loop that a LoopVisitor visits) do not make a node a loop head.
+
+        :return:    A set of nodes.
+        :rtype:     set
+        """
+
+        return { n for n, i in self._node_to_index.items()
+                 if any(self._node_to_index.get(pred, -1) >= i for pred in self.predecessors(n)) }
+
     #
     # Public methods
     #
@@ -81,13 +100,18 @@ class GraphVisitor:
         :return: None
         """
 
-        self._sorted_nodes.clear()
+        self._worklist = [ ]
+        self._pending_nodes.clear()
         self._node_to_index.clear()
         self._reached_fixedpoint.clear()
 
         for i, n in enumerate(self.sort_nodes()):
             self._node_to_index[n] = i
-            self._sorted_nodes.add(n)
+            # a sorted list is a valid heap
+            self._worklist.append((i, n))
+            self._pending_nodes.add(n)
+
+        self._widening_points = self.find_widening_points()
 
     def next_node(self):
         """
@@ -96,10 +120,31 @@ class GraphVisitor:
         :return: A node in the graph.
         """
 
-        if not self._sorted_nodes:
+        if not self._worklist:
             return None
 
-        return self._sorted_nodes.pop(last=False)
+        _, node = heapq.heappop(self._worklist)
+        self._pending_nodes.discard(node)
+        return node
+
+    def is_widening_point(self, node):
+        """
+        Check if abstract states should be widened at a node.
+
+        :param node:    A node in the graph.
+        :return:        True if the node is a widening point, False otherwise.
+        :rtype:         bool
+        """
+
+        return node in self._widening_points
+
+    @property
+    def widening_points(self):
+        return self._widening_points
+
+    @widening_points.setter
+    def widening_points(self, nodes):
+        self._widening_points = set(nodes)
 
     def all_successors(self, node, skip_reached_fixedpoint=False):
         """
@@ -134,12 +179,10 @@ class GraphVisitor:
         successors = self.successors(node) #, skip_reached_fixedpoint=True)
 
         if include_self:
-            self._sorted_nodes.add(node)
+            self._push_node(node)
 
         for succ in successors:
-            self._sorted_nodes.add(succ)
-
-        self._sorted_nodes = OrderedSet(sorted(self._sorted_nodes, key=lambda n: self._node_to_index[n]))
+            self._push_node(succ)
 
     def revisit_node(self, node):
         """
@@ -149,8 +192,7 @@ class GraphVisitor:
         :return:        None
         """
 
-        self._sorted_nodes.add(node)
-        self._sorted_nodes = OrderedSet(sorted(self._sorted_nodes, key=lambda n: self._node_to_index[n]))
+        self._push_node(node)
 
     def reached_fixedpoint(self, node):
         """
@@ -161,3 +203,19 @@ class GraphVisitor:
         """
 
         self._reached_fixedpoint.add(node)
+
+    #
+    # Private methods
+    #
+
+    def _push_node(self, node):
+        """
+        Add a node to the worklist, unless it is already waiting to be visited.
+
+        :param node:    The node to visit in the future.
+        :return:        None
+        """
+
+        if node not in self._pending_nodes:
+            self._pending_nodes.add(node)
+            heapq.heappush(self._worklist, (self._node_to_index[node], node))
@@ -22,6 +22,7 @@ class LoopVisitor(GraphVisitor):
         sorted_nodes = CFGUtils.quasi_topological_sort_nodes(self.loop.graph)
 
         if nodes is not None:
-            sorted_nodes = [ n for n in sorted_nodes if n in set(nodes) ]
+            nodes = set(nodes)
+            sorted_nodes = [ n for n in sorted_nodes if n in nodes ]
 
         return sorted_nodes
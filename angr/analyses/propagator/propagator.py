@@ -18,6 +18,22 @@ from .engine_ail import SimEnginePropagatorAIL
 _l = logging.getLogger(name=__name__)
 
 
+def _same_value(v0, v1):
+    # Top.__eq__ is truthy for anything; treat Top as equal only to Top (of the same size)
+    if type(v0) is Top or type(v1) is Top:
+        return type(v0) is type(v1) and v0.size == v1.size
+    return v0 == v1
+
+
+def _same_values(d0, d1):
+    if len(d0) != len(d1):
+        return False
+    for k, v in d0.items():
+        if k not in d1 or not _same_value(v, d1[k]):
+            return False
+    return True
+
+
 # The base state
 
 class PropagatorState:
@@ -56,6 +72,28 @@ class PropagatorState:
 
         return state
 
+    def equals(self, other) -> bool:
+        """
+        Check if another state holds the same values, replacements, and equivalences as this state.
+
+        :param other:   The other state.
+        :return:        True if both states are the same, False otherwise.
+        """
+        if type(other) is not type(self):
+            return False
+        # _prop_count is not compared. it grows every time a block propagates a non-constant expression, so states of
+        # such blocks inside loops would never be equal. it does not affect successors: merge() keeps the counts of the
+        # input state that a successor already has, and discards the counts of the output state that is merged into it.
+        if self._equivalence != other._equivalence:
+            return False
+        if len(self._replacements) != len(other._replacements):
+            return False
+        for loc, vars_ in self._replacements.items():
+            other_vars = other._replacements.get(loc, None)
+            if other_vars is None or (vars_ is not other_vars and not _same_values(vars_, other_vars)):
+                return False
+        return True
+
     def add_replacement(self, codeloc, old, new):
         """
         Add a replacement record: Replacing expression `old` with `new` at program location `codeloc`.
@@ -119,6 +157,11 @@ class PropagatorVEXState(PropagatorState):
 
         return state
 
+    def equals(self, other) -> bool:
+        return super().equals(other) and \
+               _same_values(self.registers, other.registers) and \
+               _same_values(self.local_variables, other.local_variables)
+
     def store_local_variable(self, offset, size, value):  # pylint:disable=unused-argument
         # TODO: Handle size
         self.local_variables[offset] = value
@@ -209,6 +252,12 @@ class PropagatorAILState(PropagatorState):
 
         return state
 
+    def equals(self, other) -> bool:
+        # tmps are dropped when the state is passed on to successors, so they are not compared
+        return super().equals(other) and \
+               self._registers == other._registers and \
+               self._stack_variables == other._stack_variables
+
     def store_variable(self, old, new):
         if old is None or new is None:
             return
@@ -318,10 +367,15 @@ class PropagatorAnalysis(ForwardAnalysis, Analysis):  # pylint:disable=abstract-
 
     - Loading values from a known address
     - Writing values to a stack variable
+
+    In sparse mode, successors of a block are only revisited when the output state of the block changes, instead of
+    after every visit of the block until it reaches `max_iterations`. Blocks whose input states do not change are not
+    analyzed again.
     """
 
     def __init__(self, func=None, block=None, func_graph=None, base_state=None, max_iterations=3,
-                 load_callback=None, stack_pointer_tracker=None, only_consts=False, completed_funcs=None):
+                 load_callback=None, stack_pointer_tracker=None, only_consts=False, completed_funcs=None,
+                 sparse=False):
         if func is not None:
             if block is not None:
                 raise ValueError('You cannot specify both "func" and "block".')
@@ -343,6 +397,7 @@ class PropagatorAnalysis(ForwardAnalysis, Analysis):  # pylint:disable=abstract-
         self._stack_pointer_tracker = stack_pointer_tracker  # only used when analyzing AIL functions
         self._only_consts = only_consts
         self._completed_funcs = completed_funcs
+        self._sparse = sparse
 
         self._node_iterations = defaultdict(int)
         self._states = {}
@@ -404,6 +459,7 @@ class PropagatorAnalysis(ForwardAnalysis, Analysis):  # pylint:disable=abstract-
         state.filter_replacements()
 
         self._node_iterations[block_key] += 1
+        prev_state = self._states.get(block_key, None)
         self._states[block_key] = state
 
         if self.replacements is None:
@@ -415,6 +471,10 @@ class PropagatorAnalysis(ForwardAnalysis, Analysis):  # pylint:disable=abstract-
 
         # TODO: Clear registers according to calling conventions
 
+        if self._sparse and prev_state is not None and state.equals(prev_state):
+            # successors have seen this state already
+            return False, state
+
         if self._node_iterations[block_key] < self._max_iterations:
             return True, state
         else:
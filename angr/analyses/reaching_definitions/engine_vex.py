@@ -1,4 +1,6 @@
 from typing import Optional, Iterable, Set, Union, TYPE_CHECKING
+import functools
+import inspect
 import logging
 
 import pyvex
@@ -25,6 +27,16 @@ if TYPE_CHECKING:
 l = logging.getLogger(name=__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _accepts_src_codeloc(handler_cls) -> bool:
+    """
+    Check if handle_local_function() of a function handler class takes the `src_codeloc` argument. Handlers that were
+    written before it was added do not.
+    """
+    params = inspect.signature(handler_cls.handle_local_function).parameters
+    return 'src_codeloc' in params or any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values())
+
+
 class SimEngineRDVEX(
     SimEngineLightVEXMixin,
     SimEngineLight,
@@ -579,6 +591,9 @@ class SimEngineRDVEX(
             handler_name = 'handle_local_function'
             if hasattr(self._function_handler, handler_name):
                 codeloc = CodeLocation(func_addr_int, 0, None, func_addr_int, context=self._context)
+                kwargs = { }
+                if _accepts_src_codeloc(type(self._function_handler)):
+                    kwargs['src_codeloc'] = self._codeloc()
                 executed_rda, state, visited_blocks, dep_graph = getattr(self._function_handler, handler_name)(
                     self.state,
                     func_addr_int,
@@ -588,6 +603,7 @@ class SimEngineRDVEX(
                     self._dep_graph,
                     src_ins_addr=self.ins_addr,
                     codeloc=codeloc,
+                    **kwargs
                 )
                 if executed_rda:
                     # update everything
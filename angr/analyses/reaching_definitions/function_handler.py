@@ -1,10 +1,24 @@
-from typing import TYPE_CHECKING, List, Set, Optional
+from typing import TYPE_CHECKING, Dict, List, Set, Optional
 from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from ...calling_conventions import DEFAULT_CC, SimCC, SimRegArg
+from ...engines.light import SpOffset
+from ...knowledge_plugins.key_definitions import FunctionSummary
+from ...knowledge_plugins.key_definitions.atoms import Atom, Register, MemoryLocation
+from ...knowledge_plugins.key_definitions.constants import OP_AFTER
+from ...knowledge_plugins.key_definitions.dataset import DataSet
+from ...knowledge_plugins.key_definitions.tag import ParameterTag, ReturnValueTag
+from ...knowledge_plugins.key_definitions.undefined import UNDEFINED
+from .external_codeloc import ExternalCodeLocation
+from .rd_state import ReachingDefinitionsState
+from .subject import Subject
 
 if TYPE_CHECKING:
     from angr.code_location import CodeLocation
+    from angr.knowledge_base import KnowledgeBase
+    from angr.knowledge_plugins.functions import Function
     from angr.analyses.reaching_definitions.dep_graph import DepGraph
-    from angr.analyses.reaching_definitions.rd_state import ReachingDefinitionsState
 
 
 class FunctionHandler(ABC):
@@ -29,10 +43,10 @@ class FunctionHandler(ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    def handle_local_function(self, state: 'ReachingDefinitionsState', function_address: int, call_stack: List,
+    def handle_local_function(self, state: ReachingDefinitionsState, function_address: int, call_stack: List,
                               maximum_local_call_depth: int, visited_blocks: Set[int], dep_graph: 'DepGraph',
                               src_ins_addr: Optional[int]=None,
-                              codeloc: Optional['CodeLocation']=None):
+                              codeloc: Optional['CodeLocation']=None, src_codeloc: Optional['CodeLocation']=None):
         """
         :param state: The state at the entry of the function, i.e. the function's input state.
         :param function_address: The address of the function to handle.
@@ -41,7 +55,196 @@ class FunctionHandler(ABC):
         :param visited_blocks: A set of the addresses of the previously visited blocks.
         :param dep_graph: A definition-use graph, where nodes represent definitions, and edges represent uses.
         :param codeloc: The code location of the call to the analysed function.
+        :param src_codeloc: The code location of the call site in the caller. It is only passed to handlers that
+                            accept it.
 
         :return Tuple[Boolean,LiveDefinitions,List<ailment.Block|Block|CodeNode|CFGNode>,DepGraph]:
         """
         raise NotImplementedError()
+
+
+class SummaryFunctionHandler(FunctionHandler):
+    """
+    A function handler that applies function summaries at calls to local functions, instead of analyzing the callees
+    again. Summaries are computed bottom-up, with this handler, the first time a function is called, and are cached in
+    the `defs` knowledge base plugin (see `KeyDefinitionManager.get_summary()`).
+
+    Calls to functions that cannot be summarized fall back to the calling convention of the callee. Subclass it and
+    implement `handle_<name>` methods to handle external functions.
+    """
+
+    def __init__(self):
+        # addresses and summaries of the callees that are applied in each function that is being summarized
+        self._callees_stack: List[Dict[int,FunctionSummary]] = [ ]
+
+    def hook(self, analysis):
+        return self
+
+    def handle_local_function(self, state: ReachingDefinitionsState, function_address: int, call_stack: List,
+                              maximum_local_call_depth: int, visited_blocks: Set[int], dep_graph: 'DepGraph',
+                              src_ins_addr: Optional[int]=None,
+                              codeloc: Optional['CodeLocation']=None, src_codeloc: Optional['CodeLocation']=None):
+        if src_codeloc is None:
+            return False, state, visited_blocks, dep_graph
+        summary = state.analysis.kb.defs.get_summary(function_address, function_handler=self)
+        if summary is None:
+            return False, state, visited_blocks, dep_graph
+
+        if self._callees_stack:
+            self._callees_stack[-1][function_address] = summary
+        self.apply_summary(state, summary, src_codeloc)
+        return True, state, visited_blocks, dep_graph
+
+    @staticmethod
+    def apply_summary(state: ReachingDefinitionsState, summary: FunctionSummary, codeloc: 'CodeLocation') -> None:
+        """
+        Apply the effect of a function to the state at a call to the function.
+
+        :param state:   The state at the call site. It is updated in place.
+        :param summary: The summary of the callee.
+        :param codeloc: The code location of the call site.
+        """
+        arch = state.arch
+
+        # the stack pointer of the callee at its entry is the stack pointer of the caller at the call site
+        sp_values = set()
+        for sp_def in state.register_definitions.get_objects_by_offset(arch.sp_offset):
+            sp_values |= sp_def.data.data
+        caller_sp = next(iter(sp_values)) if len(sp_values) == 1 else None
+        if not isinstance(caller_sp, SpOffset) or caller_sp.symbolic:
+            caller_sp = None
+
+        def rebase_atom(atom: Atom) -> Optional[Atom]:
+            if isinstance(atom, MemoryLocation) and isinstance(atom.addr, SpOffset):
+                if caller_sp is None:
+                    return None
+                return MemoryLocation(caller_sp + atom.addr.offset, atom.size)
+            return atom
+
+        def rebase_data(data: DataSet) -> DataSet:
+            values = set()
+            for v in data.data:
+                if isinstance(v, SpOffset) and not v.symbolic:
+                    values.add(caller_sp + v.offset if caller_sp is not None else UNDEFINED)
+                else:
+                    values.add(v)
+            return DataSet(values, data.bits)
+
+        for atom in summary.inputs:
+            atom = rebase_atom(atom)
+            if atom is None:
+                continue
+            param_tag = ParameterTag(function=summary.func_addr,
+                                     metadata={'tagged_by': 'SummaryFunctionHandler.apply_summary'})
+            for definition in state.get_definitions(atom):
+                definition.tags |= {param_tag}
+            state.add_use(atom, codeloc)
+
+        ret_reg_offset = None
+        if summary.cc is not None and isinstance(summary.cc.RETURN_VAL, SimRegArg):
+            ret_reg_offset = arch.registers[summary.cc.RETURN_VAL.reg_name][0]
+
+        for atom, (data, must_define) in summary.outputs.items():
+            atom = rebase_atom(atom)
+            if atom is None:
+                continue
+            tags = None
+            if isinstance(atom, Register) and atom.reg_offset in (ret_reg_offset, arch.sp_offset):
+                tags = {ReturnValueTag(function=summary.func_addr,
+                                       metadata={'tagged_by': 'SummaryFunctionHandler.apply_summary'})}
+            if must_define:
+                state.kill_and_add_definition(atom, codeloc, rebase_data(data), tags=tags)
+            else:
+                state.add_definition(atom, codeloc, rebase_data(data), tags=tags)
+
+    def summarize(self, kb: 'KnowledgeBase', func: 'Function', cc: Optional[SimCC],
+                  fingerprint: bytes) -> Optional[FunctionSummary]:
+        """
+        Analyze a function, with the summaries of its callees, and summarize its effect on reaching definitions.
+
+        :param kb:          The knowledge base that the function belongs to.
+        :param func:        The function to summarize.
+        :param cc:          The calling convention to analyze the function with.
+        :param fingerprint: A digest of the code of the function.
+        :return:            The summary, or None if the function never returns.
+        """
+        ret_addrs = { node.addr for node in func.ret_sites }
+        if not ret_addrs:
+            return None
+
+        project = kb._project
+        arch = project.arch
+        analysis_cc = cc
+        if analysis_cc is None and arch.name in DEFAULT_CC:
+            analysis_cc = DEFAULT_CC[arch.name](arch)
+
+        init_state = ReachingDefinitionsState(arch, Subject(func, cc=analysis_cc))
+        initial_definitions = init_state.register_definitions.get_all_variables() | \
+                              init_state.stack_definitions.get_all_variables()
+
+        self._callees_stack.append({ })
+        try:
+            rda = project.analyses.ReachingDefinitions(
+                subject=func,
+                cc=analysis_cc,
+                init_state=init_state,
+                function_handler=self,
+                observe_callback=lambda ob_type, **kwargs: ob_type == 'node' and kwargs['addr'] in ret_addrs and
+                                                           kwargs['op_type'] == OP_AFTER,
+                kb=kb,
+            )
+        finally:
+            callees = self._callees_stack.pop()
+
+        inputs = set()
+        for definition in initial_definitions:
+            if isinstance(definition.atom, Register) and definition.atom.reg_offset == arch.sp_offset:
+                continue
+            if rda.all_uses.get_uses(definition):
+                inputs.add(definition.atom)
+
+        # registers that the caller cannot rely on after the call. the others are preserved by the callee.
+        clobbered = { arch.sp_offset }
+        if analysis_cc is not None:
+            if isinstance(analysis_cc.RETURN_VAL, SimRegArg):
+                clobbered.add(arch.registers[analysis_cc.RETURN_VAL.reg_name][0])
+            for reg in analysis_cc.CALLER_SAVED_REGS or ():
+                clobbered.add(arch.registers[reg][0])
+
+        ret_states = [ rda.observed_results[('node', addr, OP_AFTER)] for addr in ret_addrs
+                       if ('node', addr, OP_AFTER) in rda.observed_results ]
+        if not ret_states:
+            return None
+
+        # for each atom: its data on all paths, and on how many paths it is defined by the function only
+        outputs_data: Dict[Atom,DataSet] = { }
+        outputs_defined: Dict[Atom,int] = defaultdict(int)
+        for live_defs in ret_states:
+            defined_here: Dict[Atom,bool] = { }
+            for region in (live_defs.register_definitions, live_defs.stack_definitions, live_defs.memory_definitions):
+                for definition in region.get_all_variables():
+                    atom = definition.atom
+                    if isinstance(atom, Register):
+                        if atom.reg_offset not in clobbered:
+                            continue
+                    elif isinstance(atom, MemoryLocation) and isinstance(atom.addr, SpOffset):
+                        # locals of the callee are dead once it returns
+                        if atom.addr.symbolic or atom.addr.offset < 0:
+                            continue
+                    external = isinstance(definition.codeloc, ExternalCodeLocation)
+                    if external and not (isinstance(atom, Register) and atom.reg_offset == arch.sp_offset):
+                        defined_here[atom] = False
+                        continue
+                    defined_here.setdefault(atom, True)
+                    if atom in outputs_data:
+                        outputs_data[atom] = DataSet(outputs_data[atom].data | definition.data.data,
+                                                     outputs_data[atom].bits)
+                    else:
+                        outputs_data[atom] = DataSet(set(definition.data.data), definition.data.bits)
+            for atom, must_define in defined_here.items():
+                if must_define:
+                    outputs_defined[atom] += 1
+
+        outputs = { atom: (data, outputs_defined[atom] == len(ret_states)) for atom, data in outputs_data.items() }
+
+        return FunctionSummary(func.addr, cc, inputs, outputs, fingerprint, callees=callees)
@@ -230,55 +230,73 @@ class ReachingDefinitionsState:
         definition = self.live_definitions.kill_and_add_definition(atom, code_loc, data, dummy=dummy, tags=tags)
 
         if definition is not None:
-            self.all_definitions.add(definition)
-
-            if self.dep_graph is not None:
-                stack_use = set(filter(
-                    lambda u: isinstance(u.atom, MemoryLocation) and u.atom.is_on_stack,
-                    self.codeloc_uses
-                ))
-
-                sp_offset = self.arch.sp_offset
-                bp_offset = self.arch.bp_offset
-
-                for used in self.codeloc_uses:
-                    # sp is always used as a stack pointer, and we do not track dependencies against stack pointers.
-                    # bp is sometimes used as a base pointer. we recognize such cases by checking if there is a use to
-                    # the stack variable.
-                    #
-                    # There are two cases for which it is superfluous to report a dependency on (a use of) stack/base
-                    # pointers:
-                    # - The `Definition` *uses* a `MemoryLocation` pointing to the stack;
-                    # - The `Definition` *is* a `MemoryLocation` pointing to the stack.
-                    is_using_spbp_while_memory_address_on_stack_is_used = (
-                        isinstance(used.atom, Register) and
-                        used.atom.reg_offset in (sp_offset, bp_offset) and
-                        len(stack_use) > 0
-                    )
-                    is_using_spbp_to_define_memory_location_on_stack = (
-                        isinstance(definition.atom, MemoryLocation) and
-                        definition.atom.is_on_stack and
-                        isinstance(used.atom, Register) and
-                        used.atom.reg_offset in (sp_offset, bp_offset)
-                    )
+            self._record_definition(definition)
+
+        return definition
+
+    def add_definition(self, atom: Atom, code_loc: CodeLocation, data: Optional[DataSet],
+                       dummy=False, tags: Set[Tag]=None) -> Optional[Definition]:
+        """
+        Add a definition without killing the existing definitions of the atom.
+        """
+        self._cycle(code_loc)
+
+        definition: Optional[Definition]
+        definition = self.live_definitions.add_definition(atom, code_loc, data, dummy=dummy, tags=tags)
 
-                    if not (
-                        is_using_spbp_while_memory_address_on_stack_is_used or
-                        is_using_spbp_to_define_memory_location_on_stack
-                    ):
-                        # Moderately confusing misnomers. This is an edge from a def to a use, since the
-                        # "uses" are actually the definitions that we're using and the "definition" is the
-                        # new definition; i.e. The def that the old def is used to construct so this is
-                        # really a graph where nodes are defs and edges are uses.
-                        self.dep_graph.add_edge(used, definition)
-                        self.dep_graph.add_dependencies_for_concrete_pointers_of(
-                            used,
-                            self.analysis.project.kb.cfgs['CFGFast'],
-                            self.analysis.project.loader
-                        )
+        if definition is not None:
+            self._record_definition(definition)
 
         return definition
 
+    def _record_definition(self, definition: Definition) -> None:
+        self.all_definitions.add(definition)
+
+        if self.dep_graph is not None:
+            stack_use = set(filter(
+                lambda u: isinstance(u.atom, MemoryLocation) and u.atom.is_on_stack,
+                self.codeloc_uses
+            ))
+
+            sp_offset = self.arch.sp_offset
+            bp_offset = self.arch.bp_offset
+
+            for used in self.codeloc_uses:
+                # sp is always used as a stack pointer, and we do not track dependencies against stack pointers.
+                # bp is sometimes used as a base pointer. we recognize such cases by checking if there is a use to
+                # the stack variable.
+                #
+                # There are two cases for which it is superfluous to report a dependency on (a use of) stack/base
+                # pointers:
+                # - The `Definition` *uses* a `MemoryLocation` pointing to the stack;
+                # - The `Definition` *is* a `MemoryLocation` pointing to the stack.
+                is_using_spbp_while_memory_address_on_stack_is_used = (
+                    isinstance(used.atom, Register) and
+                    used.atom.reg_offset in (sp_offset, bp_offset) and
+                    len(stack_use) > 0
+                )
+                is_using_spbp_to_define_memory_location_on_stack = (
+                    isinstance(definition.atom, MemoryLocation) and
+                    definition.atom.is_on_stack and
+                    isinstance(used.atom, Register) and
+                    used.atom.reg_offset in (sp_offset, bp_offset)
+                )
+
+                if not (
+                    is_using_spbp_while_memory_address_on_stack_is_used or
+                    is_using_spbp_to_define_memory_location_on_stack
+                ):
+                    # Moderately confusing misnomers. This is an edge from a def to a use, since the
+                    # "uses" are actually the definitions that we're using and the "definition" is the
+                    # new definition; i.e. The def that the old def is used to construct so this is
+                    # really a graph where nodes are defs and edges are uses.
+                    self.dep_graph.add_edge(used, definition)
+                    self.dep_graph.add_dependencies_for_concrete_pointers_of(
+                        used,
+                        self.analysis.project.kb.cfgs['CFGFast'],
+                        self.analysis.project.loader
+                    )
+
     def add_use(self, atom: Atom, code_loc) -> None:
         self._cycle(code_loc)
         self.codeloc_uses.update(self.get_definitions(atom))
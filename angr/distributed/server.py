@@ -8,6 +8,7 @@ import tempfile
 import multiprocessing
 
 from .worker import Worker
+from .work_stealing import PoolManager
 
 
 _l = logging.getLogger(__name__)
@@ -26,11 +27,20 @@ class Server:
     :ivar int staging_max:  Maximum number of inactive states that are kept into memory before spilled onto the disk
                             and potentially be picked up by another worker.
     :ivar bool bucketizer:  Use the Bucketizer exploration strategy.
+    :ivar str scheduler:    How spilled states are handed between workers. "db" spills every state into the spill
+                            yard and has workers poll the database for them. "work_stealing" hands batches of
+                            serialized states around through a WorkStealingPool in the server process, and only uses
+                            the database as a log.
+    :ivar int batch_size:   Number of spilled states a worker batches up before pushing them to the pool, in the
+                            work_stealing scheduler.
     :ivar _worker_exit_callback:    A method that will be called upon the exit of each worker.
     """
+
+    SCHEDULERS = ('db', 'work_stealing')
+
     def __init__(self, project, spill_yard=None, db=None, max_workers=None, max_states=10, staging_max=10,
                  bucketizer=True, recursion_limit=1000, worker_exit_callback=None, techniques=None, add_options=None,
-                 remove_options=None):
+                 remove_options=None, scheduler='db', batch_size=4):
 
         self.project = project
 
@@ -48,8 +58,13 @@ class Server:
         self.techniques = techniques
         self.add_options = add_options
         self.remove_options = remove_options
+        if scheduler not in self.SCHEDULERS:
+            raise ValueError("Unsupported scheduler %r. Must be one of %s." % (scheduler, ", ".join(self.SCHEDULERS)))
+        self.scheduler = scheduler
+        self.batch_size = batch_size
 
         self._recursion_limit = recursion_limit
+        self._pool = None
 
         self._worker_exit_args_lock = None
         self._worker_exit_args: Dict[int,Tuple] = None
@@ -71,6 +86,9 @@ class Server:
         self.max_workers = state['max_workers']
         self.staging_max = state['staging_max']
         self.bucketizer = state['bucketizer']
+        self.scheduler = state['scheduler']
+        self.batch_size = state['batch_size']
+        self._pool = state['_pool']
         self._worker_exit_args_lock = state['_worker_exit_args_lock']
         self._worker_exit_args = state['_worker_exit_args']
         self._stopped = state['_stopped']
@@ -85,6 +103,9 @@ class Server:
             'max_workers': self.max_workers,
             'staging_max': self.staging_max,
             'bucketizer': self.bucketizer,
+            'scheduler': self.scheduler,
+            'batch_size': self.batch_size,
+            '_pool': self._pool,
             '_worker_exit_args_lock': self._worker_exit_args_lock,
             '_worker_exit_args': self._worker_exit_args,
             '_stopped': self._stopped,
@@ -135,6 +156,18 @@ class Server:
     #
 
     def run(self):
+        if self.scheduler == 'work_stealing':
+            with PoolManager() as pool_manager:
+                self._pool = pool_manager.WorkStealingPool(self.max_workers)  # pylint:disable=no-member
+                try:
+                    self._run()
+                finally:
+                    _l.info("Work-stealing pool stats: %s", self._pool.stats())
+                    self._pool = None
+        else:
+            self._run()
+
+    def _run(self):
 
         # create workers
         with multiprocessing.Manager() as manager:
@@ -0,0 +1,197 @@
+from typing import Dict, List, Tuple
+import heapq
+import io
+import logging
+import pickle
+import threading
+import uuid
+from multiprocessing.managers import BaseManager
+
+from ..exploration_techniques.spiller import PickledStatesBase
+
+
+_l = logging.getLogger(__name__)
+
+
+class WorkStealingPool:
+    """
+    A pool of serialized states that lives in the server process, and is accessed by workers through a manager proxy.
+
+    Every worker owns a priority queue in the pool. Workers push batches of states into their own queue and pop from it
+    first. A worker whose queue is empty steals half of the largest queue of another worker. States with smaller
+    priority values are popped first.
+    """
+
+    def __init__(self, num_workers):
+        self._queues: List[List[Tuple[int,int,str,bytes]]] = [ [ ] for _ in range(num_workers) ]
+        self._lock = threading.Lock()
+        self._counter = 0  # breaks ties between states with the same priority, in FIFO order
+        self.pushed = 0
+        self.stolen = 0
+
+    def push(self, worker_id, batch):
+        """
+        Push a batch of states into the queue of a worker.
+
+        :param int worker_id:   ID of the worker.
+        :param list batch:      A list of (priority, state ID, serialized state) tuples.
+        :return:                None
+        """
+        with self._lock:
+            q = self._queues[worker_id]
+            for prio, sid, blob in batch:
+                heapq.heappush(q, (prio, self._counter, sid, blob))
+                self._counter += 1
+            self.pushed += len(batch)
+
+    def pop(self, worker_id, n):
+        """
+        Pop up to n states for a worker, stealing from other workers if its own queue is empty.
+
+        :param int worker_id:   ID of the worker.
+        :param int n:           The maximum number of states to pop.
+        :return:                A list of (priority, state ID, serialized state) tuples.
+        """
+        with self._lock:
+            q = self._queues[worker_id]
+            if not q:
+                self._steal(worker_id)
+            out = [ ]
+            while q and len(out) < n:
+                prio, _, sid, blob = heapq.heappop(q)
+                out.append((prio, sid, blob))
+            return out
+
+    def _steal(self, worker_id):
+        victim = max(self._queues, key=len)
+        if not victim:
+            return
+        # take the better half of the victim's states
+        count = (len(victim) + 1) // 2
+        loot = [ heapq.heappop(victim) for _ in range(count) ]
+        q = self._queues[worker_id]
+        for item in loot:
+            heapq.heappush(q, item)
+        self.stolen += count
+
+    def size(self):
+        with self._lock:
+            return sum(len(q) for q in self._queues)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': [ len(q) for q in self._queues ],
+                'pushed': self.pushed,
+                'stolen': self.stolen,
+            }
+
+
+class PoolManager(BaseManager):
+    """
+    A multiprocessing manager that hosts a WorkStealingPool.
+    """
+
+
+PoolManager.register('WorkStealingPool', WorkStealingPool)
+
+
+class ProjectPickler(pickle.Pickler):
+    """
+    A pickler that does not serialize the project. Every worker has its own copy of the same project already.
+    """
+    def __init__(self, project, file, *args, **kwargs):
+        super().__init__(file, *args, **kwargs)
+        self.project = project
+
+    def persistent_id(self, obj):
+        if obj is self.project:
+            return "project"
+        return None
+
+
+class ProjectUnpickler(pickle.Unpickler):
+    def __init__(self, project, file, *args, **kwargs):
+        super().__init__(file, *args, **kwargs)
+        self.project = project
+
+    def persistent_load(self, pid):
+        if pid == "project":
+            return self.project
+        raise pickle.UnpicklingError("Unsupported persistent ID %r." % pid)
+
+
+class WorkStealingStates(PickledStatesBase):
+    """
+    The worker-side view of a WorkStealingPool. It implements both the states collection interface and the vault
+    interface that Spiller uses, so it can be passed as both `states_collection` and `vault`.
+
+    Spilled states are kept in a local batch, which is served locally first and pushed to the pool once it is full.
+    States are serialized without the project. If a PickledStatesDb is provided, it is used as a log of pushed and
+    popped state IDs. It is written once per batch, not once per state.
+    """
+
+    def __init__(self, pool, worker_id, project, batch_size=4, log_db=None):
+        self.pool = pool
+        self.worker_id = worker_id
+        self.project = project
+        self.batch_size = batch_size
+        self.log_db = log_db
+
+        self._serialized: Dict[str,bytes] = { }
+        self._outgoing: List[Tuple[int,str,bytes]] = [ ]
+
+    #
+    # Vault interface
+    #
+
+    def store(self, state):
+        sid = "STATE-" + str(uuid.uuid4())
+        f = io.BytesIO()
+        ProjectPickler(self.project, f, protocol=pickle.HIGHEST_PROTOCOL).dump(state)
+        self._serialized[sid] = f.getvalue()
+        return sid
+
+    def load(self, sid):
+        blob = self._serialized.pop(sid)
+        return ProjectUnpickler(self.project, io.BytesIO(blob)).load()
+
+    #
+    # States collection interface
+    #
+
+    def sort(self):
+        pass
+
+    def add(self, prio, sid):
+        self._outgoing.append((prio, sid, self._serialized.pop(sid)))
+        if len(self._outgoing) >= self.batch_size:
+            self.flush()
+
+    def pop_n(self, n):
+        out = [ ]
+        if self._outgoing:
+            self._outgoing.sort(key=lambda item: item[0])
+            out, self._outgoing[:n] = self._outgoing[:n], [ ]
+        if len(out) < n:
+            popped = self.pool.pop(self.worker_id, n - len(out))
+            if self.log_db is not None and popped:
+                self.log_db.mark_taken([ sid for _, sid, _ in popped ])
+            out += popped
+
+        ss = [ ]
+        for prio, sid, blob in out:
+            self._serialized[sid] = blob
+            ss.append((prio, sid))
+        return ss
+
+    def flush(self):
+        """
+        Push all locally batched states to the pool, so other workers can take them.
+        """
+        if not self._outgoing:
+            return
+        batch, self._outgoing = self._outgoing, [ ]
+        self.pool.push(self.worker_id, batch)
+        if self.log_db is not None:
+            self.log_db.add_batch([ (prio, sid) for prio, sid, _ in batch ])
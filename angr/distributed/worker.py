@@ -7,6 +7,7 @@ import sys
 from ..exploration_techniques import ExplorationTechnique, Spiller, Bucketizer
 from ..exploration_techniques.spiller import PickledStatesDb
 from ..vaults import VaultDirShelf
+from .work_stealing import WorkStealingStates
 
 if TYPE_CHECKING:
     from .server import Server
@@ -58,6 +59,20 @@ class ExplorationStatusNotifier(ExplorationTechnique):
         return simgr
 
 
+class WorkStealingFlusher(ExplorationTechnique):
+    """
+    Push the states spilled during each step to the work-stealing pool, so that idle workers can take them.
+    """
+    def __init__(self, states: WorkStealingStates):
+        super().__init__()
+        self.states = states
+
+    def step(self, simgr, stash='active', **kwargs):
+        simgr = simgr.step(stash=stash, **kwargs)
+        self.states.flush()
+        return simgr
+
+
 class Worker:
     """
     Worker implements a worker thread/process for conducting a task.
@@ -95,6 +110,16 @@ class Worker:
         vault = VaultDirShelf(d=self.server.spill_yard)
         _l.debug("Worker %d creates db", self.worker_id)
         db = PickledStatesDb(db_str=self.server.db_str)
+        if self.server.scheduler == 'work_stealing':
+            # spilled states go through the pool. the database only logs them
+            stealing_states = WorkStealingStates(self.server._pool, self.worker_id, self.server.project,
+                                                 batch_size=self.server.batch_size, log_db=db)
+            spiller_vault, states_collection = stealing_states, stealing_states
+            idle_interval = 0.05
+        else:
+            stealing_states = None
+            spiller_vault, states_collection = vault, db
+            idle_interval = 1
         spiller = Spiller(
             max=self.server.max_states,
             staging_min=1,
@@ -102,12 +127,14 @@ class Worker:
             pickle_callback=self._pickle_state,
             post_pickle_callback=self._post_pickle_state,
             unpickle_callback=self._unpickle_state,
-            vault=vault,
-            states_collection=db,
+            vault=spiller_vault,
+            states_collection=states_collection,
             priority_key=self._state_priority,
         )
         simgr.use_technique(ExplorationStatusNotifier(self.server_state))
         simgr.use_technique(spiller)
+        if stealing_states is not None:
+            simgr.use_technique(WorkStealingFlusher(stealing_states))
         simgr.use_technique(BadStatesDropper(vault, db))
         if self._techniques is not None:
             for tech in self._techniques:
@@ -137,8 +164,8 @@ class Worker:
                     _, state_oid = popped[0]
                 else:
                     # oops no job available
-                    _l.info("Worker %d is waiting for jobs...", self.worker_id)
-                    time.sleep(1)
+                    _l.debug("Worker %d is waiting for jobs...", self.worker_id)
+                    time.sleep(idle_interval)
 
             if state_oid is None:
                 break
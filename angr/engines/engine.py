@@ -115,6 +115,16 @@ class SuccessorsMixin(SimEngine):
         :param force_addr:  Force execution to pretend that we're working at this concrete address
         :returns:           A SimSuccessors object categorizing the execution's successor states
         """
+        if o.PROFILE_STEPS in state.options and profiling.active_profiler() is None:
+            # the instrumentation is installed the first time, and stays installed. only the profiler is activated for
+            # each step
+            profiling.install()
+            profiling.default_profiler._activate()
+            try:
+                return self.process(state, *args, **kwargs)
+            finally:
+                profiling.default_profiler._deactivate()
+
         inline = kwargs.pop('inline', False)
         force_addr = kwargs.pop('force_addr', None)
 
@@ -137,7 +147,7 @@ class SuccessorsMixin(SimEngine):
         # nuance: make sure to copy from the PREVIOUS state to the CURRENT one
         # to avoid creating a dead link in the history, messing up the statehierarchy
         new_state.register_plugin('history', old_state.history.make_child())
-        new_state.history.recent_bbl_addrs.append(addr)
+        new_state.history.add_bbl_addr(addr)
         if new_state.arch.unicorn_support:
             new_state.scratch.executed_pages_set = {addr & ~0xFFF}
 
@@ -193,6 +203,7 @@ class SuccessorsMixin(SimEngine):
 
 
 from .. import sim_options as o
+from ..misc import profiling
 from ..state_plugins.inspect import BP_BEFORE, BP_AFTER
 from .successors import SimSuccessors
 from ..errors import SimException
@@ -0,0 +1,237 @@
+import os
+import mmap
+import struct
+import pickle
+import hashlib
+import logging
+
+l = logging.getLogger(name=__name__)
+
+
+class PersistentLiftCache:
+    """
+    A content-addressed, on-disk store of lifted IRSBs.
+
+    Entries are appended to a single data file per namespace (usually a hash of all loaded binaries), and the file is
+    memory-mapped for reading. Each record is laid out as
+
+        <20-byte key digest> <4-byte little-endian payload length> <pickled IRSB>
+
+    Appends are done with a single write() on a file opened in append mode, so several processes (e.g. forked workers)
+    can share the same store. Records appended by other processes are picked up lazily, by rescanning the file after
+    every REFRESH_INTERVAL misses.
+
+    The store stops growing once it reaches `max_size` bytes, and a store that is larger than that when it is opened is
+    started afresh.
+    """
+
+    RECORD_HEADER = struct.Struct("<20sI")
+    REFRESH_INTERVAL = 256
+    DEFAULT_MAX_SIZE = 1 << 30
+    HASH_CHUNK_SIZE = 1 << 20
+
+    def __init__(self, cache_dir, namespace, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self.max_size = max_size
+        self.path = os.path.join(cache_dir, namespace + ".liftcache")
+
+        self.hits = 0
+        self.misses = 0
+
+        self._index = { }  # key digest -> (payload offset, payload length)
+        self._scanned_size = 0
+        self._mmap = None
+        self._mapped_size = 0
+        self._file_size = 0
+        # refresh on the first miss
+        self._misses_since_refresh = self.REFRESH_INTERVAL
+        self._disabled = False
+
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > max_size:
+                # evict everything. replacing the file keeps existing mappings in other processes valid.
+                tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+                with open(tmp_path, "wb"):
+                    pass
+                os.replace(tmp_path, self.path)
+            # make sure the file exists so that it can be mapped
+            with open(self.path, "ab"):
+                pass
+            self._file_size = os.path.getsize(self.path)
+        except OSError:
+            l.warning("Cannot create the persistent lift cache at %s. It is disabled.", self.path, exc_info=True)
+            self._disabled = True
+
+    @staticmethod
+    def key_digest(key):
+        """
+        Convert a lifter cache key into a fixed-size digest.
+
+        :param tuple key:   The cache key. All elements must have a stable repr().
+        :return:            A 20-byte digest.
+        :rtype:             bytes
+        """
+        return hashlib.sha1(repr(key).encode("utf-8")).digest()
+
+    @staticmethod
+    def namespace_from_loader(loader):
+        """
+        Compute a namespace that identifies the exact contents and layout of all objects loaded by a loader.
+
+        :param cle.Loader loader:   The loader.
+        :return:                    A hex digest, or None if any of the objects cannot be identified.
+        :rtype:                     str or None
+        """
+        h = hashlib.sha256()
+        for obj in loader.all_objects:
+            digest = getattr(obj, 'sha256', None)
+            if digest is None:
+                if obj.binary is None:
+                    # extern objects, kernel objects, etc. do not have any code to lift
+                    h.update(repr((type(obj).__name__, obj.mapped_base)).encode("utf-8"))
+                    continue
+                try:
+                    file_hash = hashlib.sha256()
+                    with open(obj.binary, "rb") as f:
+                        for chunk in iter(lambda: f.read(PersistentLiftCache.HASH_CHUNK_SIZE), b""):
+                            file_hash.update(chunk)
+                    digest = file_hash.digest()
+                except (OSError, TypeError):
+                    return None
+            if isinstance(digest, str):
+                digest = digest.encode("utf-8")
+            h.update(digest)
+            h.update(repr((obj.mapped_base, obj.arch.name if obj.arch is not None else None)).encode("utf-8"))
+        return h.hexdigest()
+
+    #
+    # Public methods
+    #
+
+    def get(self, key):
+        """
+        Look up an IRSB.
+
+        :param tuple key:   The cache key.
+        :return:            The IRSB, or None if it is not in the cache.
+        """
+        if self._disabled:
+            return None
+
+        digest = self.key_digest(key)
+        loc = self._index.get(digest, None)
+        if loc is None and self._misses_since_refresh >= self.REFRESH_INTERVAL:
+            # other processes might have appended records since our last scan
+            self._refresh()
+            loc = self._index.get(digest, None)
+        if loc is None:
+            self._misses_since_refresh += 1
+            self.misses += 1
+            return None
+
+        offset, size = loc
+        if offset + size > self._mapped_size:
+            # the record was written by us after the file was last mapped
+            self._refresh()
+        try:
+            irsb = pickle.loads(self._mmap[offset:offset + size])
+        except Exception:  # pylint:disable=broad-except
+            l.warning("Corrupted record in the persistent lift cache %s.", self.path, exc_info=True)
+            del self._index[digest]
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return irsb
+
+    def put(self, key, irsb):
+        """
+        Store an IRSB.
+
+        :param tuple key:   The cache key.
+        :param irsb:        The IRSB to store.
+        :return:            None
+        """
+        if self._disabled:
+            return
+
+        digest = self.key_digest(key)
+        if digest in self._index or self._file_size >= self.max_size:
+            return
+
+        try:
+            payload = pickle.dumps(irsb, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:  # pylint:disable=broad-except
+            l.debug("Cannot pickle IRSB for key %r.", key, exc_info=True)
+            return
+
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                record = self.RECORD_HEADER.pack(digest, len(payload)) + payload
+                os.write(fd, record)
+                # appends are atomic, so our record ends where the file position is now
+                end = os.lseek(fd, 0, os.SEEK_CUR)
+            finally:
+                os.close(fd)
+        except OSError:
+            l.warning("Failed to write to the persistent lift cache %s. It is disabled.", self.path, exc_info=True)
+            self._disabled = True
+            return
+
+        self._index[digest] = (end - len(payload), len(payload))
+        self._file_size = max(self._file_size, end)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._mapped_size = 0
+
+    #
+    # Private methods
+    #
+
+    def _refresh(self):
+        """
+        Remap the data file if it has grown, and index all new records.
+        """
+        self._misses_since_refresh = 0
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            self._disabled = True
+            return
+        self._file_size = size
+        if size == self._mapped_size:
+            return
+
+        self.close()
+        if size == 0:
+            return
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        self._mapped_size = size
+
+        pos = self._scanned_size
+        header_size = self.RECORD_HEADER.size
+        while pos + header_size <= size:
+            digest, payload_size = self.RECORD_HEADER.unpack_from(self._mmap, pos)
+            if pos + header_size + payload_size > size:
+                # a partially written record. leave it for the next scan
+                break
+            self._index[digest] = (pos + header_size, payload_size)
+            pos += header_size + payload_size
+        self._scanned_size = pos
+
+    def __getstate__(self):
+        return {
+            'cache_dir': self.cache_dir,
+            'namespace': self.namespace,
+            'max_size': self.max_size,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state['cache_dir'], state['namespace'], max_size=state['max_size'])
@@ -10,6 +10,7 @@ import claripy
 from ..engine import SimEngineBase
 from ...state_plugins.inspect import BP_AFTER, BP_BEFORE, NO_OVERRIDE
 from ...misc.ux import once
+from .lift_cache import PersistentLiftCache
 from ...errors import SimEngineError, SimTranslationError, SimError
 from ... import sim_options as o
 
@@ -25,7 +26,8 @@ class VEXLifter(SimEngineBase):
                  default_opt_level=1,
                  support_selfmodifying_code=None,
                  single_step=False,
-                 default_strict_block_end=False, **kwargs):
+                 default_strict_block_end=False,
+                 persistent_cache_dir=None, **kwargs):
 
         super().__init__(project, **kwargs)
 
@@ -35,6 +37,7 @@ class VEXLifter(SimEngineBase):
         self._support_selfmodifying_code = support_selfmodifying_code
         self._single_step = single_step
         self.default_strict_block_end = default_strict_block_end
+        self._persistent_cache_dir = persistent_cache_dir
 
         if self._use_cache is None:
             if self.project is not None:
@@ -46,11 +49,15 @@ class VEXLifter(SimEngineBase):
                 self._support_selfmodifying_code = self.project._support_selfmodifying_code
             else:
                 self._support_selfmodifying_code = False
+        if self._persistent_cache_dir is None and self.project is not None:
+            self._persistent_cache_dir = getattr(self.project, '_translation_cache_dir', None)
 
         # block cache
         self._block_cache = None
         self._block_cache_hits = 0
         self._block_cache_misses = 0
+        # persistent block cache, used as a second tier behind the LRU block cache
+        self._persistent_cache = None
 
         self._initialize_block_cache()
 
@@ -58,6 +65,31 @@ class VEXLifter(SimEngineBase):
         self._block_cache = LRUCache(maxsize=self._cache_size)
         self._block_cache_hits = 0
         self._block_cache_misses = 0
+        self._initialize_persistent_cache()
+
+    def _initialize_persistent_cache(self):
+        if self._persistent_cache is not None:
+            self._persistent_cache.close()
+        self._persistent_cache = None
+
+        if not self._use_cache or self._persistent_cache_dir is None:
+            return
+        if self.project is None:
+            l.warning("The persistent lift cache requires a project. It is disabled.")
+            return
+        namespace = PersistentLiftCache.namespace_from_loader(self.project.loader)
+        if namespace is None:
+            l.warning("Cannot identify all loaded objects. The persistent lift cache is disabled.")
+            return
+        self._persistent_cache = PersistentLiftCache(self._persistent_cache_dir, namespace)
+
+    @property
+    def _persistent_cache_hits(self):
+        return self._persistent_cache.hits if self._persistent_cache is not None else 0
+
+    @property
+    def _persistent_cache_misses(self):
+        return self._persistent_cache.misses if self._persistent_cache is not None else 0
 
     def clear_cache(self):
         self._block_cache = LRUCache(maxsize=self._cache_size)
@@ -65,6 +97,11 @@ class VEXLifter(SimEngineBase):
         self._block_cache_hits = 0
         self._block_cache_misses = 0
 
+        # the on-disk cache is shared with other processes and is not removed. only reset its counters.
+        if self._persistent_cache is not None:
+            self._persistent_cache.hits = 0
+            self._persistent_cache.misses = 0
+
 
     def lift_vex(self,
              addr=None,
@@ -178,10 +215,10 @@ class VEXLifter(SimEngineBase):
         cache_key = None
         if use_cache:
             cache_key = (addr, insn_bytes, size, num_inst, thumb, opt_level, strict_block_end, cross_insn_opt)
-            if cache_key in self._block_cache:
+            irsb = self._lookup_block_cache(cache_key, arch)
+            if irsb is not None:
                 self._block_cache_hits += 1
                 l.debug("Cache hit IRSB of %s at %#x", arch, addr)
-                irsb = self._block_cache[cache_key]
                 stop_point = self._first_stoppoint(irsb, extra_stop_points)
                 if stop_point is None:
                     return irsb
@@ -189,22 +226,22 @@ class VEXLifter(SimEngineBase):
                     size = stop_point - addr
                     # check the cache again
                     cache_key = (addr, insn_bytes, size, num_inst, thumb, opt_level, strict_block_end, cross_insn_opt)
-                    if cache_key in self._block_cache:
+                    irsb = self._lookup_block_cache(cache_key, arch)
+                    if irsb is not None:
                         self._block_cache_hits += 1
-                        return self._block_cache[cache_key]
+                        return irsb
                     else:
                         self._block_cache_misses += 1
             else:
                 # a special case: `size` is used as the maximum allowed size
                 tmp_cache_key = (addr, insn_bytes, VEX_IRSB_MAX_SIZE, num_inst, thumb, opt_level, strict_block_end,
                                  cross_insn_opt)
-                try:
-                    irsb = self._block_cache[tmp_cache_key]
-                    if irsb.size <= size:
-                        self._block_cache_hits += 1
-                        return self._block_cache[tmp_cache_key]
-                except KeyError:
+                irsb = self._lookup_block_cache(tmp_cache_key, arch)
+                if irsb is None:
                     self._block_cache_misses += 1
+                elif irsb.size <= size:
+                    self._block_cache_hits += 1
+                    return irsb
 
         # vex_lift breakpoints only triggered when the cache isn't used
         buff = NO_OVERRIDE
@@ -253,6 +290,8 @@ class VEXLifter(SimEngineBase):
 
                 if use_cache:
                     self._block_cache[cache_key] = irsb
+                    if self._persistent_cache is not None:
+                        self._persistent_cache.put((arch.name, ) + cache_key, irsb)
                 if state:
                     state._inspect('vex_lift', BP_AFTER, vex_lift_addr=addr, vex_lift_size=size)
                 return irsb
@@ -266,6 +305,27 @@ class VEXLifter(SimEngineBase):
                 l.debug("Using bytes: %r", pyvex.ffi.buffer(buff, size))
             raise SimTranslationError("Unable to translate bytecode") from e
 
+    def _lookup_block_cache(self, cache_key, arch):
+        """
+        Look up an IRSB in the in-memory block cache, and then in the persistent block cache if there is one. IRSBs
+        found in the persistent block cache are promoted into the in-memory block cache.
+
+        :param tuple cache_key: The block cache key.
+        :param arch:            The architecture of the block.
+        :return:                The IRSB, or None if it is not cached.
+        """
+        try:
+            return self._block_cache[cache_key]
+        except KeyError:
+            pass
+
+        if self._persistent_cache is None:
+            return None
+        irsb = self._persistent_cache.get((arch.name, ) + cache_key)
+        if irsb is not None:
+            self._block_cache[cache_key] = irsb
+        return irsb
+
     def _load_bytes(self, addr, max_size, state=None, clemory=None):
         if clemory is None and state is None:
             raise SimEngineError('state and clemory cannot both be None in _load_bytes().')
@@ -375,7 +435,8 @@ class VEXLifter(SimEngineBase):
              '_support_selfmodifying_code': self._support_selfmodifying_code,
              '_single_step': self._single_step,
              '_cache_size': self._cache_size,
-             'default_strict_block_end': self.default_strict_block_end
+             'default_strict_block_end': self.default_strict_block_end,
+             '_persistent_cache_dir': self._persistent_cache_dir,
         }
 
         return (s, ostate)
@@ -388,7 +449,9 @@ class VEXLifter(SimEngineBase):
         self._single_step = s['_single_step']
         self._cache_size = s['_cache_size']
         self.default_strict_block_end = s['default_strict_block_end']
+        self._persistent_cache_dir = s.get('_persistent_cache_dir', None)
+        self._persistent_cache = None
 
         # rebuild block cache
-        self._initialize_block_cache()
         super().__setstate__(ostate)
+        self._initialize_block_cache()
@@ -167,24 +167,31 @@ class ExplorationTechnique:
         return False
 
 
-from .slicecutor import Slicecutor
-from .cacher import Cacher
-from .driller_core import DrillerCore
-from .loop_seer import LoopSeer
-from .tracer import Tracer
-from .explorer import Explorer
-from .threading import Threading
-from .dfs import DFS
-from .lengthlimiter import LengthLimiter
-from .veritesting import Veritesting
-from .oppologist import Oppologist
-from .director import Director, ExecuteAddressGoal, CallFunctionGoal
-from .spiller import Spiller
-from .manual_mergepoint import ManualMergepoint
-from .tech_builder import TechniqueBuilder
-from .stochastic import StochasticSearch
-from .unique import UniqueSearch
-from .symbion import Symbion
 from ..errors import AngrError, AngrExplorationTechniqueError
-from .memory_watcher import MemoryWatcher
-from .bucketizer import Bucketizer
+from ..misc.autoimport import lazy_import_attributes
+
+# exploration techniques are imported the first time they are used
+lazy_import_attributes(__name__, {
+    'Slicecutor': 'slicecutor',
+    'Cacher': 'cacher',
+    'DrillerCore': 'driller_core',
+    'LoopSeer': 'loop_seer',
+    'Tracer': 'tracer',
+    'Explorer': 'explorer',
+    'Threading': 'threading',
+    'DFS': 'dfs',
+    'LengthLimiter': 'lengthlimiter',
+    'Veritesting': 'veritesting',
+    'Oppologist': 'oppologist',
+    'Director': 'director',
+    'ExecuteAddressGoal': 'director',
+    'CallFunctionGoal': 'director',
+    'Spiller': 'spiller',
+    'ManualMergepoint': 'manual_mergepoint',
+    'TechniqueBuilder': 'tech_builder',
+    'StochasticSearch': 'stochastic',
+    'UniqueSearch': 'unique',
+    'Symbion': 'symbion',
+    'MemoryWatcher': 'memory_watcher',
+    'Bucketizer': 'bucketizer',
+})
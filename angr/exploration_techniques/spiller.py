@@ -104,6 +104,33 @@ class PickledStatesDb(PickledStatesBase):
         session.commit()
         session.close()
 
+    def add_batch(self, items, stash="spilled"):
+        """
+        Add many states in one transaction.
+
+        :param list items:  A list of (priority, state ID) tuples.
+        :param str stash:   The stash of the states.
+        :return:            None
+        """
+        session = self.Session()
+        session.add_all([ PickledState(id=sid, priority=prio, stash=stash) for prio, sid in items ])
+        session.commit()
+        session.close()
+
+    def mark_taken(self, sids):
+        """
+        Mark states as taken.
+
+        :param list sids:   IDs of the states.
+        :return:            None
+        """
+        session = self.Session()
+        session.query(PickledState)\
+            .filter(PickledState.id.in_(sids))\
+            .update({PickledState.taken: True}, synchronize_session=False)
+        session.commit()
+        session.close()
+
     def pop_n(self, n, stash="spilled"):  # pylint:disable=arguments-differ
         session = self.Session()
         q = session.query(PickledState)\
@@ -1,4 +1,5 @@
 from typing import List
+from array import array
 import logging
 
 from . import ExplorationTechnique
@@ -151,6 +152,9 @@ class Tracer(ExplorationTechnique):
         self._aslr_slides = {}
         self._current_slide = None
 
+        # the trace in a form that unicorn can follow natively
+        self._trace_array = None
+
         # keep track of the last basic block we hit
         self.predecessors = [None] * keep_predecessors # type: List[angr.SimState]
         self.last_state = None
@@ -198,6 +202,11 @@ class Tracer(ExplorationTechnique):
                 raise AngrTracerError("Could not step to the first address of the trace - state split")
             simgr.drop(stash='unsat')
 
+        try:
+            self._trace_array = array('Q', self._trace)
+        except (TypeError, OverflowError):
+            self._trace_array = None
+
         # initialize the state info
         simgr.one_active.globals['trace_idx'] = idx
         simgr.one_active.globals['sync_idx'] = None
@@ -258,6 +267,10 @@ class Tracer(ExplorationTechnique):
             insn = block.capstone.insns[0]
             self.project.hook(state.addr, RepHook(insn.mnemonic.split(" ")[1]).run, length=insn.size)
 
+        # let unicorn check the blocks it executes against the trace, so we do not have to
+        if sim_options.UNICORN in state.options and self._trace_array is not None and self._current_slide is not None:
+            state.unicorn.follow_trace(self._trace_array, state.globals['trace_idx'], self._current_slide)
+
         # perform the step. ask qemu to stop at the termination point.
         stops = set(kwargs.pop('extra_stop_points', ())) | {self._trace[-1]}
         succs_dict = simgr.step_state(state, extra_stop_points=stops, **kwargs)
@@ -389,7 +402,8 @@ class Tracer(ExplorationTechnique):
             if sync is not None:
                 raise Exception("TODO")
 
-            for addr in state.history.recent_bbl_addrs:
+            followed, idx = self._follow_trace_prefix(state, idx)
+            for addr in state.history.recent_bbl_addrs[followed:]:
                 if addr == state.unicorn.transmit_addr:
                     continue
 
@@ -464,6 +478,30 @@ class Tracer(ExplorationTechnique):
         else:
             l.debug("Trace: %d/%d", state.globals['trace_idx'], len(self._trace))
 
+    def _follow_trace_prefix(self, state, idx):
+        """
+        Find out how many of the blocks executed in the last step follow the trace under the current ASLR slide, without
+        comparing them one by one.
+
+        :param state:   The state after the step.
+        :param int idx: The trace index of the first block executed in the step.
+        :return:        A tuple of the number of blocks at the beginning of history.recent_bbl_addrs that followed the
+                        trace, and the trace index after them.
+        """
+        unicorn = state.unicorn
+        if unicorn.trace_blocks and unicorn.trace_start_idx == idx and unicorn.trace_idx is not None:
+            # unicorn did it for us
+            return unicorn.trace_blocks, unicorn.trace_idx
+
+        addrs = state.history.recent_bbl_addrs
+        slide = self._current_slide
+        if slide is None or unicorn.transmit_addr in addrs:
+            return 0, idx
+        n = len(addrs)
+        if list(self._trace[idx:idx + n]) == [ addr + slide for addr in addrs ]:
+            return n, idx + n
+        return 0, idx
+
     def _translate_state_addr(self, state_addr, obj=None):
         if obj is None:
             obj = self.project.loader.find_object_containing(state_addr)
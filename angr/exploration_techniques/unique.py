@@ -1,8 +1,134 @@
 from difflib import SequenceMatcher
 from collections import Counter
+import heapq
+import weakref
 
 from . import ExplorationTechnique
 
+
+def _dot(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b[k] for k, v in a.items() if k in b)
+
+
+class BlockCountVector:
+    """
+    A sparse vector of how many times each basic block was executed in the history of a state, along with its squared
+    L2 norm.
+
+    A vector is a read-only base Counter, which is shared with other vectors, plus a small Counter of the differences
+    from it. Vectors are cached per history node and derived from the vector of the parent node by copying only the
+    differences, and a new base is only materialized once the differences grow large. Vectors that share a base, like
+    the vectors of sibling states, are compared in time proportional to their differences.
+    """
+
+    __slots__ = ('base', 'base_norm2', 'delta', 'norm2', '__weakref__', )
+
+    # the differences are folded into a new base once they have more entries than this, or than the square root of the
+    # size of the base, whichever is larger
+    MIN_DELTA_SIZE = 64
+
+    _cache = weakref.WeakKeyDictionary()
+
+    def __init__(self, base, base_norm2=None, delta=None, norm2=None):
+        self.base = base
+        self.base_norm2 = sum(v * v for v in base.values()) if base_norm2 is None else base_norm2
+        self.delta = Counter() if delta is None else delta
+        self.norm2 = self.base_norm2 if norm2 is None else norm2
+
+    @classmethod
+    def of(cls, history):
+        try:
+            return cls._cache[history]
+        except KeyError:
+            pass
+
+        parent = history.parent
+        parent_vec = cls._cache.get(parent, None) if parent is not None else None
+        if parent_vec is not None:
+            vec = parent_vec._extend(history.recent_bbl_addrs)
+        else:
+            vec = cls(Counter(history.bbl_addrs.flattened()))
+
+        cls._cache[history] = vec
+        return vec
+
+    def _extend(self, addrs):
+        base = self.base
+        delta = Counter(self.delta)
+        norm2 = self.norm2
+        for addr in addrs:
+            # (c + 1)^2 - c^2
+            norm2 += 2 * (base.get(addr, 0) + delta[addr]) + 1
+            delta[addr] += 1
+
+        if len(delta) > max(self.MIN_DELTA_SIZE, len(base) ** 0.5):
+            return BlockCountVector(base + delta, base_norm2=norm2, norm2=norm2)
+        return BlockCountVector(base, base_norm2=self.base_norm2, delta=delta, norm2=norm2)
+
+    @property
+    def counts(self):
+        """
+        The block counts, as one Counter.
+        """
+        if not self.delta:
+            return self.base
+        return self.base + self.delta
+
+    def dot(self, other):
+        if self.base is other.base:
+            # (B + d1).(B + d2) = B.B + B.d1 + B.d2 + d1.d2
+            return self.base_norm2 + _dot(self.base, self.delta) + _dot(self.base, other.delta) + \
+                   _dot(self.delta, other.delta)
+        return _dot(self.counts, other.counts)
+
+    def l2_distance(self, other):
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b
+        d2 = self.norm2 + other.norm2 - 2 * self.dot(other)
+        return max(d2, 0) ** 0.5
+
+    def cosine_similarity(self, other):
+        if not self.norm2 or not other.norm2:
+            return 1.0 if self.norm2 == other.norm2 else 0.0
+        return self.dot(other) / (self.norm2 * other.norm2) ** 0.5
+
+
+class BlockSequenceSketch:
+    """
+    A bottom-k MinHash sketch of the set of k-grams of basic block addresses in the history of a state. Comparing two
+    sketches estimates the Jaccard similarity of the sequences in O(sketch size), independent of history length.
+    """
+
+    __slots__ = ('hashes', '__weakref__', )
+
+    SHINGLE_SIZE = 3
+    SKETCH_SIZE = 128
+
+    _cache = weakref.WeakKeyDictionary()
+
+    def __init__(self, addrs):
+        n = self.SHINGLE_SIZE
+        shingles = { hash(tuple(addrs[i:i + n])) for i in range(max(len(addrs) - n + 1, 1)) }
+        self.hashes = frozenset(heapq.nsmallest(self.SKETCH_SIZE, shingles))
+
+    @classmethod
+    def of(cls, history):
+        try:
+            return cls._cache[history]
+        except KeyError:
+            sketch = cls(history.bbl_addrs.flattened())
+            cls._cache[history] = sketch
+            return sketch
+
+    def jaccard(self, other):
+        union = heapq.nsmallest(self.SKETCH_SIZE, self.hashes | other.hashes)
+        if not union:
+            return 1.0
+        both = self.hashes & other.hashes
+        return sum(1 for h in union if h in both) / len(union)
+
+
 class UniqueSearch(ExplorationTechnique):
     """
     Unique Search.
@@ -16,7 +142,9 @@ class UniqueSearch(ExplorationTechnique):
 
     def __init__(self, similarity_func=None, deferred_stash='deferred'):
         """
-        :param similarity_func: How to calculate similarity between two states.
+        :param similarity_func: How to calculate similarity between two states. Besides the default (L2) similarity,
+                                `cosine_similarity`, `minhash_similarity` and `sequence_matcher_similarity` are
+                                provided.
         :param deferred_stash:  Where to store the deferred states.
         """
         super(UniqueSearch, self).__init__()
@@ -81,11 +209,28 @@ class UniqueSearch(ExplorationTechnique):
         :param state_a: The first state to compare
         :param state_b: The second state to compare
         """
-        count_a = Counter(state_a.history.bbl_addrs)
-        count_b = Counter(state_b.history.bbl_addrs)
-        normal_distance = sum((count_a.get(addr, 0) - count_b.get(addr, 0)) ** 2
-                              for addr in set(list(count_a.keys()) + list(count_b.keys()))) ** 0.5
-        return 1.0 / (1 + normal_distance)
+        vec_a = BlockCountVector.of(state_a.history)
+        vec_b = BlockCountVector.of(state_b.history)
+        return 1.0 / (1 + vec_a.l2_distance(vec_b))
+
+    @staticmethod
+    def cosine_similarity(state_a, state_b):
+        """
+        The cosine similarity between the counts of the state addresses in the history of the path.
+        :param state_a: The first state to compare
+        :param state_b: The second state to compare
+        """
+        return BlockCountVector.of(state_a.history).cosine_similarity(BlockCountVector.of(state_b.history))
+
+    @staticmethod
+    def minhash_similarity(state_a, state_b):
+        """
+        The estimated Jaccard similarity between the sets of short block address sequences in the history of the path.
+        It is a cheap approximation of `sequence_matcher_similarity` for long histories.
+        :param state_a: The first state to compare
+        :param state_b: The second state to compare
+        """
+        return BlockSequenceSketch.of(state_a.history).jaccard(BlockSequenceSketch.of(state_b.history))
 
     @staticmethod
     def sequence_matcher_similarity(state_a, state_b):
@@ -94,6 +239,6 @@ class UniqueSearch(ExplorationTechnique):
         :param state_a: The first state to compare
         :param state_b: The second state to compare
         """
-        addrs_a = tuple(state_a.history.bbl_addrs)
-        addrs_b = tuple(state_b.history.bbl_addrs)
+        addrs_a = tuple(state_a.history.bbl_addrs.flattened())
+        addrs_b = tuple(state_b.history.bbl_addrs.flattened())
         return SequenceMatcher(a=addrs_a, b=addrs_b).ratio()
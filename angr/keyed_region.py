@@ -36,12 +36,14 @@ class RegionObject:
     Represents one or more objects occupying one or more bytes in KeyedRegion.
     """
 
-    __slots__ = ('start', 'size', 'stored_objects', '_internal_objects')
+    __slots__ = ('start', 'size', 'stored_objects', '_internal_objects', 'owner')
 
-    def __init__(self, start, size, objects=None):
+    def __init__(self, start, size, objects=None, owner=None):
         self.start = start
         self.size = size
         self.stored_objects = set() if objects is None else objects
+        # the token of the KeyedRegion that may update this object in place. other KeyedRegions copy it first.
+        self.owner = owner
 
         self._internal_objects = set()
         if self.stored_objects:
@@ -70,10 +72,10 @@ class RegionObject:
     def includes(self, offset):
         return self.start <= offset < self.start + self.size
 
-    def split(self, split_at):
+    def split(self, split_at, owner=None):
         assert self.includes(split_at)
-        a = RegionObject(self.start, split_at - self.start, self.stored_objects.copy())
-        b = RegionObject(split_at, self.start + self.size - split_at, self.stored_objects.copy())
+        a = RegionObject(self.start, split_at - self.start, self.stored_objects.copy(), owner=owner)
+        b = RegionObject(split_at, self.start + self.size - split_at, self.stored_objects.copy(), owner=owner)
 
         return a, b
 
@@ -92,8 +94,8 @@ class RegionObject:
 
         self.add_object(obj)
 
-    def copy(self):
-        ro = RegionObject(self.start, self.size, objects=self.stored_objects.copy())
+    def copy(self, owner=None):
+        ro = RegionObject(self.start, self.size, objects=self.stored_objects.copy(), owner=owner)
         return ro
 
 
@@ -103,14 +105,22 @@ class KeyedRegion:
     this region overlap with another variable in this region.
 
     Registers and function frames can all be viewed as a keyed region.
+
+    Copies share their storage and all region objects with the original. The storage is copied (shallowly) the first
+    time either side is updated, and region objects are copied the first time they are updated by a KeyedRegion that
+    does not own them. Comparing and merging regions that share storage or region objects skips the shared parts.
     """
 
-    __slots__ = ('_storage', '_object_mapping', '_phi_node_contains' )
+    __slots__ = ('_storage', '_object_mapping', '_phi_node_contains', '_shared', '_token', )
 
     def __init__(self, tree=None, phi_node_contains=None):
         self._storage = SortedDict() if tree is None else tree
         self._object_mapping = weakref.WeakValueDictionary()
         self._phi_node_contains = phi_node_contains
+        # whether _storage and _object_mapping may be shared with other KeyedRegions
+        self._shared = tree is not None
+        # identifies the region objects that this KeyedRegion owns
+        self._token = object()
 
     def __getstate__(self):
         return self._storage, dict(self._object_mapping), self._phi_node_contains
@@ -118,6 +128,10 @@ class KeyedRegion:
     def __setstate__(self, s):
         self._storage, om, self._phi_node_contains = s
         self._object_mapping = weakref.WeakValueDictionary(om)
+        # pickle and deepcopy memoize _storage, so other unpickled KeyedRegions may share it
+        self._shared = True
+        # the new token owns no region objects, so they are copied before they are updated
+        self._token = object()
 
     def _get_container(self, offset):
         try:
@@ -150,11 +164,14 @@ class KeyedRegion:
         return iter(self._storage.values())
 
     def __eq__(self, other):
-        if set(self._storage.keys()) != set(other._storage.keys()):
+        if self._storage is other._storage:
+            return True
+        if len(self._storage) != len(other._storage):
             return False
 
         for k, v in self._storage.items():
-            if v != other._storage[k]:
+            other_v = other._storage.get(k, None)
+            if other_v is None or (v is not other_v and v != other_v):
                 return False
 
         return True
@@ -164,9 +181,12 @@ class KeyedRegion:
             return KeyedRegion(phi_node_contains=self._phi_node_contains)
 
         kr = KeyedRegion(phi_node_contains=self._phi_node_contains)
-        for key, ro in self._storage.items():
-            kr._storage[key] = ro.copy()
-        kr._object_mapping = self._object_mapping.copy()
+        kr._storage = self._storage
+        kr._object_mapping = self._object_mapping
+        kr._shared = True
+        self._shared = True
+        # neither side owns any of the region objects anymore
+        self._token = object()
         return kr
 
     def merge(self, other, replacements=None):
@@ -177,11 +197,17 @@ class KeyedRegion:
         :return: None
         """
 
-        # TODO: is the current solution not optimal enough?
-        for _, item in other._storage.items():  # type: RegionObject
+        for key, item in other._storage.items():  # type: RegionObject
+            if not replacements and self._storage.get(key, None) is item \
+                    and (self._phi_node_contains is None or len(item.stored_objects) == 1) \
+                    and all(so.start == item.start and so.size == item.size for so in item.stored_objects):
+                # both regions share this region object, which is not a fragment of any larger object. storing its
+                # objects again does not change anything
+                continue
             for so in item.stored_objects:  # type: StoredObject
                 if replacements and so.obj in replacements:
                     so = StoredObject(so.start, replacements[so.obj], so.size)
+                self._unshare()
                 self._object_mapping[so.obj_id] = so
                 self.__store(so, overwrite=False)
 
@@ -200,6 +226,7 @@ class KeyedRegion:
             for so in item.stored_objects:  # type: StoredObject
                 if replacements and so.obj in replacements:
                     so = StoredObject(so.start, replacements[so.obj], so.size)
+                self._unshare()
                 self._object_mapping[so.obj_id] = so
                 self.__store(so, overwrite=False, merge_to_top=True, top=top)
 
@@ -352,6 +379,16 @@ class KeyedRegion:
     # Private methods
     #
 
+    def _unshare(self):
+        """
+        Make sure that the storage and the object mapping are not shared with any other KeyedRegion before updating them.
+        """
+
+        if self._shared:
+            self._storage = self._storage.copy()
+            self._object_mapping = self._object_mapping.copy()
+            self._shared = False
+
     def _store(self, start, obj, size, overwrite=False):
         """
         Store a variable into the storage.
@@ -364,6 +401,7 @@ class KeyedRegion:
         """
 
         stored_object = StoredObject(start, obj, size)
+        self._unshare()
         self._object_mapping[stored_object.obj_id] = stored_object
         self.__store(stored_object, overwrite=overwrite)
 
@@ -377,6 +415,9 @@ class KeyedRegion:
         :return: None
         """
 
+        self._unshare()
+        token = self._token
+
         start = stored_object.start
         object_size = stored_object.size
         end = start + object_size
@@ -391,14 +432,14 @@ class KeyedRegion:
             overlapping_items.insert(0, floor_key)
 
         # scan through the entire list of region items, split existing regions and insert new regions as needed
-        to_update = {start: RegionObject(start, object_size, {stored_object})}
+        to_update = {start: RegionObject(start, object_size, {stored_object}, owner=token)}
         last_end = start
 
         for floor_key in overlapping_items:
             item = self._storage[floor_key]
             if item.start < start:
                 # we need to break this item into two
-                a, b = item.split(start)
+                a, b = item.split(start, owner=token)
                 if overwrite:
                     b.set_object(stored_object)
                 else:
@@ -409,12 +450,12 @@ class KeyedRegion:
             elif item.start > last_end:
                 # there is a gap between the last item and the current item
                 # fill in the gap
-                new_item = RegionObject(last_end, item.start - last_end, {stored_object})
+                new_item = RegionObject(last_end, item.start - last_end, {stored_object}, owner=token)
                 to_update[new_item.start] = new_item
                 last_end = new_item.end
             elif item.end > end:
                 # we need to split this item into two
-                a, b = item.split(end)
+                a, b = item.split(end, owner=token)
                 if overwrite:
                     a.set_object(stored_object)
                 else:
@@ -423,6 +464,9 @@ class KeyedRegion:
                 to_update[b.start] = b
                 last_end = b.end
             else:
+                if item.owner is not token:
+                    # the item is shared with other KeyedRegions
+                    item = item.copy(owner=token)
                 if overwrite:
                     item.set_object(stored_object)
                 else:
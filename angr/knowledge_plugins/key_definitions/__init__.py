@@ -2,4 +2,5 @@ from .rd_model import ReachingDefinitionsModel
 from .key_definition_manager import KeyDefinitionManager
 from .live_definitions import LiveDefinitions
 from .uses import Uses
+from .function_summary import FunctionSummary
 from . import atoms
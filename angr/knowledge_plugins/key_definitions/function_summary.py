@@ -0,0 +1,44 @@
+from typing import Dict, Set, Tuple, Optional, TYPE_CHECKING
+
+from .atoms import Atom
+from .dataset import DataSet
+
+if TYPE_CHECKING:
+    from ...calling_conventions import SimCC
+
+
+class FunctionSummary:
+    """
+    The effect of a function on reaching definitions, under a given calling convention. A summary is computed once, by
+    analyzing the function with the summaries of its callees, and is applied at every call to the function instead of
+    analyzing the function again.
+
+    Stack locations, and stack pointer values, are relative to the stack pointer at the entry of the function.
+
+    :ivar func_addr:    Address of the function.
+    :ivar cc:           The calling convention that the summary is computed with.
+    :ivar inputs:       Parameters, i.e. atoms that are defined by the caller, that the function uses.
+    :ivar outputs:      A dict of atoms that the function defines and that are visible to its caller, to a tuple of the
+                        data they hold when the function returns, and whether they are defined on every path to a
+                        return or not.
+    :ivar fingerprint:  A digest of the code of the function. The summary is out of date once it changes.
+    :ivar callees:      A dict of addresses of callees to the summaries that are applied in this summary. The summary is
+                        out of date once any of them is.
+    """
+
+    __slots__ = ('func_addr', 'cc', 'inputs', 'outputs', 'fingerprint', 'callees', 'generation', )
+
+    def __init__(self, func_addr: int, cc: Optional['SimCC'], inputs: Set[Atom],
+                 outputs: Dict[Atom,Tuple[DataSet,bool]], fingerprint: bytes,
+                 callees: Optional[Dict[int,'FunctionSummary']]=None):
+        self.func_addr = func_addr
+        self.cc = cc
+        self.inputs = inputs
+        self.outputs = outputs
+        self.fingerprint = fingerprint
+        self.callees = callees or { }
+        # the generation of the KeyDefinitionManager that this summary was last verified in
+        self.generation = None
+
+    def __repr__(self):
+        return "<FunctionSummary %#x: %d inputs, %d outputs>" % (self.func_addr, len(self.inputs), len(self.outputs))
@@ -1,11 +1,24 @@
-from typing import Dict, Iterable, TYPE_CHECKING
+from typing import Dict, Iterable, Hashable, Optional, Set, Tuple, TYPE_CHECKING
+import hashlib
+
+import networkx
 
 from .. import KnowledgeBasePlugin
 from .rd_model import ReachingDefinitionsModel
+from .function_summary import FunctionSummary
 from .constants import OP_BEFORE, OP_AFTER
 
 if TYPE_CHECKING:
     from ...knowledge_base import KnowledgeBase
+    from ...calling_conventions import SimCC
+    from ...analyses.reaching_definitions.function_handler import SummaryFunctionHandler
+
+
+def _cc_key(cc: Optional['SimCC']) -> Hashable:
+    # SimCC is not hashable
+    if cc is None:
+        return None
+    return type(cc), tuple(cc.args) if cc.args is not None else None, cc.ret_val, cc.sp_delta
 
 
 class RDAObserverControl:
@@ -35,10 +48,19 @@ class KeyDefinitionManager(KnowledgeBasePlugin):
     locations:
     - Before each call instruction: ('insn', address of the call instruction, OP_BEFORE)
     - After returning from each call: ('node', address of the block that ends with a call, OP_AFTER)
+
+    It also caches function summaries, which summary-based (bottom-up) reaching definitions analyses apply at calls to
+    local functions instead of analyzing the callees again. See `get_summary()` and SummaryFunctionHandler.
     """
     def __init__(self, kb: 'KnowledgeBase'):
         self.kb = kb
         self.model_by_funcaddr: Dict[int,ReachingDefinitionsModel] = {}
+        self.summaries: Dict[Tuple[int,Hashable],FunctionSummary] = {}
+
+        self._summaries_in_progress: Set[Tuple[int,Hashable]] = set()
+        self._unsummarizable: Set[Tuple[int,Hashable]] = set()
+        # summaries are verified against the code of their functions once per generation
+        self._generation = 0
 
     def has_model(self, func_addr: int):
         return func_addr in self.model_by_funcaddr
@@ -69,9 +91,113 @@ class KeyDefinitionManager(KnowledgeBasePlugin):
 
         return self.model_by_funcaddr[func_addr]
 
+    def get_summary(self, func_addr: int, cc: Optional['SimCC']=None,
+                    function_handler: Optional['SummaryFunctionHandler']=None) -> Optional[FunctionSummary]:
+        """
+        Get the reaching definitions summary of a function, and compute it if it is not cached or is out of date.
+
+        A summary is out of date once the code of its function, or any callee summary that it depends on, changes. This
+        is only checked once after every call to `invalidate_summaries()`, so call it after changing code or functions
+        in the knowledge base.
+
+        :param func_addr:           Address of the function.
+        :param cc:                  The calling convention to summarize the function with. Defaults to the calling
+                                    convention of the function.
+        :param function_handler:    The SummaryFunctionHandler to analyze the function with, if the summary is
+                                    computed. Defaults to a new SummaryFunctionHandler.
+        :return:                    The summary, or None if the function cannot be summarized, e.g. because it never
+                                    returns, or because it is recursive and is being summarized right now.
+        """
+        if not self.kb.functions.contains_addr(func_addr):
+            return None
+        func = self.kb.functions[func_addr]
+        if func.is_simprocedure or func.is_plt or func.alignment:
+            return None
+        if cc is None:
+            cc = func.calling_convention
+
+        key = func_addr, _cc_key(cc)
+        if key in self._summaries_in_progress or key in self._unsummarizable:
+            return None
+
+        summary = self.summaries.get(key, None)
+        if summary is not None and self._is_up_to_date(summary, func):
+            return summary
+
+        if function_handler is None:
+            from ...analyses.reaching_definitions.function_handler import SummaryFunctionHandler  # pylint:disable=import-outside-toplevel
+            function_handler = SummaryFunctionHandler()
+
+        self._summaries_in_progress.add(key)
+        try:
+            summary = function_handler.summarize(self.kb, func, cc, self._function_fingerprint(func))
+        finally:
+            self._summaries_in_progress.discard(key)
+
+        if summary is None:
+            self.summaries.pop(key, None)
+            self._unsummarizable.add(key)
+            return None
+        summary.generation = self._generation
+        self.summaries[key] = summary
+        return summary
+
+    def compute_summaries(self) -> Dict[int,FunctionSummary]:
+        """
+        Summarize all functions in the knowledge base, bottom-up, so that every function is analyzed once and with the
+        summaries of all of its (non-recursive) callees.
+
+        :return:    A dict of function addresses to their summaries, for all functions that can be summarized.
+        """
+        summaries = { }
+        for func_addr in networkx.dfs_postorder_nodes(self.kb.functions.callgraph):
+            summary = self.get_summary(func_addr)
+            if summary is not None:
+                summaries[func_addr] = summary
+        return summaries
+
+    def invalidate_summaries(self, func_addr: Optional[int]=None) -> None:
+        """
+        Drop the summaries of a function, and make all other summaries verify that they are up to date the next time
+        they are used. Summaries that depend on the dropped ones are computed again then.
+
+        :param func_addr:   Address of the function whose code changed, or None if it is not known which functions
+                            changed.
+        """
+        if func_addr is not None:
+            for key in [ key for key in self.summaries if key[0] == func_addr ]:
+                del self.summaries[key]
+        self._unsummarizable.clear()
+        self._generation += 1
+
+    def _is_up_to_date(self, summary: FunctionSummary, func) -> bool:
+        if summary.generation == self._generation:
+            return True
+        # mark it before checking callees, so that recursive functions do not check each other forever
+        summary.generation = self._generation
+        if summary.fingerprint != self._function_fingerprint(func) or \
+                any(self.get_summary(addr) is not callee for addr, callee in summary.callees.items()):
+            summary.generation = None
+            return False
+        return True
+
+    def _function_fingerprint(self, func) -> bytes:
+        memory = self.kb._project.loader.memory
+        h = hashlib.sha1()
+        for addr, node in sorted(func._local_blocks.items()):
+            h.update(b"%d:%d:" % (addr, node.size))
+            try:
+                h.update(memory.load(addr, node.size))
+            except KeyError:
+                pass
+        return h.digest()
+
     def copy(self) -> 'KeyDefinitionManager':
         dm = KeyDefinitionManager(self.kb)
         dm.model_by_funcaddr = dict(map(lambda x: (x[0], x[1].copy()),self.model_by_funcaddr.items()))
+        dm.summaries = dict(self.summaries)
+        dm._unsummarizable = set(self._unsummarizable)
+        dm._generation = self._generation
         return dm
 
 
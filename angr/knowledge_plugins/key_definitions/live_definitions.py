@@ -134,6 +134,29 @@ class LiveDefinitions:
 
         return definition
 
+    def add_definition(self, atom: Atom, code_loc: CodeLocation, data: Optional[DataSet],
+                       dummy=False, tags: Set[Tag]=None) -> Optional[Definition]:
+        """
+        Add a definition of an atom without killing its existing definitions, e.g. when the atom may or may not be
+        overwritten by a function call.
+        """
+        data = data or DataSet(UNDEFINED, atom.size)
+        definition: Definition = Definition(atom, code_loc, data, dummy=dummy, tags=tags)
+
+        if isinstance(atom, Register):
+            self.register_definitions.add_object(atom.reg_offset, definition, atom.size)
+        elif isinstance(atom, MemoryLocation):
+            if isinstance(atom.addr, SpOffset):
+                self.stack_definitions.add_object(atom.addr.offset, definition, atom.size)
+            elif isinstance(atom.addr, int):
+                self.memory_definitions.add_object(atom.addr, definition, atom.size)
+            else:
+                return None
+        else:
+            raise NotImplementedError()
+
+        return definition
+
     def add_use(self, atom: Atom, code_loc) -> None:
         if isinstance(atom, Register):
             self._add_register_use(atom, code_loc)
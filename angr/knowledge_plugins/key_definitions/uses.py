@@ -8,12 +8,35 @@ if TYPE_CHECKING:
 
 
 class Uses:
+    """
+    Uses of definitions, indexed both by definition and by code location.
 
-    __slots__ = ('_uses_by_definition', '_uses_by_location' )
+    Copies share the sets of uses with the original. A set is copied the first time it is updated by an instance that
+    does not own it.
+    """
+
+    __slots__ = ('_uses_by_definition', '_uses_by_location', '_own_definitions', '_own_locations', )
 
     def __init__(self):
         self._uses_by_definition: Dict['Definition',Set[CodeLocation]] = defaultdict(set)
         self._uses_by_location: Dict[CodeLocation, Set['Definition']] = defaultdict(set)
+        # keys of the sets that are not shared with any other instance, and can be updated in place
+        self._own_definitions: Set['Definition'] = set()
+        self._own_locations: Set[CodeLocation] = set()
+
+    @staticmethod
+    def _own_set(mapping, owned, key):
+        """
+        Get a set that can be updated in place, copying it first if it is shared.
+        """
+        s = mapping.get(key, None)
+        if s is None:
+            s = mapping[key] = set()
+            owned.add(key)
+        elif key not in owned:
+            s = mapping[key] = set(s)
+            owned.add(key)
+        return s
 
     def add_use(self, definition, codeloc: CodeLocation):
         """
@@ -22,8 +45,8 @@ class Uses:
         :param angr.analyses.reaching_definitions.definition.Definition definition: The definition that is used.
         :param codeloc: The code location where the use occurs.
         """
-        self._uses_by_definition[definition].add(codeloc)
-        self._uses_by_location[codeloc].add(definition)
+        self._own_set(self._uses_by_definition, self._own_definitions, definition).add(codeloc)
+        self._own_set(self._uses_by_location, self._own_locations, codeloc).add(definition)
 
     def get_uses(self, definition: 'Definition'):
         """
@@ -43,9 +66,10 @@ class Uses:
         if definition in self._uses_by_definition:
             codelocs = self._uses_by_definition[definition]
             del self._uses_by_definition[definition]
+            self._own_definitions.discard(definition)
 
             for codeloc in codelocs:
-                self._uses_by_location[codeloc].remove(definition)
+                self._own_set(self._uses_by_location, self._own_locations, codeloc).remove(definition)
 
     def get_uses_by_location(self, codeloc: CodeLocation) -> Set:
         """
@@ -63,8 +87,11 @@ class Uses:
         :return angr.angr.analyses.reaching_definitions.uses.Uses: Return a new <Uses> instance containing the same data.
         """
         u = Uses()
-        u._uses_by_definition = defaultdict(set, ((k, set(v)) for k, v in self._uses_by_definition.items()))
-        u._uses_by_location = defaultdict(set, ((k, set(v)) for k, v in self._uses_by_location.items()))
+        u._uses_by_definition = defaultdict(set, self._uses_by_definition)
+        u._uses_by_location = defaultdict(set, self._uses_by_location)
+        # all sets are shared now
+        self._own_definitions.clear()
+        self._own_locations.clear()
 
         return u
 
@@ -78,11 +105,13 @@ class Uses:
         for k, v in other._uses_by_definition.items():
             if k not in self._uses_by_definition:
                 self._uses_by_definition[k] = v
-            else:
-                self._uses_by_definition[k] |= v
+                other._own_definitions.discard(k)
+            elif self._uses_by_definition[k] is not v:
+                self._own_set(self._uses_by_definition, self._own_definitions, k).update(v)
 
         for k, v in other._uses_by_location.items():
             if k not in self._uses_by_location:
                 self._uses_by_location[k] = v
-            else:
-                self._uses_by_location[k] |= v
+                other._own_locations.discard(k)
+            elif self._uses_by_location[k] is not v:
+                self._own_set(self._uses_by_location, self._own_locations, k).update(v)
@@ -137,6 +137,38 @@ class VariableManagerInternal:
             if atom is not None:
                 self._atom_to_variable[(location.block_addr, location.stmt_idx)][atom].add(var_and_offset)
 
+    def merge_global_variables(self, other: 'VariableManagerInternal') -> Dict[SimVariable,SimVariable]:
+        """
+        Merge the global variables of another global VariableManagerInternal, and all accesses to them, into this one.
+        Global variables are identified by their addresses and sizes. Variables that do not exist in this manager yet
+        are created with new identifiers.
+
+        :param other:   The other VariableManagerInternal, e.g. one that is populated in another process.
+        :return:        A dict of variables in `other` to their counterparts in this manager.
+        """
+        mapping = { }
+        for var in other._variables:
+            if not isinstance(var, SimMemoryVariable):
+                continue
+            existing = next((v for v in self.get_global_variables(var.addr) if v.size == var.size), None)
+            if existing is None:
+                existing = SimMemoryVariable(var.addr, var.size, ident=self.next_variable_ident('global'))
+                self.set_variable('global', var.addr, existing)
+            mapping[var] = existing
+
+        for var, accesses in other._variable_accesses.items():
+            new_var = mapping.get(var, None)
+            if new_var is None:
+                continue
+            for access in accesses:
+                location = access.location
+                key = location.block_addr, location.stmt_idx
+                offset = next((off for v, off in other._stmt_to_variable.get(key, ()) if v is var), 0)
+                atom = next((atom for atom, var_and_offsets in other._atom_to_variable.get(key, { }).items()
+                             if (var, offset) in var_and_offsets), None)
+                self._record_variable_access(access.access_type, new_var, offset, location, atom=atom)
+        return mapping
+
     def make_phi_node(self, block_addr, *variables):
         """
         Create a phi variable for variables at block `block_addr`.
@@ -1,5 +1,7 @@
 import os
+import sys
 import importlib
+import importlib.util
 import logging
 
 l = logging.getLogger(name=__name__)
@@ -52,3 +54,31 @@ def filter_module(mod, type_req=None, subclass_req=None):
         if subclass_req is not None and not issubclass(val, subclass_req):
             continue
         yield name, val
+
+def lazy_import_attributes(module_name, attributes):
+    """
+    Make attributes of a package available without importing the submodules that define them until they are first
+    accessed. Submodules of the package that are not imported yet are also imported when they are first accessed as
+    attributes of the package.
+
+    :param str module_name:     Name of the package, usually __name__.
+    :param dict attributes:     A dict of attribute names to the names of the submodules (relative to the package) that
+                                define them.
+    """
+    module = sys.modules[module_name]
+
+    class LazyModule(type(module)):
+        def __getattr__(self, name):
+            submodule_name = attributes.get(name, None)
+            if submodule_name is not None:
+                value = getattr(importlib.import_module(".%s" % submodule_name, module_name), name)
+                setattr(self, name, value)
+                return value
+            if not name.startswith('__') and importlib.util.find_spec("%s.%s" % (module_name, name)) is not None:
+                return importlib.import_module(".%s" % name, module_name)
+            raise AttributeError("module %r has no attribute %r" % (module_name, name))
+
+        def __dir__(self):
+            return sorted(set(super().__dir__()) | set(attributes))
+
+    module.__class__ = LazyModule
@@ -29,6 +29,9 @@ class Loggers(object):
 
     def __getattr__(self, k):
         real_k = k.replace('_', '.')
+        if real_k not in self._loggers and not k.startswith('_'):
+            # the module might have been imported lazily
+            self.load_all_loggers()
         if real_k in self._loggers:
             return self._loggers[real_k]
         else:
@@ -0,0 +1,318 @@
+import json
+import logging
+import functools
+import importlib
+from time import perf_counter
+from collections import defaultdict
+
+l = logging.getLogger(name=__name__)
+
+# the profiler that is currently recording, if any
+_active = None
+
+# (module, class, method, subsystem) of every instrumented method
+INSTRUMENTATION_POINTS = [
+    ('angr.engines.engine', 'SuccessorsMixin', 'process', 'engine'),
+    ('angr.engines.vex.lifter', 'VEXLifter', 'lift_vex', 'lift'),
+    ('angr.engines.vex.heavy.heavy', 'HeavyVEXMixin', 'process_successors', 'vex'),
+    ('angr.engines.unicorn', 'SimEngineUnicorn', 'process_successors', 'unicorn'),
+    ('angr.engines.procedure', 'ProcedureMixin', 'process_procedure', 'procedure'),
+    ('angr.state_plugins.solver', 'SimSolver', 'satisfiable', 'solver'),
+    ('angr.state_plugins.solver', 'SimSolver', '_eval', 'solver'),
+    ('angr.state_plugins.solver', 'SimSolver', 'min', 'solver'),
+    ('angr.state_plugins.solver', 'SimSolver', 'max', 'solver'),
+    ('angr.state_plugins.solver', 'SimSolver', 'solution', 'solver'),
+    ('angr.state_plugins.solver', 'SimSolver', 'simplify', 'solver.simplify'),
+    ('angr.storage.memory_mixins', 'DefaultMemory', 'load', 'memory.load'),
+    ('angr.storage.memory_mixins', 'DefaultMemory', 'store', 'memory.store'),
+    ('angr.storage.memory_mixins', 'DefaultMemory', 'concrete_load', 'memory.concrete_load'),
+    ('angr.storage.memory_mixins.address_concretization_mixin', 'AddressConcretizationMixin',
+     'concretize_read_addr', 'memory.concretize'),
+    ('angr.storage.memory_mixins.address_concretization_mixin', 'AddressConcretizationMixin',
+     'concretize_write_addr', 'memory.concretize'),
+]
+
+# (class, method) -> (original attribute, or None if it was inherited)
+_installed = { }
+
+
+def _instrumented(subsystem, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return func(*args, **kwargs)
+        profiler._push(subsystem)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler._pop()
+    return wrapper
+
+
+def _instrumented_engine(func):
+    @functools.wraps(func)
+    def wrapper(self, state, *args, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return func(self, state, *args, **kwargs)
+        profiler._push('engine')
+        successors = None
+        try:
+            successors = func(self, state, *args, **kwargs)
+            return successors
+        finally:
+            elapsed = profiler._pop()
+            if successors is not None:
+                profiler._record_block(successors.addr, successors.sort, elapsed)
+    return wrapper
+
+
+def _instrumented_hook(func):
+    # HookedMethod.__call__. each exploration technique hook is a frame of its own
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        profiler = _active
+        if profiler is None or not self.pending:
+            return func(self, *args, **kwargs)
+        hook = self.pending[-1]
+        profiler._push('technique.%s.%s' % (type(getattr(hook, '__self__', None)).__name__,
+                                            getattr(hook, '__name__', '?')))
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            profiler._pop()
+    return wrapper
+
+
+def install():
+    """
+    Instrument the engines, the solver, memory and exploration technique hooks. Instrumented methods check whether a
+    profiler is active on every call, so they are only slightly slower while no profiler is active. This is done
+    automatically when a profiler becomes active.
+
+    :return:    True if this call installed the instrumentation, False if it was already installed.
+    :rtype:     bool
+    """
+    if _installed:
+        return False
+
+    from .hookset import HookedMethod  # pylint:disable=import-outside-toplevel
+
+    points = [ (HookedMethod, '__call__', _instrumented_hook) ]
+    for module_name, cls_name, method, subsystem in INSTRUMENTATION_POINTS:
+        try:
+            cls = getattr(importlib.import_module(module_name), cls_name)
+        except (ImportError, AttributeError):
+            l.debug("Cannot instrument %s.%s.", module_name, cls_name)
+            continue
+        if method == 'process' and subsystem == 'engine':
+            points.append((cls, method, _instrumented_engine))
+        else:
+            points.append((cls, method, functools.partial(_instrumented, subsystem)))
+
+    for cls, method, make_wrapper in points:
+        if (cls, method) in _installed or not hasattr(cls, method):
+            continue
+        _installed[(cls, method)] = cls.__dict__.get(method, None)
+        setattr(cls, method, make_wrapper(getattr(cls, method)))
+    return True
+
+
+def uninstall():
+    """
+    Remove all instrumentation.
+    """
+    for (cls, method), original in _installed.items():
+        if original is None:
+            delattr(cls, method)
+        else:
+            setattr(cls, method, original)
+    _installed.clear()
+
+
+def active_profiler():
+    """
+    :return:    The profiler that is currently recording, or None.
+    """
+    return _active
+
+
+class Profiler:
+    """
+    Records the time spent in, and the number of calls to, each subsystem (lifting, VEX execution, SimProcedures, the
+    solver, memory, exploration technique hooks, ...), as well as the time spent stepping each block.
+
+    Use it as a context manager::
+
+        with angr.misc.profiling.Profiler() as prof:
+            simgr.run()
+        print(prof)
+        prof.dump_flamegraph('angr.folded')
+
+    Alternatively, enable the PROFILE_STEPS state option to record every step of a state into `default_profiler`. In
+    that case, exploration technique hooks are not recorded, since they run outside of steps. The instrumentation is
+    installed at the first step, and stays installed until `uninstall()` is called.
+
+    Profilers are not thread-safe, and do not see anything that runs in other processes.
+
+    :ivar subsystems:   A dict of subsystem names to [number of calls, total time, self time]. Time spent in nested
+                        calls to other subsystems is not part of the self time.
+    :ivar blocks:       A dict of block addresses to [number of steps, total time, the sort of the last step].
+    :ivar stacks:       A dict of stacks of subsystem names to their self time, for flame graphs.
+    :ivar counters:     A dict of counter names to values. See `count`.
+    """
+
+    def __init__(self):
+        self.subsystems = defaultdict(lambda: [0, 0., 0.])
+        self.blocks = { }
+        self.stacks = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.wall_time = 0.
+
+        self._stack = [ ]
+        self._previous = [ ]
+        self._started = None
+        self._installed_by_me = False
+
+    def __enter__(self):
+        self._activate()
+        self._installed_by_me = install()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._deactivate()
+        if self._installed_by_me and _active is None:
+            uninstall()
+        self._installed_by_me = False
+
+    def _activate(self):
+        global _active  # pylint:disable=global-statement
+        self._previous.append(_active)
+        _active = self
+        self._started = perf_counter()
+
+    def _deactivate(self):
+        global _active  # pylint:disable=global-statement
+        self.wall_time += perf_counter() - self._started
+        _active = self._previous.pop()
+
+    #
+    # Recording
+    #
+
+    def _push(self, name):
+        self._stack.append([ name, perf_counter(), 0. ])
+
+    def _pop(self):
+        name, start, children = self._stack.pop()
+        elapsed = perf_counter() - start
+
+        record = self.subsystems[name]
+        record[0] += 1
+        record[2] += elapsed - children
+        if all(frame[0] != name for frame in self._stack):
+            # recursive calls are only counted once in the total time
+            record[1] += elapsed
+
+        self.stacks[tuple(frame[0] for frame in self._stack) + (name, )] += elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        return elapsed
+
+    def _record_block(self, addr, sort, elapsed):
+        record = self.blocks.get(addr, None)
+        if record is None:
+            self.blocks[addr] = [ 1, elapsed, sort ]
+        else:
+            record[0] += 1
+            record[1] += elapsed
+            record[2] = sort
+
+    def count(self, name, n=1):
+        """
+        Add to a counter.
+
+        :param str name:    Name of the counter.
+        :param int n:       The value to add.
+        """
+        self.counters[name] += n
+
+    def clear(self):
+        self.subsystems.clear()
+        self.blocks.clear()
+        self.stacks.clear()
+        self.counters.clear()
+        self.wall_time = 0.
+
+    #
+    # Reporting
+    #
+
+    def report(self, max_blocks=None):
+        """
+        Get the results as plain data.
+
+        :param int max_blocks:  Only include this many of the blocks that took the most time.
+        :return:                A dict that can be serialized to JSON.
+        :rtype:                 dict
+        """
+        blocks = sorted(self.blocks.items(), key=lambda item: item[1][1], reverse=True)
+        if max_blocks is not None:
+            blocks = blocks[:max_blocks]
+        return {
+            'wall_time': self.wall_time,
+            'subsystems': {
+                name: {'calls': calls, 'total_time': total, 'self_time': own}
+                for name, (calls, total, own) in self.subsystems.items()
+            },
+            'blocks': [
+                {'addr': addr, 'steps': steps, 'time': total, 'sort': sort}
+                for addr, (steps, total, sort) in blocks
+                if isinstance(addr, int)
+            ],
+            'counters': dict(self.counters),
+        }
+
+    def dump(self, path, max_blocks=None):
+        """
+        Write the results to a JSON file. See `report`.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.report(max_blocks=max_blocks), f, indent=1)
+
+    def dump_flamegraph(self, path):
+        """
+        Write the stacks of subsystems to a file in the folded format that flamegraph.pl and speedscope read. Times are
+        in microseconds.
+        """
+        with open(path, 'w') as f:
+            for stack, own in sorted(self.stacks.items()):
+                f.write('%s %d\n' % (';'.join(stack), round(own * 1e6)))
+
+    def __str__(self):
+        lines = [ "Profiled %.3f seconds" % self.wall_time,
+                  "%-40s %10s %12s %12s" % ("subsystem", "calls", "total (s)", "self (s)") ]
+        for name, (calls, total, own) in sorted(self.subsystems.items(), key=lambda item: item[1][2], reverse=True):
+            lines.append("%-40s %10d %12.4f %12.4f" % (name, calls, total, own))
+        blocks = self.report(max_blocks=10)['blocks']
+        if blocks:
+            lines.append("%-40s %10s %12s" % ("block", "steps", "time (s)"))
+            for block in blocks:
+                lines.append("%-40s %10d %12.4f" % ("%#x (%s)" % (block['addr'], block['sort']), block['steps'],
+                                                    block['time']))
+        for name, value in sorted(self.counters.items()):
+            lines.append("%-40s %10d" % (name, value))
+        return "\n".join(lines)
+
+
+# the profiler that the PROFILE_STEPS state option records into
+default_profiler = Profiler()
+
+
+def count(name, n=1):
+    """
+    Add to a counter of the active profiler, if any.
+    """
+    if _active is not None:
+        _active.count(name, n)
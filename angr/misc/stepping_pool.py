@@ -0,0 +1,222 @@
+import io
+import logging
+import multiprocessing
+import pickle
+import traceback
+import weakref
+
+import claripy
+
+from ..errors import SimUnsatError, AngrError
+
+l = logging.getLogger(name=__name__)
+
+# the project that states are stepped with in a worker process. it is inherited from the parent process when forking.
+_worker_project = None
+
+
+def _init_worker(project_ref):
+    global _worker_project  # pylint:disable=global-statement
+    _worker_project = project_ref()
+
+
+class _ProjectPickler(pickle.Pickler):
+    """
+    A pickler that does not serialize the project, or the history of the state that was stepped. Both sides of the pool
+    have them already.
+    """
+    def __init__(self, project, file, history=None):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.project = project
+        self.history = history
+
+    def persistent_id(self, obj):
+        if obj is self.project:
+            return "project"
+        if self.history is not None and obj is self.history:
+            return "history"
+        return None
+
+
+class _ProjectUnpickler(pickle.Unpickler):
+    def __init__(self, project, file, history=None):
+        super().__init__(file)
+        self.project = project
+        self.history = history
+
+    def persistent_load(self, pid):
+        if pid == "project":
+            return self.project
+        if pid == "history" and self.history is not None:
+            return self.history
+        raise pickle.UnpicklingError("Unsupported persistent ID %r." % pid)
+
+
+def _dumps(project, obj, history=None):
+    f = io.BytesIO()
+    _ProjectPickler(project, f, history=history).dump(obj)
+    return f.getvalue()
+
+
+def _loads(project, blob, history=None):
+    return _ProjectUnpickler(project, io.BytesIO(blob), history=history).load()
+
+
+def _step_batch(batch, resilience, run_args):
+    """
+    Step a batch of serialized states in a worker process.
+
+    :return:    A list of serialized (outcome, result, traceback) tuples, one for each state. outcome is 'ok' with a dict
+                of stash names to successors as result, 'unsat' if the state is unsatisfiable, or 'error' with the
+                exception that was raised as result.
+    """
+    project = _worker_project
+    out = [ ]
+    for blob in batch:
+        state = _loads(project, blob)
+        try:
+            successors = project.factory.successors(state, **run_args)
+            result = ('ok', {None: successors.flat_successors,
+                             'unsat': successors.unsat_successors,
+                             'unconstrained': successors.unconstrained_successors}, None)
+        except (SimUnsatError, claripy.UnsatError):
+            result = ('unsat', None, None)
+        except resilience as e:  # pylint:disable=catching-non-exception
+            result = ('error', e, traceback.format_exc())
+
+        try:
+            # successors refer to the history of the stepped state as their parent. the parent process has it already
+            out.append(_dumps(project, result, history=state.history))
+        except Exception as e:  # pylint:disable=broad-except
+            if result[0] != 'error':
+                raise
+            # the exception itself cannot be serialized
+            out.append(_dumps(project, ('error', AngrError("%s: %s" % (type(e).__name__, e)), result[2])))
+    return out
+
+
+class SteppingPool:
+    """
+    A persistent pool of forked processes that step states of a single project.
+
+    The project is loaded once, in the parent process, and workers inherit it when they are forked. States are sent to
+    workers without the project and without the ancestry of their histories, and successors are sent back without the
+    project and without the history of the state that was stepped. Both are re-attached in the parent process, so the
+    successors are indistinguishable from ones that are created by stepping in the parent process.
+
+    Workers see the project as it was when the pool was created. Call `close` (or `SteppingPool.shutdown`) after hooking
+    new functions or otherwise modifying the project, and a new pool will be forked the next time it is needed.
+    """
+
+    _pools = weakref.WeakKeyDictionary()
+
+    def __init__(self, project, processes):
+        # the pool is the value of its project in _pools, so it must not keep the project alive
+        self._project_ref = weakref.ref(project)
+        self.processes = processes
+        ctx = multiprocessing.get_context('fork')
+        self._pool = ctx.Pool(processes, initializer=_init_worker, initargs=(weakref.ref(project), ))
+        self._finalizer = weakref.finalize(project, self._pool.terminate)
+
+    @property
+    def project(self):
+        """
+        The project of this pool, or None if it has been garbage-collected.
+        """
+        return self._project_ref()
+
+    @classmethod
+    def get(cls, project, processes):
+        """
+        Get the stepping pool of a project, and create it if it does not exist.
+
+        :param project:         The project.
+        :param int processes:   The number of worker processes.
+        :return:                The stepping pool, or None if processes cannot be forked on this platform.
+        :rtype:                 SteppingPool or None
+        """
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            return None
+        pool = cls._pools.get(project, None)
+        if pool is not None and pool.processes != processes:
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = cls(project, processes)
+            cls._pools[project] = pool
+        return pool
+
+    @classmethod
+    def shutdown(cls, project=None):
+        """
+        Close the stepping pool of a project, or all stepping pools.
+
+        :param project: The project, or None to close the stepping pools of all projects.
+        """
+        pools = list(cls._pools.values()) if project is None else [ cls._pools.get(project, None) ]
+        for pool in pools:
+            if pool is not None:
+                pool.close()
+
+    def close(self):
+        project = self.project
+        if project is not None and self._pools.get(project, None) is self:
+            del self._pools[project]
+        self._finalizer()
+
+    def step(self, states, resilience=(), run_args=None):
+        """
+        Step states in the worker processes.
+
+        :param list states:         The states to step.
+        :param tuple resilience:    The exceptions that are caught and returned instead of being raised.
+        :param dict run_args:       Keyword arguments to project.factory.successors. They must be picklable.
+        :return:                    A list of (outcome, result, traceback) tuples, in the same order as `states`.
+        """
+        if not states:
+            return [ ]
+
+        project = self.project
+        blobs = [ self._encode_state(project, state) for state in states ]
+
+        # a few batches per worker, so that slow states do not stall the entire step
+        batch_size = max(1, len(blobs) // (self.processes * 4))
+        batches = [ blobs[i:i + batch_size] for i in range(0, len(blobs), batch_size) ]
+        pending = [ self._pool.apply_async(_step_batch, (batch, tuple(resilience), run_args or { }))
+                    for batch in batches ]
+
+        results = [ ]
+        i = 0
+        for p in pending:
+            for blob in p.get():
+                history = states[i].history
+                outcome, result, tb = _loads(project, blob, history=history)
+                if outcome == 'ok':
+                    for successors in result.values():
+                        for succ in successors:
+                            self._attach_ancestry(succ, history.parent)
+                results.append((outcome, result, tb))
+                i += 1
+        return results
+
+    @staticmethod
+    def _encode_state(project, state):
+        history = state.history
+        parent = history.parent
+        history.parent = None
+        try:
+            return _dumps(project, state)
+        finally:
+            history.parent = parent
+
+    @staticmethod
+    def _attach_ancestry(state, parent):
+        # successors that are not created as children of the stepped state (which are rare) only have the part of their
+        # history that was created in the worker
+        if parent is None:
+            return
+        h = state.history
+        while h.parent is not None and h.parent is not parent:
+            h = h.parent
+        if h.parent is None:
+            h.parent = parent
@@ -1,5 +1,6 @@
 import copy
 import os
+import importlib
 import archinfo
 from collections import defaultdict
 import logging
@@ -16,7 +17,123 @@ from ..stubs.ReturnUnconstrained import ReturnUnconstrained
 from ..stubs.syscall_stub import syscall as stub_syscall
 
 l = logging.getLogger(name=__name__)
-SIM_LIBRARIES = {}
+
+# the names of the libraries that each module under angr.procedures.definitions defines. these modules are only imported
+# the first time that one of their libraries is requested.
+_LIBRARY_MODULES = {
+    'advapi32': ('advapi32.dll', ),
+    'cgc': ('cgcabi', 'cgcabi_tracer'),
+    'glibc': ('libc.so.0', 'libc.so.1', 'libc.so.2', 'libc.so.3', 'libc.so.4', 'libc.so.5', 'libc.so.6', 'libc.so.7',
+              'libc.so'),
+    'kernel32': ('kernel32.dll', ),
+    'libstdcpp': ('libstdc++.so', 'libstdc++.so.6'),
+    'linux_kernel': ('linux', ),
+    'linux_loader': ('ld.so', 'ld-linux.so', 'ld.so.2', 'ld-linux.so.2', 'ld-linux-x86-64.so.2'),
+    'msvcr': ('msvcrt.dll', 'msvcr71.dll', 'msvcr100.dll', 'msvcr110.dll', 'msvcrt20.dll', 'msvcrt40.dll',
+              'msvcr120.dll'),
+    'ntdll': ('ntdll.dll', ),
+    'user32': ('user32.dll', ),
+    'parse_syscalls_from_local_system': ( ),  # a script, not a library
+}
+
+
+class SimLibraries(dict):
+    """
+    The type of ``angr.SIM_LIBRARIES``: a dict of library names to SimLibrary objects, which imports the module that
+    defines a library the first time that the library is requested.
+
+    Modules under ``angr.procedures.definitions`` that are not listed in ``_LIBRARY_MODULES`` are imported the first
+    time that a library that is not known yet is requested. Iterating over the dict, or taking its length, imports all
+    modules.
+    """
+
+    def __init__(self, library_modules):
+        super().__init__()
+        self._pending = { }  # library name -> module name
+        for module_name, names in library_modules.items():
+            for name in names:
+                self._pending[name] = module_name
+        self._indexed_modules = set(library_modules)
+        self._unindexed_loaded = False
+
+    def _load_module(self, module_name):
+        try:
+            importlib.import_module(".%s" % module_name, __name__)
+        except ImportError:
+            l.warning("Unable to import library definitions %s.%s", __name__, module_name, exc_info=True)
+        for name in [ name for name, mod in self._pending.items() if mod == module_name ]:
+            del self._pending[name]
+
+    def _load_unindexed(self):
+        if self._unindexed_loaded:
+            return
+        self._unindexed_loaded = True
+        for _ in autoimport.auto_import_modules(__name__, os.path.dirname(os.path.realpath(__file__)),
+                                                ignore_files=[ m + '.py' for m in self._indexed_modules ]):
+            pass
+
+    def load_all(self):
+        """
+        Import the definitions of all libraries.
+        """
+        for module_name in set(self._pending.values()):
+            self._load_module(module_name)
+        self._load_unindexed()
+
+    def _resolve(self, name):
+        """
+        Try to import the definitions of a library that has not been imported yet.
+
+        :return:    True if the library is now available.
+        """
+        module_name = self._pending.get(name, None)
+        if module_name is not None:
+            self._load_module(module_name)
+        else:
+            self._load_unindexed()
+        return dict.__contains__(self, name)
+
+    def __missing__(self, name):
+        if self._resolve(name):
+            return dict.__getitem__(self, name)
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or self._resolve(name)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def __iter__(self):
+        self.load_all()
+        return super().__iter__()
+
+    def __len__(self):
+        self.load_all()
+        return super().__len__()
+
+    def __repr__(self):
+        self.load_all()
+        return super().__repr__()
+
+    def keys(self):
+        self.load_all()
+        return super().keys()
+
+    def values(self):
+        self.load_all()
+        return super().values()
+
+    def items(self):
+        self.load_all()
+        return super().items()
+
+    def copy(self):
+        self.load_all()
+        return dict(self)
+
+
+SIM_LIBRARIES = SimLibraries(_LIBRARY_MODULES)
 
 
 class SimLibrary:
@@ -551,6 +668,3 @@ class SimSyscallLibrary(SimLibrary):
         """
         name, _, _ = self._canonicalize(number, arch, abi_list)
         return super(SimSyscallLibrary, self).has_implementation(name)
-
-for _ in autoimport.auto_import_modules('angr.procedures.definitions', os.path.dirname(os.path.realpath(__file__))):
-    pass
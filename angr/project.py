@@ -66,6 +66,8 @@ class Project:
     :param simos:                       a SimOS class to use for this project.
     :param engine:                      The SimEngine class to use for this project.
     :param bool translation_cache:      If True, cache translated basic blocks rather than re-translating them.
+    :param str translation_cache_dir:   A directory in which translated basic blocks are persisted across runs and
+                                        processes. Only used when translation_cache is enabled.
     :param support_selfmodifying_code:  Whether we aggressively support self-modifying code. When enabled, emulation
                                         will try to read code from the current state instead of the original memory,
                                         regardless of the current memory protections.
@@ -99,6 +101,7 @@ class Project:
                  engine=None,
                  load_options: Dict[str, Any]=None,
                  translation_cache=True,
+                 translation_cache_dir=None,
                  support_selfmodifying_code=False,
                  store_function=None,
                  load_function=None,
@@ -172,6 +175,7 @@ class Project:
         self._ignore_functions = ignore_functions
         self._support_selfmodifying_code = support_selfmodifying_code
         self._translation_cache = translation_cache
+        self._translation_cache_dir = translation_cache_dir
         self._executing = False # this is a flag for the convenience API, exec() and terminate_execution() below
 
         if self._support_selfmodifying_code:
@@ -7,7 +7,8 @@ from typing import List, Tuple, DefaultDict
 import claripy
 import mulpyplexer
 
-from .misc.hookset import HookSet
+from .misc.hookset import HookSet, HookedMethod
+from .misc.stepping_pool import SteppingPool
 from .misc.ux import once
 
 import logging
@@ -275,7 +276,7 @@ class SimulationManager:
         return self.completion_mode(tech.complete(self) for tech in self._techniques if tech._is_overriden('complete'))
 
     def step(self, stash='active', n=None, selector_func=None, step_func=None,
-             successor_func=None, until=None, filter_func=None, **run_args):
+             successor_func=None, until=None, filter_func=None, parallel=None, **run_args):
         """
         Step a stash of states forward and categorize the successors appropriately.
 
@@ -297,6 +298,11 @@ class SimulationManager:
         :param until:           (DEPRECATED) If provided, should be a function that takes a SimulationManager and
                                 returns True or False. Stepping will terminate when it is True.
         :param n:               (DEPRECATED) The number of times to step (default: 1 if "until" is not provided)
+        :param parallel:        If provided, the number of worker processes to step the states in. The workers are
+                                forked once and kept for later steps. States are stepped with
+                                project.factory.successors in the workers, so `successor_func` and exploration
+                                techniques that hook `step_state` or `successors` cannot be used with it. In those
+                                cases, or if processes cannot be forked, states are stepped in this process.
 
         Additionally, you can pass in any of the following keyword args for project.factory.successors:
 
@@ -323,11 +329,18 @@ class SimulationManager:
                       "Consider using simgr.run() with the same arguments if you want to specify "
                       "a number of steps or an additional condition on when to stop the execution.\x1b[0m")
             return self.run(stash, n, until, selector_func=selector_func, step_func=step_func,
-                            successor_func=successor_func, filter_func=filter_func, **run_args)
+                            successor_func=successor_func, filter_func=filter_func, parallel=parallel, **run_args)
         # ------------------ Compatibility layer ---------------->8
         bucket = defaultdict(list)
 
-        for state in self._fetch_states(stash=stash):
+        pool = self._stepping_pool(parallel, successor_func)
+        if pool is not None:
+            self._step_parallel(pool, bucket, stash, selector_func=selector_func, filter_func=filter_func, **run_args)
+            states = ()
+        else:
+            states = self._fetch_states(stash=stash)
+
+        for state in states:
 
             goto = self.filter(state, filter_func=filter_func)
             if isinstance(goto, tuple):
@@ -344,28 +357,7 @@ class SimulationManager:
             pre_errored = len(self._errored)
 
             successors = self.step_state(state, successor_func=successor_func, **run_args)
-            # handle degenerate stepping cases here. desired behavior:
-            # if a step produced only unsat states, always add them to the unsat stash since this usually indicates a bug
-            # if a step produced sat states and save_unsat is False, drop the unsats
-            # if a step produced no successors, period, add the original state to deadended
-
-            # first check if anything happened besides unsat. that gates all this behavior
-            if not any(v for k, v in successors.items() if k != 'unsat') and len(self._errored) == pre_errored:
-                # then check if there were some unsats
-                if successors.get('unsat', []):
-                    # only unsats. current setup is acceptable.
-                    pass
-                else:
-                    # no unsats. we've deadended.
-                    bucket['deadended'].append(state)
-                    continue
-            else:
-                # there were sat states. it's okay to drop the unsat ones if the user said so.
-                if not self._save_unsat:
-                    successors.pop('unsat', None)
-
-            for to_stash, successor_states in successors.items():
-                bucket[to_stash or stash].extend(successor_states)
+            self._bucket_successors(bucket, stash, state, successors, pre_errored)
 
         self._clear_states(stash=stash)
         for to_stash, states in bucket.items():
@@ -375,6 +367,83 @@ class SimulationManager:
             return step_func(self)
         return self
 
+    def _bucket_successors(self, bucket, stash, state, successors, pre_errored):
+        # handle degenerate stepping cases here. desired behavior:
+        # if a step produced only unsat states, always add them to the unsat stash since this usually indicates a bug
+        # if a step produced sat states and save_unsat is False, drop the unsats
+        # if a step produced no successors, period, add the original state to deadended
+
+        # first check if anything happened besides unsat. that gates all this behavior
+        if not any(v for k, v in successors.items() if k != 'unsat') and len(self._errored) == pre_errored:
+            # then check if there were some unsats
+            if successors.get('unsat', []):
+                # only unsats. current setup is acceptable.
+                pass
+            else:
+                # no unsats. we've deadended.
+                bucket['deadended'].append(state)
+                return
+        else:
+            # there were sat states. it's okay to drop the unsat ones if the user said so.
+            if not self._save_unsat:
+                successors.pop('unsat', None)
+
+        for to_stash, successor_states in successors.items():
+            bucket[to_stash or stash].extend(successor_states)
+
+    def _stepping_pool(self, parallel, successor_func):
+        if not parallel or parallel <= 1:
+            return None
+        if successor_func is not None or isinstance(self.step_state, HookedMethod) \
+                or isinstance(self.successors, HookedMethod):
+            if once('simgr_step_parallel_hooked'):
+                l.warning("Parallel stepping cannot be used with a custom successor function or with exploration "
+                          "techniques that hook step_state or successors. Stepping in this process.")
+            return None
+        pool = SteppingPool.get(self._project, parallel)
+        if pool is None and once('simgr_step_parallel_fork'):
+            l.warning("Cannot fork worker processes on this platform. Stepping in this process.")
+        return pool
+
+    def _step_parallel(self, pool, bucket, stash, selector_func=None, filter_func=None, **run_args):
+        """
+        Step all selected states of a stash in a stepping pool, and categorize the results into a bucket.
+        """
+        plan = [ ]
+        for state in self._fetch_states(stash=stash):
+            goto = self.filter(state, filter_func=filter_func)
+            if isinstance(goto, tuple):
+                goto, state = goto
+
+            if goto not in (None, stash):
+                plan.append((goto, state))
+            elif not self.selector(state, selector_func=selector_func):
+                plan.append((stash, state))
+            else:
+                plan.append((None, state))
+
+        results = iter(pool.step([ state for goto, state in plan if goto is None ],
+                                 resilience=self._resilience, run_args=run_args))
+
+        for goto, state in plan:
+            if goto is not None:
+                bucket[goto].append(state)
+                continue
+
+            pre_errored = len(self._errored)
+            outcome, successors, tb = next(results)
+            if outcome == 'unsat':
+                if self._hierarchy:
+                    self._hierarchy.unreachable_state(state)
+                    self._hierarchy.simplify()
+                successors = {'pruned': [state]}
+            elif outcome == 'error':
+                # tracebacks do not survive being sent across processes. keep the formatted one
+                l.debug("Error while stepping %s in a worker process:\n%s", state, tb)
+                self._errored.append(ErrorRecord(state, successors, None, formatted_traceback=tb))
+                successors = {}
+            self._bucket_successors(bucket, stash, state, successors, pre_errored)
+
     def step_state(self, state, successor_func=None, **run_args):
         """
         Don't use this function manually - it is meant to interface with exploration techniques.
@@ -779,17 +848,24 @@ class ErrorRecord:
                         step began.
     :ivar error:        The error that was thrown.
     :ivar traceback:    The traceback for the error that was thrown.
+    :ivar formatted_traceback:  The formatted traceback for the error that was thrown, if the traceback itself is not
+                                available (e.g. the error was thrown in a worker process).
     """
 
-    def __init__(self, state, error, traceback):
+    def __init__(self, state, error, traceback, formatted_traceback=None):
         self.state = state
         self.error = error
         self.traceback = traceback
+        self.formatted_traceback = formatted_traceback
 
     def debug(self):
         """
-        Launch a postmortem debug shell at the site of the error.
+        Launch a postmortem debug shell at the site of the error. If the error was thrown in a worker process, print its
+        traceback instead.
         """
+        if self.traceback is None and self.formatted_traceback is not None:
+            print(self.formatted_traceback)
+            return
         try:
             __import__('ipdb').post_mortem(self.traceback)
         except ImportError:
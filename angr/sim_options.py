@@ -127,6 +127,13 @@ MEMORY_SYMBOLIC_BYTES_MAP = "MEMORY_SYMBOLIC_BYTES_MAP"
 COPY_STATES = "COPY_STATES"
 COW_STATES = COPY_STATES
 
+# this makes paged memory share its page table between copied states, and only copy a page on its first write
+COW_PAGE_TABLE = "COW_PAGE_TABLE"
+
+# this makes paged memory serve file contents that were not modified by the loader from a read-only memory mapping of the
+# loaded file. writes to loader.memory after a page has been served this way are not seen
+MMAP_PAGE_BACKER = "MMAP_PAGE_BACKER"
+
 # this replaces calls with an unconstraining of the return register
 CALLLESS = "CALLLESS"
 
@@ -202,6 +209,12 @@ REPLACEMENT_SOLVER = "REPLACEMENT_SOLVER"
 # use a cache-less solver in claripy
 CACHELESS_SOLVER = "CACHELESS_SOLVER"
 
+# share the results of satisfiability, eval, min and max queries among all states in the process
+SOLVER_QUERY_CACHE = "SOLVER_QUERY_CACHE"
+
+# only send the constraints which share variables with a query to the solver
+CONSTRAINT_INDEPENDENCE = "CONSTRAINT_INDEPENDENCE"
+
 # IR optimization
 OPTIMIZE_IR = "OPTIMIZE_IR"
 NO_CROSS_INSN_OPT = "NO_CROSS_INSN_OPT"
@@ -236,6 +249,10 @@ TRACK_SOLVER_VARIABLES = "TRACK_SOLVER_VARIABLES"
 # Efficient state merging requires potential state ancestors being kept in memory
 EFFICIENT_STATE_MERGING = "EFFICIENT_STATE_MERGING"
 
+# Record the time spent in engines, the solver, memory, etc. during every step of the state into
+# angr.misc.profiling.default_profiler. The instrumentation stays installed until angr.misc.profiling.uninstall()
+PROFILE_STEPS = "PROFILE_STEPS"
+
 # Return 0 any unspecified bytes in memory/registers
 ZERO_FILL_UNCONSTRAINED_MEMORY = 'ZERO_FILL_UNCONSTRAINED_MEMORY'
 ZERO_FILL_UNCONSTRAINED_REGISTERS = 'ZERO_FILL_UNCONSTRAINED_REGISTERS'
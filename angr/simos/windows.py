@@ -357,7 +357,7 @@ class SimWindows(SimOS):
             # duplicate the history-cycle code here...
             exc_state = successors.initial_state.copy()
             exc_state.register_plugin('history', successors.initial_state.history.make_child())
-            exc_state.history.recent_bbl_addrs.append(successors.initial_state.addr)
+            exc_state.history.add_bbl_addr(successors.initial_state.addr)
 
         _l.debug("... wound up state to %#x", exc_state.addr)
 
@@ -1,7 +1,9 @@
 import operator
 import logging
 import itertools
+import threading
 import contextlib
+from array import array
 from typing import Optional
 
 import claripy
@@ -14,13 +16,26 @@ from ..state_plugins.sim_action import SimActionObject
 l = logging.getLogger(name=__name__)
 
 
+def _new_addr_log():
+    return array('Q')
+
+
+_pickling = threading.local()
+
+
 class SimStateHistory(SimStatePlugin):
     """
     This class keeps track of historically-relevant information for paths.
+
+    Basic block and instruction addresses are logged into typed ``array('Q')`` buffers. Logs that contain anything other
+    than unsigned 64-bit integers (e.g. Soot addresses) fall back to plain lists.
     """
 
     STRONGREF_STATE = True
 
+    # every history node whose depth is a multiple of this caches the flattened address logs of its entire ancestry
+    FLATTEN_CHUNK_SIZE = 64
+
     def __init__(self, parent=None, clone=None):
         SimStatePlugin.__init__(self)
 
@@ -44,8 +59,8 @@ class SimStateHistory(SimStatePlugin):
 
         # the execution log for this history
         self.recent_events = [ ] if clone is None else list(clone.recent_events)
-        self.recent_bbl_addrs = [ ] if clone is None else list(clone.recent_bbl_addrs)
-        self.recent_ins_addrs = [ ] if clone is None else list(clone.recent_ins_addrs)
+        self.recent_bbl_addrs = _new_addr_log() if clone is None else clone.recent_bbl_addrs[:]
+        self.recent_ins_addrs = _new_addr_log() if clone is None else clone.recent_ins_addrs[:]
         self.recent_stack_actions = [ ] if clone is None else list(clone.recent_stack_actions)
         self.last_stmt_idx = None if clone is None else clone.last_stmt_idx
 
@@ -62,10 +77,36 @@ class SimStateHistory(SimStatePlugin):
 
         self.strongref_state = None if clone is None else clone.strongref_state
 
+        # attribute name -> (the concatenated log of this chunk, the previous chunk boundary). only filled in on chunk
+        # boundaries
+        self._flat_logs = { }
+
     def init_state(self):
         self.successor_ip = self.state._ip
 
+    @staticmethod
+    @contextlib.contextmanager
+    def pickle_parent_only():
+        """
+        Within this context, pickled history nodes only refer to their parent, instead of carrying their entire
+        ancestry. Only use this when every history node is pickled as a separate persistent object (e.g., by a Vault),
+        since pickle would otherwise recurse through the entire chain of parents.
+        """
+        old = getattr(_pickling, 'parent_only', False)
+        _pickling.parent_only = True
+        try:
+            yield
+        finally:
+            _pickling.parent_only = old
+
     def __getstate__(self):
+        if getattr(_pickling, 'parent_only', False):
+            d = super(SimStateHistory, self).__getstate__()
+            d['strongref_state'] = None
+            d['_flat_logs'] = { }
+            d['successor_ip'] = self.successor_ip
+            return d
+
         # flatten ancestry, otherwise we hit recursion errors trying to get the entire history...
         # the important intuition here is that if we provide the entire linked list to pickle, pickle
         # will traverse it recursively. If we provide it as a real list, it will not do any recursion.
@@ -82,6 +123,7 @@ class SimStateHistory(SimStatePlugin):
         rev_ancestry = list(reversed(ancestry))
         d = super(SimStateHistory, self).__getstate__()
         d['strongref_state'] = None
+        d['_flat_logs'] = { }  # can be rebuilt from the ancestry
         d['rev_ancestry'] = rev_ancestry
         d['successor_ip'] = self.successor_ip
 
@@ -95,6 +137,11 @@ class SimStateHistory(SimStatePlugin):
         return d
 
     def __setstate__(self, d):
+        if 'rev_ancestry' not in d:
+            # pickled with pickle_parent_only()
+            self.__dict__.update(d)
+            return
+
         child = self
         ancestry = list(reversed(d.pop('rev_ancestry')))
         for parent in ancestry:
@@ -105,6 +152,8 @@ class SimStateHistory(SimStatePlugin):
         else:
             child.parent = None
         self.__dict__.update(d)
+        if '_flat_logs' not in d:
+            self._flat_logs = { }
 
     def __repr__(self):
         addr = self.addr
@@ -332,6 +381,86 @@ class SimStateHistory(SimStatePlugin):
     def add_action(self, action):
         self.recent_events.append(action)
 
+    def add_bbl_addr(self, addr):
+        """
+        Log the address of an executed basic block.
+        """
+        self._append_addr('recent_bbl_addrs', addr)
+
+    def add_ins_addr(self, addr):
+        """
+        Log the address of an executed instruction.
+        """
+        self._append_addr('recent_ins_addrs', addr)
+
+    def _append_addr(self, attr, addr):
+        log = getattr(self, attr)
+        try:
+            log.append(addr)
+        except (TypeError, OverflowError):
+            # not an unsigned 64-bit integer. switch to a list
+            log = list(log)
+            log.append(addr)
+            setattr(self, attr, log)
+
+    def flattened_log(self, attr):
+        """
+        Get the concatenation of a log (e.g. ``recent_bbl_addrs``) over the entire ancestry of this node, from the
+        oldest entry to the newest one, as one sequence.
+
+        Ancestors on chunk boundaries (every FLATTEN_CHUNK_SIZE levels) cache the concatenated log of their chunk, so
+        this does not walk the entire ancestry, and the caches take as much memory as the logs themselves. The result
+        is an ``array('Q')`` for address logs that only contain integers, and can be turned into a NumPy array without
+        copying with ``numpy.frombuffer(log, dtype=numpy.uint64)``.
+
+        :param str attr:    Name of the log attribute.
+        :return:            A new array or list.
+        """
+        pieces = [ getattr(self, attr) ]
+        node = self.parent
+        while node is not None:
+            if node.depth % self.FLATTEN_CHUNK_SIZE == 0:
+                chunk, node = node._flattened_chunk(attr)
+                pieces.append(chunk)
+            else:
+                pieces.append(getattr(node, attr))
+                node = node.parent
+        return self._concat_logs(reversed(pieces))
+
+    def _flattened_chunk(self, attr):
+        """
+        Get the concatenation of a log over this node and its ancestors down to the previous chunk boundary, which is
+        not included. Only call this on chunk boundaries that are ancestors of the current node, since their logs are
+        final.
+
+        :param str attr:    Name of the log attribute.
+        :return:            A tuple of (the concatenated log, the previous chunk boundary or None).
+        """
+        try:
+            return self._flat_logs[attr]
+        except KeyError:
+            pass
+
+        pieces = [ getattr(self, attr) ]
+        node = self.parent
+        while node is not None and node.depth % self.FLATTEN_CHUNK_SIZE != 0:
+            pieces.append(getattr(node, attr))
+            node = node.parent
+        r = self._concat_logs(reversed(pieces)), node
+        self._flat_logs[attr] = r
+        return r
+
+    @staticmethod
+    def _concat_logs(pieces):
+        pieces = list(pieces)
+        if all(type(piece) is array for piece in pieces):
+            out = array('Q')
+        else:
+            out = [ ]
+        for piece in pieces:
+            out.extend(piece)
+        return out
+
     def extend_actions(self, new_actions):
         self.recent_events.extend(new_actions)
 
@@ -389,10 +518,10 @@ class SimStateHistory(SimStatePlugin):
         return LambdaAttrIter(self, operator.attrgetter('recent_description'))
     @property
     def bbl_addrs(self):
-        return LambdaIterIter(self, operator.attrgetter('recent_bbl_addrs'))
+        return LambdaIterIter(self, operator.attrgetter('recent_bbl_addrs'), flat_attr='recent_bbl_addrs')
     @property
     def ins_addrs(self):
-        return LambdaIterIter(self, operator.attrgetter('recent_ins_addrs'))
+        return LambdaIterIter(self, operator.attrgetter('recent_ins_addrs'), flat_attr='recent_ins_addrs')
     @property
     def stack_actions(self):
         return LambdaIterIter(self, operator.attrgetter('recent_stack_actions'))
@@ -531,16 +660,37 @@ class LambdaAttrIter(TreeIter):
 
 
 class LambdaIterIter(LambdaAttrIter):
-    def __init__(self, start, f, reverse=True, **kwargs):
+    def __init__(self, start, f, reverse=True, flat_attr=None, **kwargs):
         LambdaAttrIter.__init__(self, start, f, **kwargs)
         self._f = f
         self._reverse = reverse
+        self._flat_attr = flat_attr
 
     def __reversed__(self):
         for hist in self._iter_nodes():
             for a in reversed(self._f(hist)) if self._reverse else self._f(hist):
                 yield a
 
+    def flattened(self):
+        """
+        Get all items in the history as one sequence, from the oldest to the newest. For address logs, this is an
+        ``array('Q')``.
+        """
+        if self._flat_attr is not None and self._end is None and self._reverse:
+            return self._start.flattened_log(self._flat_attr)
+        return self.hardcopy
+
+    @property
+    def hardcopy(self):
+        if self._flat_attr is not None and self._end is None and self._reverse:
+            return list(self._start.flattened_log(self._flat_attr))
+        return super().hardcopy
+
+    def count(self, v):
+        if self._flat_attr is not None and self._end is None and self._reverse:
+            return self._start.flattened_log(self._flat_attr).count(v)
+        return super().count(v)
+
 
 from angr.sim_state import SimState
 SimState.register_default('history', SimStateHistory)
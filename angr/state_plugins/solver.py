@@ -1,9 +1,13 @@
 import binascii
 import functools
+import itertools
+import operator
+import threading
 import time
 import logging
 from typing import TypeVar, overload, Any, Optional
 
+from cachetools import LRUCache
 from claripy import backend_manager
 
 from .plugin import SimStatePlugin
@@ -168,6 +172,252 @@ def concrete_path_list(f):
             return [ v ]
     return concrete_shortcut_list
 
+#
+# Query result caching
+#
+
+class SolverQueryCache:
+    """
+    A bounded, process-wide LRU cache of solver query results, shared by all states with the SOLVER_QUERY_CACHE option.
+
+    Results are keyed by the kind of the query, the type of the claripy solver, the structural hashes of the queried
+    expressions, the set of constraints of the state, and the extra constraints. Sibling states that forked from the
+    same parent share most of their constraints, so identical queries on them are only solved once.
+    """
+
+    def __init__(self, maxsize=100000):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        return self._cache.maxsize
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+    def get(self, key):
+        with self._lock:
+            try:
+                r = self._cache[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return r
+
+    def put(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+
+    def resize(self, maxsize):
+        """
+        Change the capacity of the cache. All cached results are dropped.
+
+        :param int maxsize: The new maximum number of cached results.
+        """
+        with self._lock:
+            self._cache = LRUCache(maxsize=maxsize)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __repr__(self):
+        return "<SolverQueryCache %d/%d entries, %d hits, %d misses>" % (len(self._cache), self._cache.maxsize,
+                                                                         self.hits, self.misses)
+
+
+query_cache = SolverQueryCache()
+
+
+class ConstraintComponent:
+    """
+    A group of constraints which are connected by shared variables, and a claripy solver holding exactly these
+    constraints. The solver is created on the first query.
+    """
+
+    __slots__ = ('variables', 'constraints', 'solver', 'satisfiable', )
+
+    def __init__(self, variables, constraints, solver=None, satisfiable=None):
+        self.variables = variables
+        self.constraints = constraints
+        self.solver = solver
+        self.satisfiable = satisfiable
+
+    def branch(self):
+        return ConstraintComponent(self.variables, self.constraints,
+                                   solver=self.solver.branch() if self.solver is not None else None,
+                                   satisfiable=self.satisfiable)
+
+
+class ConstraintPartition:
+    """
+    Partitions the constraints of a state into independent components (groups of constraints connected by shared
+    variables), and keeps a claripy solver for each component, so that queries only involve the constraints that are
+    relevant to them.
+
+    The partition belongs to one state, and is updated incrementally as constraints are added to that state. A copy
+    shares all components with its parent. Each side branches the solver of a shared component before it uses or
+    extends it, so component solvers keep their incremental state and are never used by two states.
+    """
+
+    def __init__(self):
+        self._constraints = ()  # the constraints that have been partitioned so far
+        self._concrete = ()  # constraints without any variable
+        self._variable_keys = { }  # variable -> component key
+        self._components = { }  # component key -> component
+        self._owned = set()  # keys of components which are not shared with any other partition
+        self._shared = False  # whether the dicts above are shared with another partition
+        self._next_key = 0
+
+    def copy(self):
+        o = ConstraintPartition()
+        o._constraints = self._constraints
+        o._concrete = self._concrete
+        o._variable_keys = self._variable_keys
+        o._components = self._components
+        o._next_key = self._next_key
+        o._shared = self._shared = True
+        self._owned = set()
+        return o
+
+    @property
+    def components(self):
+        """
+        The list of components.
+        """
+        return list(self._components.values())
+
+    def _unshare(self):
+        if self._shared:
+            self._variable_keys = dict(self._variable_keys)
+            self._components = dict(self._components)
+            self._shared = False
+
+    def _own(self, key):
+        """
+        Get a component which only this partition uses, with its solver created.
+        """
+        comp = self._components[key]
+        if key not in self._owned:
+            self._unshare()
+            comp = comp.branch()
+            self._components[key] = comp
+            self._owned.add(key)
+        if comp.solver is None:
+            comp.solver = claripy.Solver()
+            comp.solver.add(list(comp.constraints))
+        return comp
+
+    def update(self, constraints):
+        """
+        Partition the constraints that were added since the last update.
+
+        :param list constraints:    All constraints of the state.
+        """
+        n = len(self._constraints)
+        if len(constraints) < n or not all(map(operator.is_, constraints[:n], self._constraints)):
+            # the constraints were rewritten, e.g., by simplification. start over
+            self.__init__()
+            n = 0
+        if len(constraints) == n:
+            return
+
+        for c in constraints[n:]:
+            self._add(c)
+        self._constraints = tuple(constraints)
+
+    def _add(self, constraint):
+        variables = constraint.variables
+        if not variables:
+            self._concrete += (constraint, )
+            return
+
+        self._unshare()
+        keys = { self._variable_keys[v] for v in variables if v in self._variable_keys }
+        if not keys:
+            key = self._next_key
+            self._next_key += 1
+            self._components[key] = ConstraintComponent(frozenset(variables), (constraint, ))
+            self._owned.add(key)
+            for v in variables:
+                self._variable_keys[v] = key
+            return
+
+        # merge everything into the largest component, so that its solver state is kept
+        key = max(keys, key=lambda k: len(self._components[k].constraints))
+        comp = self._components[key]
+        if key not in self._owned:
+            comp = comp.branch()
+            self._components[key] = comp
+            self._owned.add(key)
+
+        new_variables = set(variables)
+        new_constraints = [ ]
+        for k in keys:
+            if k == key:
+                continue
+            other = self._components.pop(k)
+            self._owned.discard(k)
+            new_variables |= other.variables
+            new_constraints.extend(other.constraints)
+        new_constraints.append(constraint)
+
+        for v in new_variables:
+            self._variable_keys[v] = key
+        comp.variables = comp.variables | new_variables
+        comp.constraints = comp.constraints + tuple(new_constraints)
+        comp.satisfiable = None
+        if comp.solver is not None:
+            comp.solver.add(new_constraints)
+
+    def solver(self, constraints, variables):
+        """
+        Get a solver containing only the components of the constraints which share variables with a query, provided
+        that all other components are known to be satisfiable.
+
+        :param list constraints:    All constraints of the state.
+        :param set variables:       The variables involved in the query.
+        :return:                    A claripy solver, or None if the query must go to the full solver.
+        """
+        self.update(constraints)
+        if not all(c.is_true() for c in self._concrete):
+            return None
+
+        relevant = { self._variable_keys[v] for v in variables if v in self._variable_keys }
+        for key in list(self._components):
+            if key in relevant:
+                continue
+            comp = self._components[key]
+            if comp.satisfiable is None:
+                # the result only depends on the constraints, so it is safe to store it on a shared component, too
+                comp.satisfiable = self._own(key).satisfiable = self._own(key).solver.satisfiable()
+            if not comp.satisfiable:
+                # let the full solver deal with unsat states
+                return None
+
+        if not relevant:
+            return claripy.Solver()
+        comps = sorted((self._own(key) for key in relevant), key=lambda comp: len(comp.constraints), reverse=True)
+        if len(comps) == 1:
+            return comps[0].solver
+        # the query connects several components. query a temporary solver, and keep the components apart
+        s = comps[0].solver.branch()
+        for comp in comps[1:]:
+            s.add(list(comp.constraints))
+        return s
+
+
 #
 # The main event
 #
@@ -180,10 +430,12 @@ class SimSolver(SimStatePlugin):
 
     Any top-level variable of the claripy module can be accessed as a property of this object.
     """
-    def __init__(self, solver=None, all_variables=None, temporal_tracked_variables=None, eternal_tracked_variables=None): #pylint:disable=redefined-outer-name
+    def __init__(self, solver=None, all_variables=None, temporal_tracked_variables=None, eternal_tracked_variables=None,
+                 partition=None): #pylint:disable=redefined-outer-name
         l.debug("Creating SimSolverClaripy.")
         SimStatePlugin.__init__(self)
         self._stored_solver = solver
+        self._partition = partition
         self.all_variables = [] if all_variables is None else all_variables
         self.temporal_tracked_variables = {} if temporal_tracked_variables is None else temporal_tracked_variables
         self.eternal_tracked_variables = {} if eternal_tracked_variables is None else eternal_tracked_variables
@@ -198,6 +450,7 @@ class SimSolver(SimStatePlugin):
         if constraints is None:
             constraints = self._solver.constraints
         self._stored_solver = None
+        self._partition = None
         self._solver.add(constraints)
 
     def get_variables(self, *keys):
@@ -415,7 +668,8 @@ class SimSolver(SimStatePlugin):
 
     @SimStatePlugin.memo
     def copy(self, memo): # pylint: disable=unused-argument
-        return type(self)(solver=self._solver.branch(), all_variables=self.all_variables, temporal_tracked_variables=self.temporal_tracked_variables, eternal_tracked_variables=self.eternal_tracked_variables)
+        return type(self)(solver=self._solver.branch(), all_variables=self.all_variables, temporal_tracked_variables=self.temporal_tracked_variables, eternal_tracked_variables=self.eternal_tracked_variables,
+                          partition=self._partition.copy() if self._partition is not None else None)
 
     @error_converter
     def merge(self, others, merge_conditions, common_ancestor=None): # pylint: disable=W0613
@@ -423,6 +677,7 @@ class SimSolver(SimStatePlugin):
             [ oc._solver for oc in others ], merge_conditions,
             common_ancestor=common_ancestor._solver if common_ancestor is not None else None
         )
+        self._partition = None
         return merging_occurred
 
     @error_converter
@@ -467,6 +722,55 @@ class SimSolver(SimStatePlugin):
         else:
             return constraints.__class__((self._adjust_constraint(self.And(*constraints)),))
 
+    def _query_solver(self, exprs, extra_constraints):
+        """
+        Get the solver to run a query on. If CONSTRAINT_INDEPENDENCE is enabled, this is a solver containing only the
+        components of the constraints which share variables with the query, provided that all other components are
+        known to be satisfiable. Otherwise, it is the solver of this state.
+
+        :param exprs:               The expressions involved in the query.
+        :param extra_constraints:   The extra constraints of the query.
+        :return:                    A claripy solver.
+        """
+        solver = self._solver
+        if o.CONSTRAINT_INDEPENDENCE not in self.state.options or type(solver) is not claripy.Solver:
+            # the composite solver already does this, and other solvers have their own notion of constraints
+            return solver
+
+        variables = set()
+        for e in itertools.chain(exprs, extra_constraints):
+            if isinstance(e, claripy.ast.Base):
+                variables |= e.variables
+
+        if self._partition is None:
+            self._partition = ConstraintPartition()
+        s = self._partition.solver(solver.constraints, variables)
+        return solver if s is None else s
+
+    def _cached_query(self, kind, operands, extra_constraints, exact, query):
+        """
+        Run a solver query, consulting the process-wide query cache first if SOLVER_QUERY_CACHE is enabled.
+
+        :param str kind:            The kind of the query, e.g. "max".
+        :param tuple operands:      The non-constraint operands of the query, which must all be hashable.
+        :param extra_constraints:   The extra constraints of the query, already adjusted with _adjust_constraint_list.
+        :param exact:               The exact argument of the query.
+        :param query:               A function taking no arguments which runs the query on the solver.
+        :return:                    The result of the query.
+        """
+        if o.SOLVER_QUERY_CACHE not in self.state.options:
+            return query()
+
+        solver = self._solver
+        key = (kind, type(solver), operands, exact,
+               frozenset(hash(c) for c in solver.constraints),
+               tuple(hash(c) for c in extra_constraints))
+        r = query_cache.get(key)
+        if r is None:
+            r = query()
+            query_cache.put(key, r)
+        return r
+
     @timed_function
     @ast_stripping_decorator
     @error_converter
@@ -498,7 +802,10 @@ class SimSolver(SimStatePlugin):
         :return: a tuple of the solutions, in the form of Python primitives
         :rtype: tuple
         """
-        return self._solver.eval(e, n, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        extra_constraints = self._adjust_constraint_list(extra_constraints)
+        return self._cached_query('eval', (hash(e), n), extra_constraints, exact,
+                                  lambda: self._query_solver((e,), extra_constraints).eval(
+                                      e, n, extra_constraints=extra_constraints, exact=exact))
 
     @concrete_path_scalar
     @timed_function
@@ -518,7 +825,10 @@ class SimSolver(SimStatePlugin):
             er = self._solver.max(e, extra_constraints=self._adjust_constraint_list(extra_constraints))
             assert er <= ar
             return ar
-        return self._solver.max(e, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        extra_constraints = self._adjust_constraint_list(extra_constraints)
+        return self._cached_query('max', (hash(e),), extra_constraints, exact,
+                                  lambda: self._query_solver((e,), extra_constraints).max(
+                                      e, extra_constraints=extra_constraints, exact=exact))
 
     @concrete_path_scalar
     @timed_function
@@ -538,7 +848,10 @@ class SimSolver(SimStatePlugin):
             er = self._solver.min(e, extra_constraints=self._adjust_constraint_list(extra_constraints))
             assert ar <= er
             return ar
-        return self._solver.min(e, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        extra_constraints = self._adjust_constraint_list(extra_constraints)
+        return self._cached_query('min', (hash(e),), extra_constraints, exact,
+                                  lambda: self._query_solver((e,), extra_constraints).min(
+                                      e, extra_constraints=extra_constraints, exact=exact))
 
     @timed_function
     @ast_stripping_decorator
@@ -559,7 +872,9 @@ class SimSolver(SimStatePlugin):
             if er is True:
                 assert ar is True
             return ar
-        return self._solver.solution(e, v, extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        extra_constraints = self._adjust_constraint_list(extra_constraints)
+        return self._query_solver((e, v), extra_constraints).solution(e, v, extra_constraints=extra_constraints,
+                                                                      exact=exact)
 
     @concrete_path_bool
     @timed_function
@@ -639,7 +954,10 @@ class SimSolver(SimStatePlugin):
             if er is True:
                 assert ar is True
             return ar
-        return self._solver.satisfiable(extra_constraints=self._adjust_constraint_list(extra_constraints), exact=exact)
+        extra_constraints = self._adjust_constraint_list(extra_constraints)
+        return self._cached_query('satisfiable', (), extra_constraints, exact,
+                                  lambda: self._query_solver((), extra_constraints).satisfiable(
+                                      extra_constraints=extra_constraints, exact=exact))
 
     @timed_function
     @ast_stripping_decorator
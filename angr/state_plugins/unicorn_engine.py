@@ -4,6 +4,7 @@ import copy
 import ctypes
 import cffi # lmao
 import threading
+import weakref
 import itertools
 import pkg_resources
 import logging
@@ -11,6 +12,7 @@ import pyvex
 import claripy
 import time
 import binascii
+from array import array
 
 from ..sim_options import UNICORN_HANDLE_TRANSMIT_SYSCALL
 from ..errors import SimValueError, SimUnicornUnsupport, SimSegfaultError, SimMemoryError, SimMemoryMissingError, SimUnicornError
@@ -108,6 +110,10 @@ class Uniwrapper(unicorn.Uc if unicorn is not None else object):
         self.wrapped_mapped = set()
         self.wrapped_hooks = set()
         self.id = None
+        # page address -> content digest of concrete, read-only pages that stay mapped across runs
+        self.snapshot = { }
+        # the history of the state that last used this context
+        self.owner = None
         if thumb:
             uc_mode = arch.uc_mode_thumb
         else:
@@ -141,6 +147,7 @@ class Uniwrapper(unicorn.Uc if unicorn is not None else object):
         #l.debug("Unmapping %d bytes at %#x", size, addr)
         m = unicorn.Uc.mem_unmap(self, addr, size)
         self.wrapped_mapped.discard((addr, size))
+        self.snapshot.pop(addr, None)
         return m
 
     def mem_reset(self):
@@ -149,6 +156,36 @@ class Uniwrapper(unicorn.Uc if unicorn is not None else object):
             #l.debug("Unmapping %d bytes at %#x", size, addr)
             unicorn.Uc.mem_unmap(self, addr, size)
         self.wrapped_mapped.clear()
+        self.snapshot.clear()
+
+    def mem_reset_unsnapshotted(self):
+        """
+        Unmap all pages except for the snapshotted ones. Pages that are mapped directly to the backing store of a state
+        are never snapshotted, since the backing store may go away.
+        """
+        for addr, size in list(self.wrapped_mapped):
+            if addr in self.snapshot:
+                continue
+            unicorn.Uc.mem_unmap(self, addr, size)
+            self.wrapped_mapped.discard((addr, size))
+
+    def restore(self, memory):
+        """
+        Prepare this context for running a state, by unmapping all snapshotted pages whose contents are not the same in
+        the memory of the state. Must be called before every run.
+
+        :param memory:  The memory of the state.
+        :return:        The number of pages that stay mapped.
+        """
+        get_digest = getattr(memory, 'page_content_digest', None)
+        if get_digest is None:
+            self.mem_reset()
+            return 0
+        for addr, digest in list(self.snapshot.items()):
+            if get_digest(addr) != digest:
+                self.mem_unmap(addr, 0x1000)
+        self.mem_reset_unsnapshotted()
+        return len(self.snapshot)
 
     def hook_reset(self):
         #l.debug("Resetting hooks.")
@@ -158,12 +195,77 @@ class Uniwrapper(unicorn.Uc if unicorn is not None else object):
         self.wrapped_hooks.clear()
 
     def reset(self):
-        self.mem_reset()
+        self.mem_reset_unsnapshotted()
         #self.hook_reset()
         #l.debug("Reset complete.")
 
+
+class UniwrapperPool:
+    """
+    A pool of unicorn contexts, one per thread.
+
+    A context keeps the concrete, read-only pages (usually code) it mapped for a state, along with their content
+    digests. A state that resumes native execution gets the context that was last used by its closest ancestor, so
+    pages that are still the same in its memory do not have to be mapped again.
+    """
+
+    SIZE = 4
+    LINEAGE_DEPTH = 32
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        self.contexts = [ ]  # least recently used first
+
+    def acquire(self, arch, cache_key, thumb, state):
+        """
+        Get a context for running a state. The context is created if there is no matching one.
+        """
+        candidates = [ uc for uc in self.contexts if uc.arch == arch and uc.cache_key == cache_key ]
+        uc = self._closest_ancestor(candidates, state.history) if candidates else None
+        if uc is None and candidates:
+            uc = candidates[-1]
+
+        if uc is None:
+            uc = Uniwrapper(arch, cache_key, thumb=thumb)
+            if len(self.contexts) >= self.size:
+                self.contexts.pop(0)
+        else:
+            self.contexts.remove(uc)
+
+        uc.owner = weakref.ref(state.history)
+        self.contexts.append(uc)
+        return uc
+
+    def discard(self, uc):
+        if uc in self.contexts:
+            self.contexts.remove(uc)
+
+    def _closest_ancestor(self, candidates, history):
+        owners = { }
+        for uc in candidates:
+            owner = uc.owner() if uc.owner is not None else None
+            if owner is not None:
+                owners[id(owner)] = uc
+        h = history
+        for _ in range(self.LINEAGE_DEPTH):
+            if h is None:
+                break
+            uc = owners.get(id(h), None)
+            if uc is not None:
+                return uc
+            h = h.parent
+        return None
+
+
 _unicorn_tls = threading.local()
 _unicorn_tls.uc = None
+_unicorn_tls.pool = None
+
+def _uc_pool():
+    pool = getattr(_unicorn_tls, 'pool', None)
+    if pool is None:
+        pool = _unicorn_tls.pool = UniwrapperPool()
+    return pool
 
 class _VexCacheInfo(ctypes.Structure):
     _fields_ = [
@@ -247,6 +349,14 @@ def _load_native():
         _setup_prototype(h, 'in_cache', ctypes.c_bool, state_t, ctypes.c_uint64)
         _setup_prototype(h, 'set_map_callback', None, state_t, unicorn.unicorn.UC_HOOK_MEM_INVALID_CB)
 
+        # trace following is optional, so that older builds of the native plugin keep working
+        try:
+            _setup_prototype(h, 'set_trace', None, state_t, ctypes.POINTER(ctypes.c_uint64), ctypes.c_uint64, ctypes.c_uint64, ctypes.c_int64)
+            _setup_prototype(h, 'trace_idx', ctypes.c_uint64, state_t)
+            _setup_prototype(h, 'trace_blocks', ctypes.c_uint64, state_t)
+        except AttributeError:
+            l.info('native plugin does not support trace following')
+
         l.info('native plugin is enabled')
 
         return h
@@ -365,6 +475,14 @@ class Unicorn(SimStatePlugin):
         # the address to use for concrete transmits
         self.transmit_addr = None
 
+        # the trace to follow natively. see follow_trace()
+        self.trace = None
+        self.trace_start_idx = None
+        self.trace_slide = 0
+        self.trace_idx = None
+        self.trace_blocks = 0
+        self._trace_buffer = None
+
         self.time = None
 
         self._bullshit_cb = ctypes.cast(unicorn.unicorn.UC_HOOK_MEM_INVALID_CB(self._hook_mem_unmapped), unicorn.unicorn.UC_HOOK_MEM_INVALID_CB)
@@ -395,6 +513,11 @@ class Unicorn(SimStatePlugin):
         u.countdown_symbolic_memory = self.countdown_symbolic_memory
         u.countdown_stop_point = self.countdown_stop_point
         u.transmit_addr = self.transmit_addr
+        u.trace = self.trace
+        u.trace_start_idx = self.trace_start_idx
+        u.trace_slide = self.trace_slide
+        u.trace_idx = self.trace_idx
+        u.trace_blocks = self.trace_blocks
         u._uncache_regions = list(self._uncache_regions)
         u.gdt = self.gdt
         return u
@@ -468,6 +591,10 @@ class Unicorn(SimStatePlugin):
         del d['_uc_state']
         del d['cache_key']
         del d['_unicount']
+        # the trace is owned by whoever set it, and can be huge
+        d['trace'] = None
+        d['trace_start_idx'] = None
+        d['_trace_buffer'] = None
         return d
 
     def __setstate__(self, s):
@@ -491,22 +618,21 @@ class Unicorn(SimStatePlugin):
     def uc(self):
         new_id = next(_unicounter)
         is_thumb = self.state.arch.qemu_name == 'arm' and self.state.arch.is_thumb(self.state.addr)
+        current = getattr(_unicorn_tls, "uc", None)
         if (
-            not hasattr(_unicorn_tls, "uc") or
-            _unicorn_tls.uc is None or
-            _unicorn_tls.uc.arch != self.state.arch or
-            _unicorn_tls.uc.cache_key != self.cache_key
+            current is not None and
+            current.id == self._unicount and
+            current.arch == self.state.arch and
+            current.cache_key == self.cache_key
         ):
-            _unicorn_tls.uc = Uniwrapper(self.state.arch, self.cache_key, thumb=is_thumb)
-        elif _unicorn_tls.uc.id != self._unicount:
-            if not self._reuse_unicorn:
-                _unicorn_tls.uc = Uniwrapper(self.state.arch, self.cache_key, thumb=is_thumb)
-            else:
-                #l.debug("Reusing unicorn state!")
-                _unicorn_tls.uc.reset()
-        else:
             #l.debug("Reusing unicorn state!")
             pass
+        elif not self._reuse_unicorn:
+            if current is not None:
+                _uc_pool().discard(current)
+            _unicorn_tls.uc = Uniwrapper(self.state.arch, self.cache_key, thumb=is_thumb)
+        else:
+            _unicorn_tls.uc = _uc_pool().acquire(self.state.arch, self.cache_key, is_thumb, self.state)
 
         _unicorn_tls.uc.id = new_id
         self._unicount = new_id
@@ -514,6 +640,9 @@ class Unicorn(SimStatePlugin):
 
     @staticmethod
     def delete_uc():
+        current = getattr(_unicorn_tls, "uc", None)
+        if current is not None:
+            _uc_pool().discard(current)
         _unicorn_tls.uc = None
 
     @property
@@ -541,6 +670,23 @@ class Unicorn(SimStatePlugin):
     def set_tracking(self, track_bbls, track_stack):
         _UC_NATIVE.set_tracking(self._uc_state, track_bbls, track_stack)
 
+    def follow_trace(self, trace, trace_idx, slide):
+        """
+        Check the blocks that are executed in the next run against a trace of block addresses, natively. After the run,
+        `trace_blocks` is the number of executed blocks (at the beginning of history.recent_bbl_addrs) that followed the
+        trace, and `trace_idx` is the trace index after them. Blocks after the first one that does not follow the trace
+        are not checked. Only used if UNICORN_TRACK_BBL_ADDRS is enabled.
+
+        :param array.array trace:   The trace, as an array of type 'Q'. It is not copied.
+        :param int trace_idx:       The index in the trace of the first block that is executed.
+        :param int slide:           The difference between trace addresses and state addresses.
+        """
+        self.trace = trace
+        self.trace_start_idx = trace_idx
+        self.trace_slide = slide
+        self.trace_idx = None
+        self.trace_blocks = 0
+
     def hook(self):
         #l.debug('adding native hooks')
         _UC_NATIVE.hook(self._uc_state) # prefer to use native hooks
@@ -779,12 +925,18 @@ class Unicorn(SimStatePlugin):
 
         if bitmap.readonly:
             # old-style mapping, do it via copy
-            self.uc.mem_map(addr, 0x1000, perm)
+            uc = self.uc
+            uc.mem_map(addr, 0x1000, perm)
             # huge hack. why doesn't ctypes let you pass memoryview as void*?
-            unicorn.unicorn._uc.uc_mem_write(self.uc._uch, addr, ctypes.cast(int(ffi.cast('uint64_t', ffi.from_buffer(data))), ctypes.c_void_p), len(data))
+            unicorn.unicorn._uc.uc_mem_write(uc._uch, addr, ctypes.cast(int(ffi.cast('uint64_t', ffi.from_buffer(data))), ctypes.c_void_p), len(data))
             #self.uc.mem_write(addr, data)
             self._mapped += 1
             _UC_NATIVE.activate_page(self._uc_state, addr, int(ffi.cast('uint64_t', ffi.from_buffer(bitmap))), None)
+            if not perm & 2 and not bitmap.tobytes().strip(b'\0'):
+                # a copy of a concrete page that unicorn cannot write to. keep it mapped for states that have the same page
+                digest = getattr(self.state.memory, 'page_content_digest', lambda _: None)(addr)
+                if digest is not None:
+                    uc.snapshot[addr] = digest
         else:
             # new-style mapping, do it directly
             self.uc.mem_map_ptr(addr, 0x1000, perm, int(ffi.cast('uint64_t', ffi.from_buffer(data))))
@@ -835,6 +987,8 @@ class Unicorn(SimStatePlugin):
             # did not step at all).
             self.delete_uc()
         self._setup_unicorn()
+        kept = self.uc.restore(self.state.memory)
+        l.debug("Starting with %d pages mapped from previous runs", kept)
         try:
             self.set_regs()
         except SimValueError:
@@ -844,6 +998,13 @@ class Unicorn(SimStatePlugin):
         # tricky: using unicorn handle from unicorn.Uc object
         self._uc_state = _UC_NATIVE.alloc(self.uc._uch, self.cache_key)
 
+        # pages that stayed mapped from previous runs must be registered with the new native state, too. they are only
+        # kept if they are entirely concrete, so their bitmaps are all zeros
+        if kept:
+            concrete_bitmap = bytes(0x1000)
+            for addr in self.uc.snapshot:
+                _UC_NATIVE.activate_page(self._uc_state, addr, concrete_bitmap, None)
+
         if options.UNICORN_SYM_REGS_SUPPORT in self.state.options and \
                 options.UNICORN_AGGRESSIVE_CONCRETIZATION not in self.state.options:
             archinfo = copy.deepcopy(self.state.arch.vex_archinfo)
@@ -885,6 +1046,13 @@ class Unicorn(SimStatePlugin):
             _UC_NATIVE.uncache_pages_touching_region(self._uc_state, addr, length)
         self._uncache_regions = []
 
+        self.trace_idx = None
+        self.trace_blocks = 0
+        if self.trace is not None and self.trace_start_idx is not None and hasattr(_UC_NATIVE, 'set_trace'):
+            self._trace_buffer = (ctypes.c_uint64 * len(self.trace)).from_buffer(self.trace)
+            _UC_NATIVE.set_trace(self._uc_state, self._trace_buffer, len(self.trace), self.trace_start_idx,
+                                 self.trace_slide)
+
         addr = self.state.solver.eval(self.state.ip)
         l.info('started emulation at %#x (%d steps)', addr, self.max_steps if step is None else step)
         self.time = time.time()
@@ -896,6 +1064,10 @@ class Unicorn(SimStatePlugin):
         self.get_regs()
         self.steps = _UC_NATIVE.step(self._uc_state)
         self.stop_reason = _UC_NATIVE.stop_reason(self._uc_state)
+        if self._trace_buffer is not None:
+            self.trace_idx = _UC_NATIVE.trace_idx(self._uc_state)
+            self.trace_blocks = _UC_NATIVE.trace_blocks(self._uc_state)
+            self._trace_buffer = None
 
         # figure out why we stopped
         if self.stop_reason == STOP.STOP_SYMBOLIC_REG:
@@ -993,7 +1165,7 @@ class Unicorn(SimStatePlugin):
             #bbl_addr_count = _UC_NATIVE.bbl_addr_count(self._uc_state)
             # why is bbl_addr_count unused?
             if self.steps:
-                self.state.history.recent_bbl_addrs = bbl_addrs[:self.steps]
+                self.state.history.recent_bbl_addrs = array('Q', bbl_addrs[:self.steps])
         # get the stack pointers
         if options.UNICORN_TRACK_STACK_POINTERS in self.state.options:
             stack_pointers = _UC_NATIVE.stack_pointers(self._uc_state)
@@ -1016,6 +1188,7 @@ class Unicorn(SimStatePlugin):
         #l.debug('deallocting native state %#x', self._uc_state)
         _UC_NATIVE.dealloc(self._uc_state)
         self._uc_state = None
+        self._trace_buffer = None
 
         # there's something we're not properly resetting for syscalls, so
         # we'll clear the state when they happen
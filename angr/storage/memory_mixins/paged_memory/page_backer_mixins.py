@@ -1,10 +1,15 @@
-from typing import Union, List, Generator, Tuple
+from typing import Union, List, Generator, Tuple, Optional
+import os
+import mmap
+import bisect
 import logging
+import weakref
 
 import claripy
 import cle
 
 from .paged_memory_mixin import PagedMemoryMixin
+from .... import sim_options as options
 
 l = logging.getLogger(__name__)
 
@@ -25,6 +30,132 @@ class NotMemoryview:
     def __setitem__(self, k, v):
         memoryview(self.obj)[self.offset:self.offset+self.size][k] = v
 
+    def __getstate__(self):
+        if isinstance(self.obj, MappedFile):
+            return self.__dict__
+        # only serialize the part of the backer that we refer to, instead of the entire backer
+        return {'obj': bytes(self[:]), 'offset': 0, 'size': self.size}
+
+
+class MappedFile(mmap.mmap):
+    """
+    A read-only memory mapping of an entire file. Unlike a plain mmap object, it can be pickled (it is re-mapped from
+    the same path when unpickled). Use MappedFile.open() to get one, so that every memory in the process shares the
+    same mapping of a file.
+    """
+    _open_files = weakref.WeakValueDictionary()
+
+    def __new__(cls, path):
+        with open(path, "rb") as f:
+            o = super().__new__(cls, f.fileno(), 0, access=mmap.ACCESS_READ)
+        o.path = path
+        return o
+
+    @classmethod
+    def open(cls, path):
+        path = os.path.realpath(path)
+        try:
+            o = cls._open_files[path]
+        except KeyError:
+            o = cls(path)
+            cls._open_files[path] = o
+        return o
+
+    def __reduce__(self):
+        return MappedFile.open, (self.path,)
+
+
+class FileBackedRegions:
+    """
+    The list of address ranges in a loader that are loaded from a range of a file on disk, which means their pages can
+    be served from a memory mapping of that file instead of from the loader's backers.
+
+    Bytes in these ranges may still differ from the file, e.g., where relocations were applied or where loader.memory
+    was written to. Every page is compared against the loader's memory once, the first time it is requested with
+    match(), and only pages that are identical are served from the file. Writes to loader.memory that happen after a
+    page has been compared are not detected.
+    """
+    _cache = weakref.WeakKeyDictionary()
+
+    def __init__(self, loader: cle.Loader):
+        regions = [ ]
+        for obj in loader.all_objects:
+            path = obj.binary
+            if not isinstance(path, str) or not os.path.isfile(path):
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if size == 0:
+                continue
+            delta = obj.mapped_base - obj.linked_base
+            for seg in getattr(obj, 'segments', ()):
+                file_offset = getattr(seg, 'offset', None)
+                filesize = getattr(seg, 'filesize', 0)
+                if file_offset is None or not filesize or file_offset + filesize > size:
+                    continue
+                regions.append((seg.vaddr + delta, seg.vaddr + delta + filesize, path, file_offset))
+
+        regions.sort()
+        self._starts = [ r[0] for r in regions ]
+        self._regions = regions
+        # (addr, size) -> whether the bytes in the loader's memory are identical to the file
+        self._matches = { }
+
+    @classmethod
+    def for_loader(cls, loader: cle.Loader) -> 'FileBackedRegions':
+        try:
+            return cls._cache[loader]
+        except KeyError:
+            o = cls(loader)
+            cls._cache[loader] = o
+            return o
+
+    def __len__(self):
+        return len(self._regions)
+
+    def find(self, addr: int, size: int) -> Optional[Tuple[str,int]]:
+        """
+        Find the file range backing [addr, addr + size).
+
+        :param addr:    The start address.
+        :param size:    The number of bytes.
+        :return:        A tuple of (file path, file offset), or None if the range is not entirely backed by one file
+                        region.
+        """
+        idx = bisect.bisect_right(self._starts, addr) - 1
+        if idx < 0:
+            return None
+        start, end, path, file_offset = self._regions[idx]
+        if addr + size > end:
+            return None
+        return path, file_offset + addr - start
+
+    def match(self, clemory: cle.Clemory, addr: int, size: int, mapped: mmap.mmap, file_offset: int) -> bool:
+        """
+        Check whether the loader's memory at [addr, addr + size) is identical to the file mapping at the given offset.
+        The result is computed once and cached.
+
+        :param clemory:     The loader's memory.
+        :param addr:        The start address.
+        :param size:        The number of bytes.
+        :param mapped:      The mapping of the file.
+        :param file_offset: The offset in the file that backs addr.
+        :return:            True if the bytes are identical, False otherwise.
+        """
+        key = addr, size
+        try:
+            return self._matches[key]
+        except KeyError:
+            pass
+        try:
+            matches = clemory.load(addr, size) == mapped[file_offset:file_offset + size]
+        except KeyError:
+            matches = False
+        self._matches[key] = matches
+        return matches
+
 
 class ClemoryBackerMixin(PagedMemoryMixin):
     def __init__(self, cle_memory_backer=None, **kwargs):
@@ -52,6 +183,11 @@ class ClemoryBackerMixin(PagedMemoryMixin):
 
         addr = pageno * self.page_size
 
+        if self._cle_loader is not None and options.MMAP_PAGE_BACKER in self.state.options:
+            new_page = self._initialize_page_from_file(pageno, addr)
+            if new_page is not None:
+                return new_page
+
         try:
             backer_iter: BackerIterType = self._clemory_backer.backers(addr)
             backer_start, backer = next(backer_iter)
@@ -80,6 +216,40 @@ class ClemoryBackerMixin(PagedMemoryMixin):
                        **kwargs)
         return new_page
 
+    def _initialize_page_from_file(self, pageno: int, addr: int):
+        """
+        Create a page that references the memory-mapped contents of the loaded file directly, without copying them.
+        The page is only materialized into private memory when it is written to.
+
+        :param pageno:  The page number.
+        :param addr:    The address of the page.
+        :return:        The new page, or None if this page cannot be served from a file mapping.
+        """
+        try:
+            new_from_shared = self.PAGE_TYPE.new_from_shared
+        except AttributeError:
+            return None
+
+        regions = FileBackedRegions.for_loader(self._cle_loader)
+        r = regions.find(addr, self.page_size)
+        if r is None:
+            return None
+        path, file_offset = r
+
+        try:
+            mapped = MappedFile.open(path)
+        except (OSError, ValueError):
+            l.debug("Failed to map %s.", path, exc_info=True)
+            return None
+
+        # relocated pages and pages that were written to through loader.memory go through the regular backers
+        if not regions.match(self._clemory_backer, addr, self.page_size, mapped, file_offset):
+            return None
+
+        permissions = self._cle_permissions_lookup(addr)
+        return new_from_shared(NotMemoryview(mapped, file_offset, self.page_size),
+                               **self._page_kwargs(pageno, permissions))
+
     def _data_from_backer(self, addr: int, backer: BackerType, backer_start: int,
                           backer_iter: BackerIterType) -> claripy.ast.BV:
         # initialize the page
@@ -8,6 +8,7 @@ import claripy
 from angr.storage.memory_mixins import MemoryMixin
 from angr.storage.memory_mixins.paged_memory.pages import PageType, ListPage, UltraPage
 from ....errors import SimMemoryError
+from .... import sim_options as options
 
 # yeet
 ffi = cffi.FFI()
@@ -15,6 +16,83 @@ ffi = cffi.FFI()
 l = logging.getLogger(__name__)
 
 
+class LayeredPageTable:
+    """
+    A page table made of a private layer on top of a chain of frozen layers that are shared with other page tables.
+    Copying freezes the private layer and gives both sides a new, empty private layer, so copying is O(1) and writes
+    after a fork only go into the private layer of the writer.
+    """
+
+    __slots__ = ('_layers', '_top', )
+
+    # the chain of frozen layers is collapsed into a single layer once it grows longer than this
+    MAX_LAYERS = 16
+
+    def __init__(self, pages=None, layers=()):
+        self._layers: Tuple[Dict[int, Optional[PageType]], ...] = layers  # oldest first
+        self._top: Dict[int, Optional[PageType]] = dict(pages) if pages else {}
+
+    def copy(self) -> 'LayeredPageTable':
+        if self._top:
+            layers = self._layers + (self._top, )
+            if len(layers) > self.MAX_LAYERS:
+                layers = (self._flatten(layers), )
+            self._layers = layers
+            self._top = {}
+        return LayeredPageTable(layers=self._layers)
+
+    @staticmethod
+    def _flatten(layers) -> Dict[int, Optional[PageType]]:
+        flattened = {}
+        for layer in layers:
+            flattened.update(layer)
+        return flattened
+
+    def _merged(self) -> Dict[int, Optional[PageType]]:
+        if not self._layers:
+            return self._top
+        return self._flatten(self._layers + (self._top, ))
+
+    def __getitem__(self, pageno: int) -> Optional[PageType]:
+        try:
+            return self._top[pageno]
+        except KeyError:
+            pass
+        for layer in reversed(self._layers):
+            try:
+                return layer[pageno]
+            except KeyError:
+                pass
+        raise KeyError(pageno)
+
+    def __setitem__(self, pageno: int, page: Optional[PageType]):
+        self._top[pageno] = page
+
+    def __contains__(self, pageno: int) -> bool:
+        return pageno in self._top or any(pageno in layer for layer in self._layers)
+
+    def __iter__(self):
+        return iter(self._merged())
+
+    def __len__(self):
+        return len(self._merged())
+
+    def get(self, pageno: int, default=None) -> Optional[PageType]:
+        try:
+            return self[pageno]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self._merged().keys()
+
+    def values(self):
+        return self._merged().values()
+
+    def items(self):
+        return self._merged().items()
+
+
 class PagedMemoryMixin(MemoryMixin):
     """
     A bottom-level storage mechanism. Dispatches reads to individual pages, the type of which is the PAGE_TYPE class
@@ -23,7 +101,8 @@ class PagedMemoryMixin(MemoryMixin):
     SUPPORTS_CONCRETE_LOAD = True
     PAGE_TYPE: Type[PageType] = None  # must be provided in subclass
 
-    def __init__(self,  page_size=0x1000, default_permissions=3, permissions_map=None, page_kwargs=None, **kwargs):
+    def __init__(self,  page_size=0x1000, default_permissions=3, permissions_map=None, page_kwargs=None,
+                 cow_page_table=None, **kwargs):
         super().__init__(**kwargs)
         self.page_size = page_size
         self._extra_page_kwargs = page_kwargs if page_kwargs is not None else {}
@@ -32,28 +111,68 @@ class PagedMemoryMixin(MemoryMixin):
         self._default_permissions = default_permissions
         self._pages: Dict[int, Optional[PageType]] = {}
 
+        # copy-on-write page table. when enabled, self._pages becomes a LayeredPageTable on the first copy, copies share
+        # all pages until they are written to, and page ownership is tracked in self._owned_pages instead of with
+        # per-page reference counts.
+        # None means "decide based on the state options once we have a state".
+        self._cow_page_table: Optional[bool] = cow_page_table
+        self._owned_pages: Set[int] = set()
+
     def __del__(self):
+        if self._cow_page_table:
+            # pages are never reference-counted in this mode
+            return
         # a thought: we could support mapping pages in multiple places in memory if here we just kept a set of released
         # page ids and never released any page more than once
         for page in self._pages.values():
             if page is not None:
                 page.release_shared()
 
+    def set_state(self, state):
+        super().set_state(state)
+        if self._cow_page_table is None:
+            self._cow_page_table = options.COW_PAGE_TABLE in state.options
+
     @MemoryMixin.memo
     def copy(self, memo):
         o = super().copy(memo)
 
         o.page_size = self.page_size
-        o._pages = dict(self._pages)
         o._permissions_map = self._permissions_map
         o._default_permissions = self._default_permissions
+        o._cow_page_table = self._cow_page_table
+
+        if self._cow_page_table:
+            # share all existing page table entries in a frozen layer. new entries go into a private layer on each side,
+            # and nobody owns any page until they have copied it
+            if not isinstance(self._pages, LayeredPageTable):
+                self._pages = LayeredPageTable(self._pages)
+            o._pages = self._pages.copy()
+            o._owned_pages = set()
+            self._owned_pages = set()
+            return o
 
+        o._pages = dict(self._pages)
         for page in o._pages.values():
             if page is not None:
                 page.acquire_shared()
 
         return o
 
+    def _cow_store_page(self, pageno: int, page: Optional[PageType], owned: bool):
+        """
+        Put a page into the page table when the copy-on-write page table is enabled.
+
+        :param pageno:  The page number.
+        :param page:    The page, or None to mark the page as unmapped.
+        :param owned:   Whether this memory is the only holder of the page, i.e., whether it can be written in place.
+        """
+        self._pages[pageno] = page
+        if owned:
+            self._owned_pages.add(pageno)
+        else:
+            self._owned_pages.discard(pageno)
+
     def _get_page(self, pageno: int, writing: bool, **kwargs) -> PageType:
         force_default = True
         # force_default means don't consult any "backers"
@@ -64,12 +183,27 @@ class PagedMemoryMixin(MemoryMixin):
             page = None
             force_default = False
 
+        if self._cow_page_table:
+            if page is None:
+                page = self._initialize_page(pageno, force_default=force_default, **kwargs)
+                # pages created from shared backer data start out with an extra reference, and must be copied before
+                # they are written to
+                self._cow_store_page(pageno, page, page.refcount == 1)
+
+            if writing:
+                if pageno not in self._owned_pages:
+                    page = page.copy({})
+                    self._cow_store_page(pageno, page, True)
+                page.invalidate_digest()
+            return page
+
         if page is None:
             page = self._initialize_page(pageno, force_default=force_default, **kwargs)
             self._pages[pageno] = page
 
         if writing:
             page = page.acquire_unique()
+            page.invalidate_digest()
             self._pages[pageno] = page
         return page
 
@@ -268,12 +402,19 @@ class PagedMemoryMixin(MemoryMixin):
             raise SimMemoryError("Page is already mapped")
 
         page = self._initialize_default_page(pageno, permissions=permissions, **kwargs)
-        self._pages[pageno] = page
+        if self._cow_page_table:
+            self._cow_store_page(pageno, page, True)
+        else:
+            self._pages[pageno] = page
         if init_zero:
             page.store(0, None, size=self.page_size, endness='Iend_BE', page_addr=pageno*self.page_size, memory=self,
                        **kwargs)
 
     def _unmap_page(self, pageno, **kwargs):
+        if self._cow_page_table:
+            if self._pages.get(pageno, None) is not None:
+                self._cow_store_page(pageno, None, False)
+            return
         try:
             if self._pages[pageno] is not None:
                 self._pages[pageno].release_shared()
@@ -352,8 +493,7 @@ class PagedMemoryMixin(MemoryMixin):
                 else:
                     if not with_bitmap:
                         return memoryview(bytes(bytes_out))[:byte_idx]
-                    for byte_i in range(byte_idx, byte_idx + byte_size):
-                        bitmap_out[byte_i] = 1
+                    bitmap_out[byte_idx:byte_idx + byte_size] = b'\x01' * byte_size
 
                 bit_idx += len(element)
                 if bit_idx % byte_width != 0:
@@ -370,6 +510,14 @@ class PagedMemoryMixin(MemoryMixin):
             else:
                 return memoryview(b'')
 
+    @staticmethod
+    def _concrete_prefix_length(bitmap) -> int:
+        """
+        Get the number of leading concrete bytes (bytes whose bitmap entry is zero) in a symbolic bitmap.
+        """
+        bitmap = bytes(bitmap)
+        return len(bitmap) - len(bitmap.lstrip(b'\x00'))
+
     def concrete_load(self, addr, size, writing=False, with_bitmap=False, **kwargs):
         pageno, offset = self._divide_addr(addr)
         subsize = min(size, self.page_size - offset)
@@ -387,22 +535,20 @@ class PagedMemoryMixin(MemoryMixin):
 
         data, bitmap = page.concrete_load(offset, subsize, **kwargs)
         if with_bitmap:
-            return data, bitmap
+            if subsize == size:
+                return data, bitmap
+            return self._concrete_load_with_bitmap(pageno, data, bitmap, size - subsize, writing, **kwargs)
 
         # everything from here on out has exactly one goal: to maximize the amount of concrete data
         # we can return (up to the limit!)
-        for i, byte in enumerate(bitmap):
-            if byte != 0:
-                break
-        else:
-            i = len(bitmap)
-
+        i = self._concrete_prefix_length(bitmap)
         if i != subsize:
             return data[:i]
 
         size -= subsize
 
         physically_adjacent = True
+        chunks = None
         while size:
             offset = 0
             max_pageno = (1 << self.state.arch.bits) // self.page_size
@@ -417,11 +563,7 @@ class PagedMemoryMixin(MemoryMixin):
             else:
 
                 newdata, bitmap = concrete_load(offset, subsize, **kwargs)
-                for i, byte in enumerate(bitmap):
-                    if byte != 0:
-                        break
-                else:
-                    i = len(bitmap)
+                i = self._concrete_prefix_length(bitmap)
 
                 # magic: check if the memory regions are physically adjacent
                 if physically_adjacent and ffi.cast(ffi.BVoidP, ffi.from_buffer(data)) + len(data) == ffi.cast(ffi.BVoidP, ffi.from_buffer(newdata)):
@@ -434,18 +576,55 @@ class PagedMemoryMixin(MemoryMixin):
                                                                                          ffi.from_buffer(obj))
                     data = memoryview(obj)[data_offset:data_offset + len(data) + i]
                 else:
-                    # they are not adjacent - create a new bytearray to hold data
-                    physically_adjacent = False
-                    bytes_out = bytearray(data) + bytearray(newdata[:i])
-                    data = memoryview(bytes_out)
+                    # they are not adjacent - collect the chunks and join them once we are done
+                    if physically_adjacent:
+                        physically_adjacent = False
+                        chunks = [data]
+                    chunks.append(newdata[:i])
 
                 if i != subsize:
                     break
 
                 size -= subsize
 
+        if chunks is not None:
+            return memoryview(b''.join(chunks))
         return data
 
+    def _concrete_load_with_bitmap(self, pageno, data, bitmap, size, writing, **kwargs):
+        """
+        Continue a concrete load with bitmap across page boundaries. The data and bitmap of all pages are gathered and
+        joined into one contiguous buffer each, and the load stops at the first page which is not mapped.
+
+        :param int pageno:  The page number of the first page, which has already been loaded.
+        :param data:        The data of the first page.
+        :param bitmap:      The symbolic bitmap of the first page.
+        :param int size:    The number of bytes left to load after the first page.
+        :param bool writing: Whether the pages will be written to.
+        :return:            A tuple of (data, bitmap).
+        """
+        data_chunks = [data]
+        bitmap_chunks = [bitmap]
+        max_pageno = (1 << self.state.arch.bits) // self.page_size
+
+        while size:
+            pageno = (pageno + 1) % max_pageno
+            subsize = min(size, self.page_size)
+            try:
+                page = self._get_page(pageno, writing, **kwargs)
+            except SimMemoryError:
+                break
+
+            if page.SUPPORTS_CONCRETE_LOAD:
+                newdata, newbitmap = page.concrete_load(0, subsize, **kwargs)
+            else:
+                newdata, newbitmap = self._load_to_memoryview(pageno * self.page_size, subsize, True)
+            data_chunks.append(newdata)
+            bitmap_chunks.append(newbitmap)
+            size -= subsize
+
+        return memoryview(b''.join(data_chunks)), memoryview(b''.join(bitmap_chunks))
+
     def changed_bytes(self, other) -> Set[int]:
         my_pages = set(self._pages)
         other_pages = set(other._pages)
@@ -462,10 +641,11 @@ class PagedMemoryMixin(MemoryMixin):
 
             if (my_page is None) ^ (other_page is None):
                 changes.update(range(pageno * self.page_size, (pageno + 1) * self.page_size))
-            elif my_page is None:
+            elif my_page is None or my_page.content_digest == other_page.content_digest:
                 pass
             else:
-                changes.update(my_page.changed_bytes(other_page, page_addr=pageno * self.page_size))
+                page_addr = pageno * self.page_size
+                changes.update(page_addr + off for off in my_page.changed_bytes(other_page, page_addr=page_addr))
 
         return changes
 
@@ -482,8 +662,8 @@ class PagedMemoryMixin(MemoryMixin):
             other_page = other._pages[pageno]
 
             if (my_page is None) ^ (other_page is None):
-                changes.update(pageno)
-            elif my_page is None:
+                changes.add(pageno)
+            elif my_page is None or my_page.content_digest == other_page.content_digest:
                 pass
             else:
                 if my_page.changed_bytes(other_page, page_addr=pageno * self.page_size):
@@ -491,6 +671,17 @@ class PagedMemoryMixin(MemoryMixin):
 
         return changes
 
+    def page_content_digest(self, addr: int) -> Optional[int]:
+        """
+        Get the content digest of the page that contains an address, without initializing the page.
+
+        :param addr:    The address.
+        :return:        The content digest of the page, or None if the page is not initialized.
+        """
+        pageno, _ = self._divide_addr(addr)
+        page = self._pages.get(pageno, None)
+        return None if page is None else page.content_digest
+
     def _replace_all(self, addrs: Iterable[int], old: claripy.ast.BV, new: claripy.ast.BV):
 
         page_offsets: Dict[Set[int]] = defaultdict(set)
@@ -499,9 +690,7 @@ class PagedMemoryMixin(MemoryMixin):
             page_offsets[page_no].add(page_offset)
 
         for page_no, offsets in page_offsets.items():
-            page = self._pages[page_no]
-            page = page.acquire_unique()
-            self._pages[page_no] = page
+            page = self._get_page(page_no, True)
             page.replace_all_with_offsets(offsets, old, new, memory=self)
 
     def copy_contents(self, dst, src, size, condition=None, **kwargs):
@@ -535,7 +724,8 @@ class PagedMemoryMixin(MemoryMixin):
             else:
                 #l.warning("Page " + str(pageno) + " flushed!")
                 flushed.append((pageno, self.page_size))
-        self._pages = new_page_dict
+        self._pages = LayeredPageTable(new_page_dict) if self._cow_page_table else new_page_dict
+        self._owned_pages.intersection_update(new_page_dict)
         return flushed
 
 class ListPagesMixin(PagedMemoryMixin):
@@ -5,8 +5,9 @@ from .cooperation import CooperationBase, MemoryObjectMixin
 from .ispo_mixin import ISPOMixin
 from .refcount_mixin import RefcountMixin
 from .permissions_mixin import PermissionsMixin
+from .content_digest_mixin import ContentDigestMixin
 
-class PageBase(RefcountMixin, CooperationBase, ISPOMixin, PermissionsMixin, MemoryMixin):
+class PageBase(RefcountMixin, ContentDigestMixin, CooperationBase, ISPOMixin, PermissionsMixin, MemoryMixin):
     """
     This is a fairly succinct definition of the contract between PagedMemoryMixin and its constituent pages:
 
@@ -17,6 +18,8 @@ class PageBase(RefcountMixin, CooperationBase, ISPOMixin, PermissionsMixin, Memo
     - To support COW, we use the RefcountMixin and the ISPOMixin (which adds the contract element that ``memory=self``
       be passed to every method call)
     - Pages have permissions associated with them, stored in the PermissionsMixin.
+    - Pages carry a content digest (ContentDigestMixin) which is replaced whenever the page is acquired for writing,
+      so that memory diffing can skip pages which are known to be identical.
 
     Read the docstrings for each of the constituent classes to understand the nuances of their functionalities
     """
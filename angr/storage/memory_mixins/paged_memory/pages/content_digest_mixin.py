@@ -0,0 +1,47 @@
+import os
+import random
+import itertools
+
+from angr.storage.memory_mixins import MemoryMixin
+
+
+def _new_digest_source():
+    # digests are unique across processes, so pages of states that were created in different processes (e.g. forked
+    # workers, or states that were pickled) never compare equal by accident
+    return itertools.count(random.getrandbits(64) << 64)
+
+
+_digest_source = _new_digest_source()
+
+
+def _reseed_digest_source():
+    global _digest_source  # pylint:disable=global-statement
+    _digest_source = _new_digest_source()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_digest_source)
+
+
+class ContentDigestMixin(MemoryMixin):
+    """
+    This mixin adds a content digest to a page: an opaque token which is preserved by copying and replaced whenever
+    the page is acquired for writing or modified in place, including when a load fills in default values. Two pages
+    with the same digest are guaranteed to hold the same contents, which lets memory diffing skip them in O(1). Pages
+    with different digests may still hold the same contents.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.content_digest = next(_digest_source)
+
+    def copy(self, memo):
+        o = super().copy(memo)
+        o.content_digest = self.content_digest
+        return o
+
+    def invalidate_digest(self) -> None:
+        """
+        Call this function before modifying the contents of this page. Every method of a page that modifies it in place
+        must call it.
+        """
+        self.content_digest = next(_digest_source)
@@ -58,6 +58,7 @@ class ListPage(MemoryObjectMixin, PageBase):
         mutates result to generate a new memory object and replace the last entry in it, which is None. Then, it will
         insert the new memory object into self.content.
         """
+        self.invalidate_digest()
         global_end_addr = addr + page_addr
         global_start_addr = result[-1][0]
         size = global_end_addr - global_start_addr
@@ -71,6 +72,8 @@ class ListPage(MemoryObjectMixin, PageBase):
         if not cooperate:
             data = self._force_store_cooperation(addr, data, size, endness, memory=memory, **kwargs)
 
+        self.invalidate_digest()
+
         if size == len(self.content) and addr == 0:
             self.sinkhole = data
             self.content = [None]*len(self.content)
@@ -80,6 +83,7 @@ class ListPage(MemoryObjectMixin, PageBase):
 
     def merge(self, others: List['ListPage'], merge_conditions, common_ancestor=None, page_addr: int=None,
               memory=None):
+        self.invalidate_digest()
 
         changed_offsets = set()
         for other in others:
@@ -232,6 +236,7 @@ class ListPage(MemoryObjectMixin, PageBase):
 
     def _replace_mo(self, old_mo: SimMemoryObject, new_mo: SimMemoryObject, page_addr: int,
                     page_size: int) -> SimMemoryObject:
+        self.invalidate_digest()
         if self.sinkhole is old_mo:
             self.sinkhole = new_mo
         else:
@@ -40,7 +40,11 @@ class UltraPage(MemoryObjectMixin, PageBase):
 
     def copy(self, memo):
         o = super().copy(memo)
-        o.concrete_data = bytearray(self.concrete_data)
+        if type(self.concrete_data) is bytearray:
+            o.concrete_data = bytearray(self.concrete_data)
+        else:
+            # shared backer data. materialize it in one go
+            o.concrete_data = bytearray(self.concrete_data[:])
         o.symbolic_bitmap = bytearray(self.symbolic_bitmap)
         o.symbolic_data = SortedDict(self.symbolic_data)
         return o
@@ -60,6 +64,7 @@ class UltraPage(MemoryObjectMixin, PageBase):
                 result[-1] = (result[-1][0], new_obj)
 
         def fill(end):
+            self.invalidate_digest()
             global_end_addr = end
             global_start_addr = result[-1][0]
             size = global_end_addr - global_start_addr
@@ -102,6 +107,8 @@ class UltraPage(MemoryObjectMixin, PageBase):
             data = self._force_store_cooperation(addr, data, size, endness, page_addr=page_addr, memory=memory,
                                                  **kwargs)
 
+        self.invalidate_digest()
+
         if size >= memory.page_size - addr:
             size = memory.page_size - addr
 
@@ -161,6 +168,7 @@ class UltraPage(MemoryObjectMixin, PageBase):
 
     def merge(self, others: List['UltraPage'], merge_conditions, common_ancestor=None, page_addr: int=None,
               memory=None):
+        self.invalidate_digest()
 
         all_pages = [self] + others
         merged_to = None
@@ -283,6 +291,17 @@ class UltraPage(MemoryObjectMixin, PageBase):
             return self.concrete_data[addr:addr+size], memoryview(self.symbolic_bitmap)[addr:addr+size]
 
     def changed_bytes(self, other, page_addr=None) -> Set[int]:
+        if self.content_digest == other.content_digest:
+            return set()
+
+        if not any(self.symbolic_bitmap) and not any(other.symbolic_bitmap):
+            # fast path: both pages are fully concrete
+            my_data = self.concrete_data if type(self.concrete_data) is bytearray else self.concrete_data[:]
+            other_data = other.concrete_data if type(other.concrete_data) is bytearray else other.concrete_data[:]
+            if my_data == other_data:
+                return set()
+            return { addr for addr, (a, b) in enumerate(zip(my_data, other_data)) if a != b }
+
         changes = set()
         for addr in range(len(self.symbolic_bitmap)):
             if self.symbolic_bitmap[addr] != other.symbolic_bitmap[addr]:
@@ -396,6 +415,8 @@ class UltraPage(MemoryObjectMixin, PageBase):
         if (old.object.size() if not old.is_bytes else len(old.object) * self.state.arch.byte_width) != new_content.size():
             raise SimMemoryError("memory objects can only be replaced by the same length content")
 
+        self.invalidate_digest()
+
         new = SimMemoryObject(new_content, old.base, old.endness, byte_width=old._byte_width)
         for k in list(self.symbolic_data):
             if self.symbolic_data[k] is old:
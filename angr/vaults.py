@@ -1,5 +1,6 @@
 import collections.abc
 import contextlib
+import hashlib
 import threading
 import tempfile
 import weakref
@@ -25,6 +26,13 @@ class VaultPickler(pickle.Pickler):
         self.vault = vault
         self.assigned_objects = assigned_objects
 
+    def dump(self, obj):
+        if SimStateHistory in self.vault.uuid_dedup:
+            # every history node is stored separately, so each of them only needs to refer to its parent
+            with SimStateHistory.pickle_parent_only():
+                return super().dump(obj)
+        return super().dump(obj)
+
     def persistent_id(self, obj):
         if any(obj is o for o in self.assigned_objects):
             return None
@@ -36,12 +44,33 @@ class VaultPickler(pickle.Pickler):
         # l.debug("Persistent store: %s %s", obj, pid)
         return self.vault._store(obj, pid)
 
+class DeferredLoad:
+    """
+    A placeholder for a persistent object which is loaded after the object that refers to it.
+    """
+
+    __slots__ = ('oid', )
+
+    def __init__(self, oid):
+        self.oid = oid
+
 class VaultUnpickler(pickle.Unpickler):
-    def __init__(self, vault, file, *args, **kwargs):
+    def __init__(self, vault, file, *args, defer_prefix=None, **kwargs):
+        """
+        A persistence-aware unpickler.
+        Persistent objects whose IDs start with 'defer_prefix' are not loaded, unless they are cached. They are
+        replaced with DeferredLoad placeholders instead.
+        """
         super().__init__(file, *args, **kwargs)
         self.vault = vault
+        self.defer_prefix = defer_prefix
 
     def persistent_load(self, pid):
+        if self.defer_prefix is not None and pid.startswith(self.defer_prefix):
+            try:
+                return self.vault._object_cache[pid]
+            except KeyError:
+                return DeferredLoad(pid)
         return self.vault._load(pid)
 
 class Vault(collections.abc.MutableMapping):
@@ -84,7 +113,13 @@ class Vault(collections.abc.MutableMapping):
             claripy.ast.Base, claripy.ast.BV, claripy.ast.FP, claripy.ast.Bool, claripy.ast.Int, claripy.ast.Bits,
         }
         self.module_dedup = set() # {'claripy', 'angr', 'archinfo', 'pyvex' } # cle causes recursion
-        self.uuid_dedup = { SimState, Project }
+        self.uuid_dedup = { SimState, Project, SimStateHistory }
+        # objects that are stored once per distinct content, keyed on a hash of their serialized contents. states that
+        # forked from the same parent share most of their memory pages, so each of them only adds the pages it has
+        # modified
+        self.content_dedup = { PageBase }
+        self._serialized = { }
+        self._history_prefix = SimStateHistory.__name__ + '-'
         self.unsafe_key_baseclasses = {
             claripy.ast.Base, SimType
         }
@@ -99,6 +134,17 @@ class Vault(collections.abc.MutableMapping):
             self._object_cache[oid] = o
             return oid
 
+        if any(isinstance(o,c) for c in self.content_dedup):
+            # these are not cached: every load produces a new object, since they are mutable and must not be shared
+            # between the states that are loaded
+            f = io.BytesIO()
+            VaultPickler(self, f, assigned_objects=(o,)).dump(o)
+            data = f.getvalue()
+            oid = o.__class__.__name__ + "-" + hashlib.sha256(data).hexdigest()
+            # keep the serialized contents around for the _store() call that follows
+            self._serialized[oid] = data
+            return oid
+
         if any(isinstance(o,c) for c in self.unsafe_key_baseclasses):
             return None
 
@@ -151,9 +197,41 @@ class Vault(collections.abc.MutableMapping):
             return self._object_cache[oid]
         except KeyError:
             # l.debug("... cached failed")
+            if oid.startswith(self._history_prefix):
+                return self._load_history(oid)
             with self._read_context(oid) as u:
                 return VaultUnpickler(self, u).load()
 
+    def _load_history(self, oid):
+        """
+        Loads a history node and all of its ancestors which are not loaded yet. Each node only refers to its parent, so
+        the chain is walked in a loop instead of recursing once per node.
+
+        :param oid: the ID of the history node
+        """
+        chain = [ ]
+        while True:
+            with self._read_context(oid) as u:
+                h = VaultUnpickler(self, u, defer_prefix=self._history_prefix).load()
+            # loaded histories are shared, like the ancestry they were stored from
+            self._object_cache[oid] = h
+            self._uuid_cache[h] = oid
+            chain.append(h)
+            if not isinstance(h.parent, DeferredLoad):
+                break
+            oid = h.parent.oid
+            try:
+                h.parent = self._object_cache[oid]
+                break
+            except KeyError:
+                pass
+
+        for h in reversed(chain):
+            if isinstance(h.parent, DeferredLoad):
+                h.parent = self._object_cache[h.parent.oid]
+            h.merged_from = [ self._load(m.oid) if isinstance(m, DeferredLoad) else m for m in h.merged_from ]
+        return chain[0]
+
     def store(self, o):
 
         actual_id = self._get_persistent_id(o) or "TMP-"+str(uuid.uuid4())
@@ -169,6 +247,7 @@ class Vault(collections.abc.MutableMapping):
         """
 
         actual_id = oid
+        data = self._serialized.pop(actual_id, None)
 
         # l.debug("STORE: %s %s", o, actual_id)
 
@@ -180,13 +259,37 @@ class Vault(collections.abc.MutableMapping):
             # l.debug("... already stored")
             return actual_id
 
+        if isinstance(o, SimStateHistory) and SimStateHistory in self.uuid_dedup:
+            self._store_history_ancestors(o)
+
         with self._write_context(actual_id) as output:
             self.storing.add(actual_id)
-            VaultPickler(self, output, assigned_objects=(o,)).dump(o)
+            if data is not None:
+                output.write(data)
+            else:
+                VaultPickler(self, output, assigned_objects=(o,)).dump(o)
             self.stored.add(actual_id)
 
         return actual_id
 
+    def _store_history_ancestors(self, h):
+        """
+        Stores the ancestors of a history node, starting from the oldest one that is not stored yet. Each node only
+        refers to its parent, so this keeps storing a node from recursing once per ancestor.
+
+        :param h: the history node
+        """
+        pending = [ ]
+        parent = h.parent
+        while parent is not None:
+            pid = self._get_persistent_id(parent)
+            if pid in self.storing or self.is_stored(pid):
+                break
+            pending.append((parent, pid))
+            parent = parent.parent
+        for parent, pid in reversed(pending):
+            self._store(parent, pid)
+
     def dumps(self, o):
         """
         Returns a serialized string representing the object, post-deduplication.
@@ -211,6 +314,7 @@ class Vault(collections.abc.MutableMapping):
 
         self._object_cache.clear()
         self._uuid_cache.clear()
+        self._serialized.clear()
         self.stored.clear()
         self.storing.clear()
 
@@ -357,3 +461,5 @@ from .errors import AngrVaultError
 from .project import Project
 from .sim_type import SimType
 from .sim_state import SimState
+from .state_plugins.history import SimStateHistory
+from .storage.memory_mixins.paged_memory.pages import PageBase
@@ -148,6 +148,16 @@ public:
 	bool track_bbls;
 	bool track_stack;
 
+	// trace following. the trace is owned by python and outlives this state
+	uint64_t *trace;
+	uint64_t trace_length;
+	uint64_t trace_idx;
+	int64_t trace_slide;
+	uint64_t trace_blocks; // number of executed blocks that were checked against the trace
+	bool trace_following;
+	bool trace_pending;
+	uint64_t trace_pending_advance;
+
 	uc_cb_eventmem_t py_mem_callback;
 
 	State(uc_engine *_uc, uint64_t cache_key):uc(_uc)
@@ -163,6 +173,10 @@ public:
 		transmit_sysno = -1;
 		vex_guest = VexArch_INVALID;
 		syscall_count = 0;
+		trace = NULL;
+		trace_length = trace_idx = trace_blocks = trace_pending_advance = 0;
+		trace_slide = 0;
+		trace_following = trace_pending = false;
 		uc_context_alloc(uc, &saved_regs);
 		executed_pages_iterator = NULL;
 
@@ -322,6 +336,9 @@ public:
 		if (track_stack) {
 			stack_pointers.push_back(get_stack_pointer());
 		}
+		if (trace_following) {
+			follow_trace(current_address);
+		}
 		executed_pages.insert(current_address & ~0xFFFULL);
 		cur_address = current_address;
 		cur_size = size;
@@ -351,6 +368,34 @@ public:
 		}
 	}
 
+	void set_trace(uint64_t *_trace, uint64_t length, uint64_t start_idx, int64_t slide) {
+		trace = _trace;
+		trace_length = length;
+		trace_idx = start_idx;
+		trace_slide = slide;
+		trace_blocks = 0;
+		trace_pending = false;
+		trace_following = _trace != NULL && track_bbls;
+	}
+
+	/*
+	 * check the block that is about to be executed against the trace. the trace index is only advanced when the
+	 * block is committed. everything after the first mismatch (e.g. a jump into an object with a different slide) is
+	 * left to python.
+	 */
+	void follow_trace(uint64_t current_address) {
+		if (transmit_sysno != (uint32_t)-1 && current_address == transmit_bbl_addr) {
+			// concrete transmits do not show up in the trace
+			trace_pending = true;
+			trace_pending_advance = 0;
+		} else if (trace_idx < trace_length && current_address + trace_slide == trace[trace_idx]) {
+			trace_pending = true;
+			trace_pending_advance = 1;
+		} else {
+			trace_following = false;
+		}
+	}
+
 	/*
 	 * commit all memory actions.
 	 */
@@ -375,6 +420,12 @@ public:
 		// clear memory rollback status
 		mem_writes.clear();
 		cur_steps++;
+
+		if (trace_pending) {
+			trace_blocks++;
+			trace_idx += trace_pending_advance;
+			trace_pending = false;
+		}
 	}
 
 	/*
@@ -424,6 +475,7 @@ public:
 
 		if (track_bbls) bbl_addrs.pop_back();
 		if (track_stack) stack_pointers.pop_back();
+		trace_pending = false;
 	}
 
 	/*
@@ -1444,6 +1496,21 @@ void simunicorn_set_tracking(State *state, bool track_bbls, bool track_stack) {
 	state->track_stack = track_stack;
 }
 
+extern "C"
+void simunicorn_set_trace(State *state, uint64_t *trace, uint64_t length, uint64_t start_idx, int64_t slide) {
+	state->set_trace(trace, length, start_idx, slide);
+}
+
+extern "C"
+uint64_t simunicorn_trace_idx(State *state) {
+	return state->trace_idx;
+}
+
+extern "C"
+uint64_t simunicorn_trace_blocks(State *state) {
+	return state->trace_blocks;
+}
+
 extern "C"
 bool simunicorn_in_cache(State *state, uint64_t address) {
 	return state->in_cache(address);
@@ -12,6 +12,7 @@ from angr.analyses.reaching_definitions.external_codeloc import ExternalCodeLoca
 from angr.analyses.reaching_definitions.rd_state import ReachingDefinitionsState
 from angr.analyses.reaching_definitions.subject import Subject
 from angr.analyses.reaching_definitions.dep_graph import DepGraph
+from angr.analyses.reaching_definitions.function_handler import FunctionHandler, SummaryFunctionHandler
 from angr.block import Block
 from angr.knowledge_plugins.key_definitions.atoms import GuardUse, Tmp, Register, MemoryLocation
 from angr.knowledge_plugins.key_definitions.constants import OP_BEFORE, OP_AFTER
@@ -444,6 +445,62 @@ class TestReachingDefinitions(TestCase):
         # 4007A8 mov     rsi, rdx
         self.assertEqual(auth_rsi.codeloc.ins_addr, 0x4007a8)
 
+    def test_summary_function_handler_applies_callee_summaries(self):
+        bin_path = _binary_path('fauxware')
+        project = angr.Project(bin_path, auto_load_libs=False)
+        arch = project.arch
+        cfg = project.analyses.CFGFast()
+        main = cfg.functions['main']
+        authenticate = cfg.functions['authenticate']
+
+        project.analyses.CompleteCallingConventions(recover_variables=True)
+        rda = project.analyses.ReachingDefinitions(subject=main, track_tmps=False, call_stack=[],
+                                                   function_handler=SummaryFunctionHandler())
+
+        summary = project.kb.defs.get_summary(authenticate.addr)
+        self.assertIsNotNone(summary)
+        input_regs = { atom.reg_offset for atom in summary.inputs if isinstance(atom, Register) }
+        self.assertIn(arch.registers['rdi'][0], input_regs)
+        self.assertIn(arch.registers['rsi'][0], input_regs)
+
+        # 4007ae: the summary of authenticate() uses rsi and rdi
+        context = (main.addr, )
+        code_location = CodeLocation(0x4007a0, DEFAULT_STATEMENT, ins_addr=0x4007ae, context=context)
+        used_regs = { def_.atom.reg_offset for def_ in rda.all_uses.get_uses_by_location(code_location)
+                      if isinstance(def_.atom, Register) }
+        self.assertIn(arch.registers['rdi'][0], used_regs)
+        self.assertIn(arch.registers['rsi'][0], used_regs)
+
+        # summaries are cached until their functions change
+        project.kb.defs.invalidate_summaries()
+        self.assertIs(project.kb.defs.get_summary(authenticate.addr), summary)
+        project.kb.defs.invalidate_summaries(authenticate.addr)
+        self.assertIsNot(project.kb.defs.get_summary(authenticate.addr), summary)
+
+    def test_function_handler_without_src_codeloc(self):
+        # handlers that were written before src_codeloc was added to handle_local_function() keep working
+        class _LegacyHandler(FunctionHandler):
+            def __init__(self):
+                self.called = [ ]
+
+            def hook(self, analysis):
+                return self
+
+            def handle_local_function(self, state, function_address, call_stack, maximum_local_call_depth,
+                                      visited_blocks, dep_graph, src_ins_addr=None, codeloc=None):
+                self.called.append(function_address)
+                return False, state, visited_blocks, dep_graph
+
+        bin_path = _binary_path('fauxware')
+        project = angr.Project(bin_path, auto_load_libs=False)
+        cfg = project.analyses.CFGFast()
+        main = cfg.functions['main']
+
+        handler = _LegacyHandler()
+        _ = project.analyses.ReachingDefinitions(subject=main, track_tmps=False, call_stack=[],
+                                                 function_handler=handler)
+        self.assertIn(cfg.functions['authenticate'].addr, handler.called)
+
     def test_rda_on_a_block_without_cfg(self):
         bin_path = _binary_path('fauxware')
         project = angr.Project(bin_path, auto_load_libs=False)
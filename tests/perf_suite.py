@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+"""
+A reproducible performance benchmark suite for angr.
+
+Every benchmark is run several times, each time in a freshly forked process, and the wall-clock time and the peak
+resident memory of each run are recorded. Results are written as JSON, and can be compared against a baseline (a
+previously saved result file) to catch performance regressions:
+
+    python perf_suite.py --save-baseline baseline.json
+    # ... upgrade angr, or make some changes ...
+    python perf_suite.py --baseline baseline.json --output results.json
+
+The comparison uses the median time and the maximum peak memory of each benchmark. The script exits with a non-zero
+status if any benchmark is slower, or uses more memory, than the baseline by more than the tolerance.
+
+Benchmarks are generators. Everything before the first `yield` is setup and is not measured.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+from queue import Empty
+
+import claripy
+import angr
+from angr import options as so
+
+test_location = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'binaries', 'tests')
+
+BENCHMARKS = { }
+
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def _project(*path, **kwargs):
+    kwargs.setdefault('auto_load_libs', False)
+    return angr.Project(os.path.join(test_location, *path), **kwargs)
+
+
+#
+# Benchmarks
+#
+
+@benchmark('import_angr')
+def bench_import():
+    # a cold "import angr" in a new interpreter, including interpreter startup
+    yield
+    subprocess.check_call([ sys.executable, '-c', 'import angr' ])
+
+
+@benchmark('cfgfast_x86_64_all')
+def bench_cfgfast():
+    p = _project('x86_64', 'all')
+    yield
+    p.analyses.CFGFast(normalize=True)
+
+
+@benchmark('cfgfast_x86_64_all_workers')
+def bench_cfgfast_workers():
+    p = _project('x86_64', 'all')
+    yield
+    p.analyses.CFGFast(normalize=True, workers=4)
+
+
+@benchmark('cfgemulated_i386_fauxware')
+def bench_cfgemulated():
+    p = _project('i386', 'fauxware', translation_cache=True)
+    yield
+    p.analyses.CFGEmulated(keep_state=True)
+
+
+@benchmark('decompiler_i386_babypwn')
+def bench_decompiler():
+    p = _project('i386', 'decompiler', 'codegate2017_babypwn', load_debug_info=True)
+    cfg = p.analyses.CFG(normalize=True, data_references=True)
+    yield
+    for addr in (0x8048a71, 0x8048c6b):
+        p.analyses.Decompiler(cfg.kb.functions[addr], cfg=cfg)
+
+
+@benchmark('reaching_definitions_x86_64_all')
+def bench_reaching_definitions():
+    p = _project('x86_64', 'all')
+    cfg = p.analyses.CFGFast()
+    functions = [ f for f in cfg.kb.functions.values() if not f.is_simprocedure and not f.is_plt ]
+    yield
+    for f in functions:
+        p.analyses.ReachingDefinitions(subject=f, observe_all=True)
+
+
+@benchmark('explore_x86_64_fauxware')
+def bench_explore():
+    p = _project('x86_64', 'fauxware')
+    simgr = p.factory.simulation_manager()
+    yield
+    simgr.explore(find=0x4006ed, avoid=(0x4006aa, 0x4006fd))
+    assert simgr.found
+
+
+@benchmark('explore_x86_64_counter')
+def bench_counter():
+    p = _project('x86_64', 'counter')
+    state = p.factory.entry_state(add_options={so.SYMBOL_FILL_UNCONSTRAINED_MEMORY,
+                                               so.SYMBOL_FILL_UNCONSTRAINED_REGISTERS})
+    simgr = p.factory.simulation_manager(state)
+    yield
+    simgr.run(n=500)
+
+
+@benchmark('unicorn_x86_64_perf_unicorn_0')
+def bench_unicorn():
+    p = _project('x86_64', 'perf_unicorn_0')
+    state = p.factory.entry_state(add_options=so.unicorn | {so.STRICT_PAGE_ACCESS}, remove_options={so.LAZY_SOLVES})
+    simgr = p.factory.simulation_manager(state)
+    yield
+    simgr.run()
+    assert simgr.deadended
+
+
+@benchmark('state_copy_x86_64_fauxware')
+def bench_state_copy():
+    p = _project('x86_64', 'fauxware')
+    simgr = p.factory.simulation_manager()
+    simgr.run(n=20)
+    state = simgr.active[0]
+    yield
+    for _ in range(2000):
+        state = state.copy()
+
+
+@benchmark('state_merge_x86_64_fauxware')
+def bench_state_merge():
+    p = _project('x86_64', 'fauxware')
+    simgr = p.factory.simulation_manager()
+    simgr.run(until=lambda sm: len(sm.active) > 1)
+    a, b = simgr.active[:2]
+    yield
+    for _ in range(100):
+        a.copy().merge(b.copy())
+
+
+@benchmark('solver_constraints')
+def bench_solver():
+    yield
+    for i in range(20):
+        state = angr.SimState(arch='AMD64')
+        x = [ claripy.BVS('x%d' % j, 32) for j in range(8) ]
+        for j in range(7):
+            state.add_constraints(x[j] * (i + 3) + x[j + 1] < 0x10000 + j, x[j] != x[j + 1])
+        total = claripy.Concat(*x)
+        state.solver.eval_upto(total, 64)
+        state.solver.min(x[0])
+        state.solver.max(x[7])
+        state.solver.satisfiable(extra_constraints=(x[0] == x[7],))
+
+
+def _solver_forks(options):
+    # a state with many independent groups of constraints, which forks and adds constraints to one group at a time.
+    # run with and without CONSTRAINT_INDEPENDENCE to compare the two
+    state = angr.SimState(arch='AMD64', add_options=options, remove_options={ so.COMPOSITE_SOLVER })
+    groups = [ [ claripy.BVS('g%d_%d' % (i, j), 32) for j in range(4) ] for i in range(16) ]
+    for i, g in enumerate(groups):
+        for j in range(3):
+            state.add_constraints(g[j] * (i + 3) + g[j + 1] < 0x10000 + j, g[j] != g[j + 1])
+    yield
+    states = [ state ]
+    for i in range(64):
+        g = groups[i % len(groups)]
+        child = states[-1].copy()
+        child.add_constraints(g[0] != i)
+        child.solver.eval_upto(g[0], 4)
+        child.solver.max(g[3])
+        child.solver.satisfiable(extra_constraints=(g[1] == g[2] + 1,))
+        states.append(child)
+
+
+@benchmark('solver_forks')
+def bench_solver_forks():
+    yield from _solver_forks(set())
+
+
+@benchmark('solver_forks_constraint_independence')
+def bench_solver_forks_independence():
+    yield from _solver_forks({ so.CONSTRAINT_INDEPENDENCE })
+
+
+#
+# Harness
+#
+
+def _run_once(func, seed, queue):
+    random.seed(seed)
+    try:
+        gen = func()
+        next(gen)
+        start = time.perf_counter()
+        try:
+            next(gen)
+        except StopIteration:
+            pass
+        elapsed = time.perf_counter() - start
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            peak //= 1024
+        queue.put(('ok', elapsed, peak / 1024.))
+    except Exception:  # pylint:disable=broad-except
+        queue.put(('error', traceback.format_exc(), None))
+
+
+def _wait_for_result(proc, queue, timeout):
+    """
+    Wait for the result of a run in a forked process.
+
+    :return:    The result tuple, or an error tuple if the process died without a result or timed out.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            pass
+        if not proc.is_alive():
+            # the result may have been put right before the process exited
+            try:
+                return queue.get(timeout=1)
+            except Empty:
+                return 'error', "benchmark process exited with code %s" % proc.exitcode, None
+        if deadline is not None and time.monotonic() > deadline:
+            proc.terminate()
+            return 'error', "benchmark timed out after %d seconds" % timeout, None
+
+
+def run_benchmark(name, runs, seed, inline=False, timeout=None):
+    """
+    Run a benchmark several times.
+
+    :param str name:    Name of the benchmark.
+    :param int runs:    Number of runs.
+    :param int seed:    Seed for `random`, which is reset before every run.
+    :param bool inline: Run in this process instead of in a forked process. Peak memory is not meaningful then.
+    :param timeout:     Number of seconds after which a run in a forked process is killed and reported as failed, or
+                        None to wait for as long as it takes.
+    :return:            A dict of results.
+    """
+    func = BENCHMARKS[name]
+    times, mems = [ ], [ ]
+    for _ in range(runs):
+        queue = multiprocessing.Queue()
+        if inline:
+            _run_once(func, seed, queue)
+            outcome, elapsed, peak = queue.get()
+        else:
+            proc = multiprocessing.get_context('fork').Process(target=_run_once, args=(func, seed, queue))
+            proc.start()
+            outcome, elapsed, peak = _wait_for_result(proc, queue, timeout)
+            proc.join()
+        if outcome != 'ok':
+            return {'error': elapsed}
+        times.append(elapsed)
+        mems.append(peak)
+    return {
+        'times': times,
+        'min': min(times),
+        'median': statistics.median(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.,
+        'peak_memory_mb': max(mems),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results against a baseline.
+
+    :return:    A list of (benchmark name, metric, baseline value, current value) for every regression.
+    """
+    regressions = [ ]
+    for name, current in results['benchmarks'].items():
+        old = baseline['benchmarks'].get(name, None)
+        if old is None or 'error' in old or 'error' in current:
+            continue
+        for metric in ('median', 'peak_memory_mb'):
+            if current[metric] > old[metric] * (1 + tolerance):
+                regressions.append((name, metric, old[metric], current[metric]))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print("%-36s %10s %10s %10s %12s" % ("benchmark", "min (s)", "median (s)", "stdev", "peak (MB)"))
+    for name, r in results['benchmarks'].items():
+        if 'error' in r:
+            print("%-36s FAILED" % name)
+            continue
+        line = "%-36s %10.3f %10.3f %10.3f %12.1f" % (name, r['min'], r['median'], r['stdev'], r['peak_memory_mb'])
+        old = (baseline or { }).get('benchmarks', { }).get(name, None)
+        if old is not None and 'error' not in old:
+            line += "   (%+.1f%% time, %+.1f%% memory)" % (
+                (r['median'] / old['median'] - 1) * 100, (r['peak_memory_mb'] / old['peak_memory_mb'] - 1) * 100)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='angr performance benchmark suite')
+    parser.add_argument('benchmarks', nargs='*', help='Benchmarks to run (default: all)')
+    parser.add_argument('-n', '--n-runs', default=5, type=int, help='How many runs to perform for each benchmark '
+                                                                    '(default: 5)')
+    parser.add_argument('-s', '--seed', default=1234, type=int, help='Seed for random (default: 1234)')
+    parser.add_argument('-i', '--inline', action='store_true', help='Run benchmarks inline (not in forked processes)')
+    parser.add_argument('--timeout', type=int, help='Kill a run and report the benchmark as failed after this many '
+                                                    'seconds (default: no timeout)')
+    parser.add_argument('-o', '--output', help='Write the results to this JSON file')
+    parser.add_argument('-b', '--baseline', help='Compare the results against this JSON file')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file, to be used as a baseline')
+    parser.add_argument('-t', '--tolerance', default=0.1, type=float, help='Relative slowdown or memory growth that '
+                                                                          'is reported as a regression (default: 0.1)')
+    parser.add_argument('-l', '--list', action='store_true', help='List all benchmarks')
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = [ name for name in names if name not in BENCHMARKS ]
+    if unknown:
+        parser.error("Unknown benchmarks: %s" % ", ".join(unknown))
+
+    results = {
+        'meta': {
+            'angr_version': '.'.join(map(str, angr.__version__)),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'runs': args.n_runs,
+            'seed': args.seed,
+            'timestamp': time.time(),
+        },
+        'benchmarks': { },
+    }
+    for name in names:
+        print(name, file=sys.stderr)
+        results['benchmarks'][name] = r = run_benchmark(name, args.n_runs, args.seed, inline=args.inline,
+                                                        timeout=args.timeout)
+        if 'error' in r:
+            print(r['error'], file=sys.stderr)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=1)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline=baseline)
+
+    status = 0
+    if any('error' in r for r in results['benchmarks'].values()):
+        status = 1
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, old, new in regressions:
+            print("REGRESSION: %s %s went from %.3f to %.3f" % (name, metric, old, new))
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,8 @@ import logging
 l = logging.getLogger("angr.tests")
 
 import os
+import shutil
+import tempfile
 test_location = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'binaries', 'tests')
 
 def test_block_cache():
@@ -15,5 +17,55 @@ def test_block_cache():
     b = p.factory.block(p.entry)
     assert p.factory.block(p.entry).vex is not b.vex
 
+def test_persistent_block_cache():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        p = angr.Project(os.path.join(test_location, "x86_64", "fauxware"), translation_cache=True,
+                         translation_cache_dir=cache_dir)
+        engine = p.factory.default_engine
+        b0 = p.factory.block(p.entry)
+        assert engine._persistent_cache_hits == 0
+        assert engine._persistent_cache_misses > 0
+
+        # a fresh project lifts the same block from the on-disk cache
+        p = angr.Project(os.path.join(test_location, "x86_64", "fauxware"), translation_cache=True,
+                         translation_cache_dir=cache_dir)
+        engine = p.factory.default_engine
+        b1 = p.factory.block(p.entry)
+        assert engine._persistent_cache_hits == 1
+        assert b1.vex is not b0.vex
+        assert b1.instruction_addrs == b0.instruction_addrs
+        assert len(b1.vex.statements) == len(b0.vex.statements)
+
+        # the second lift is served by the in-memory cache
+        assert p.factory.block(p.entry).vex is b1.vex
+        assert engine._persistent_cache_hits == 1
+    finally:
+        shutil.rmtree(cache_dir)
+
+def test_persistent_lift_cache_index_and_cap():
+    from angr.engines.vex.lift_cache import PersistentLiftCache
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = PersistentLiftCache(cache_dir, "test")
+        assert cache.get(("key", 0)) is None
+        # records are indexed when they are stored
+        cache.put(("key", 0), [ 1, 2, 3 ])
+        assert cache.get(("key", 0)) == [ 1, 2, 3 ]
+        assert PersistentLiftCache(cache_dir, "test").get(("key", 0)) == [ 1, 2, 3 ]
+
+        # an oversized store is started afresh, and stops growing at its cap
+        capped = PersistentLiftCache(cache_dir, "test", max_size=16)
+        assert capped.get(("key", 0)) is None
+        capped.put(("key", 1), list(range(100)))
+        size = os.path.getsize(capped.path)
+        capped.put(("key", 2), 2)
+        assert os.path.getsize(capped.path) == size
+    finally:
+        shutil.rmtree(cache_dir)
+
 if __name__ == "__main__":
     test_block_cache()
+    test_persistent_block_cache()
+    test_persistent_lift_cache_index_and_cap()
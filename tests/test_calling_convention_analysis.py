@@ -195,6 +195,27 @@ def test_x8664_void():
                 assert func.calling_convention.ret_val.reg_name == r
 
 
+def test_x8664_dir_gcc_O0_parallel():
+
+    binary_path = os.path.join(test_location, 'tests', 'x86_64', 'dir_gcc_-O0')
+
+    results = [ ]
+    for workers in (None, 4):
+        proj = angr.Project(binary_path, auto_load_libs=False, load_debug_info=False)
+        cfg = proj.analyses.CFG()
+        proj.analyses.CompleteCallingConventions(recover_variables=True, workers=workers)
+        results.append({
+            func.addr: (str(func.calling_convention.args), str(func.calling_convention.ret_val),
+                        len(cfg.kb.variables[func.addr].get_variables()))
+            for func in cfg.kb.functions.values() if func.calling_convention is not None
+        })
+        if workers is not None:
+            check_args('main', _a(cfg.kb.functions, 'main'), ['r_rdi', 'r_rsi'])
+            nose.tools.assert_is(cfg.kb.variables[cfg.kb.functions['main'].addr].manager, cfg.kb.variables)
+
+    nose.tools.assert_equal(results[0], results[1])
+
+
 def run_all():
     for args in test_fauxware():
         func, args = args[0], args[1:]
@@ -210,4 +231,5 @@ if __name__ == "__main__":
     logging.getLogger("angr.analyses.calling_convention").setLevel(logging.INFO)
     # run_all()
     test_x8664_void()
+    test_x8664_dir_gcc_O0_parallel()
     # test_dir_gcc_O0()
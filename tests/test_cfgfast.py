@@ -753,6 +753,49 @@ def test_blanket_fauxware():
     # a block ends at 0x4005a9 (exclusive)
     nose.tools.assert_equal(cfb.ceiling_addr(0x400581), 0x4005a9)
 
+#
+# Parallel block lifting
+#
+
+def _assert_same_cfg(cfg_0, cfg_1):
+    nose.tools.assert_equal(
+        sorted((n.addr, n.size) for n in cfg_0.graph.nodes()),
+        sorted((n.addr, n.size) for n in cfg_1.graph.nodes()),
+    )
+    nose.tools.assert_equal(
+        sorted((src.addr, dst.addr) for src, dst in cfg_0.graph.edges()),
+        sorted((src.addr, dst.addr) for src, dst in cfg_1.graph.edges()),
+    )
+    nose.tools.assert_equal(
+        sorted((f.addr, sorted(f.block_addrs_set)) for f in cfg_0.kb.functions.values()),
+        sorted((f.addr, sorted(f.block_addrs_set)) for f in cfg_1.kb.functions.values()),
+    )
+
+
+def test_parallel_lifting():
+
+    path = os.path.join(test_location, 'x86_64', 'fauxware')
+    proj = angr.Project(path, auto_load_libs=False)
+
+    cfg_0 = proj.analyses.CFGFast(kb=angr.KnowledgeBase(proj))
+    cfg_1 = proj.analyses.CFGFast(kb=angr.KnowledgeBase(proj), workers=2)
+
+    _assert_same_cfg(cfg_0, cfg_1)
+
+
+def test_parallel_lifting_stripped():
+
+    # workers stop blocks at function prologues that the scan has not turned into functions yet. such blocks must not
+    # replace the longer blocks that the scan lifts
+    path = os.path.join(test_location, 'armel', 'Nucleo_read_hyperterminal-stripped.elf')
+    proj = angr.Project(path, auto_load_libs=False)
+
+    cfg_0 = proj.analyses.CFGFast(kb=angr.KnowledgeBase(proj), symbols=False, function_prologues=True)
+    cfg_1 = proj.analyses.CFGFast(kb=angr.KnowledgeBase(proj), symbols=False, function_prologues=True, workers=4)
+
+    nose.tools.assert_true(cfg_1._function_prologue_addrs)
+    _assert_same_cfg(cfg_0, cfg_1)
+
 #
 # Data references
 #
@@ -822,6 +865,35 @@ def test_cfg_with_patches():
     nose.tools.assert_equal(len(not_patched_func.block_addrs_set), 10)
 
 
+def test_cfg_incremental_with_patches():
+
+    path = os.path.join(test_location, 'x86_64', 'fauxware')
+    proj = angr.Project(path, auto_load_libs=False)
+
+    kb = angr.KnowledgeBase(proj)
+    cfg = proj.analyses.CFGFast(kb=kb, use_patches=True)
+    auth_func_addr = kb.functions['authenticate'].addr
+    main_blocks = set(kb.functions['main'].block_addrs_set)
+    node_count = len(cfg.model.graph)
+
+    # patch the first block of authenticate() to ret, and only re-analyze the patched region
+    kb.patches.add_patch(auth_func_addr, b"\xc3")
+    cfg = proj.analyses.CFGFast(kb=kb, use_patches=True, model=cfg.model,
+                                dirty_regions=[(auth_func_addr, auth_func_addr + 1)])
+
+    patched_func = kb.functions['authenticate']
+    nose.tools.assert_equal(len(patched_func.block_addrs_set), 1)
+    block = patched_func._get_block(auth_func_addr)
+    nose.tools.assert_equal(len(block.instruction_addrs), 1)
+    # the rest of the CFG is untouched
+    nose.tools.assert_equal(kb.functions['main'].block_addrs_set, main_blocks)
+    nose.tools.assert_less(len(cfg.model.graph), node_count)
+    # the call from main() to authenticate() is restored
+    auth_node = cfg.model.get_any_node(auth_func_addr)
+    nose.tools.assert_true(any(pred.function_address == kb.functions['main'].addr
+                               for pred in cfg.model.get_predecessors(auth_node, jumpkind='Ijk_Call')))
+
+
 def test_unresolvable_targets():
 
     path = os.path.join(test_location, 'cgc', 'CADET_00002')
@@ -906,9 +978,12 @@ def run_all():
     test_block_instruction_addresses_armhf()
     test_tail_call_optimization_detection_armel()
     test_blanket_fauxware()
+    test_parallel_lifting()
+    test_parallel_lifting_stripped()
     test_data_references()
     test_function_leading_blocks_merging()
     test_cfg_with_patches()
+    test_cfg_incremental_with_patches()
     test_indirect_jump_to_outside()
     test_generate_special_info()
     test_plt_stub_has_one_jumpout_site()
@@ -4,6 +4,7 @@ import os
 import nose.tools
 
 import angr
+from angr.analyses.propagator.propagator import _same_values
 
 test_location = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'binaries', 'tests')
 
@@ -42,6 +43,46 @@ def test_lwip_udpecho_bm():
     nose.tools.assert_greater(len(prop.replacements), 0)
 
 
+def _assert_same_propagation(prop, sparse_prop):
+    nose.tools.assert_equal(set(sparse_prop.replacements), set(prop.replacements))
+    for codeloc, replacements in prop.replacements.items():
+        nose.tools.assert_true(_same_values(sparse_prop.replacements[codeloc], replacements),
+                               msg="Replacements at %s are different." % codeloc)
+    nose.tools.assert_equal(sparse_prop.equivalence, prop.equivalence)
+
+
+def test_lwip_udpecho_bm_sparse():
+    bin_path = os.path.join(test_location, "armel", "lwip_udpecho_bm.elf")
+    p = angr.Project(bin_path, auto_load_libs=False)
+    cfg = p.analyses.CFG(data_references=True)
+
+    func = cfg.functions[0x23c9]
+    state = p.factory.blank_state()
+    prop = p.analyses.Propagator(func=func, base_state=state)
+    sparse_prop = p.analyses.Propagator(func=func, base_state=state, sparse=True)
+
+    nose.tools.assert_greater(len(sparse_prop.replacements), 0)
+    _assert_same_propagation(prop, sparse_prop)
+
+
+def test_loop_ail_sparse():
+    bin_path = os.path.join(test_location, "x86_64", "decompiler", "loop")
+    p = angr.Project(bin_path, auto_load_libs=False, load_debug_info=True)
+    cfg = p.analyses.CFG(normalize=True, data_references=True)
+
+    func = cfg.functions['loop']
+    clinic = p.analyses.Clinic(func)
+    prop = p.analyses.Propagator(func=func, func_graph=clinic.graph)
+    sparse_prop = p.analyses.Propagator(func=func, func_graph=clinic.graph, sparse=True)
+
+    nose.tools.assert_greater(len(sparse_prop.replacements), 0)
+    _assert_same_propagation(prop, sparse_prop)
+    # blocks in the loop are not analyzed again once their states stop changing
+    nose.tools.assert_less_equal(sum(sparse_prop._node_iterations.values()), sum(prop._node_iterations.values()))
+
+
 if __name__ == "__main__":
     test_libc_x86()
     test_lwip_udpecho_bm()
+    test_lwip_udpecho_bm_sparse()
+    test_loop_ail_sparse()
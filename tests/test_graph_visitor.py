@@ -0,0 +1,89 @@
+import networkx
+import nose.tools
+
+from angr.analyses.forward_analysis import CallGraphVisitor
+from angr.analyses.forward_analysis.job_info import JobInfo, JobInfoQueue
+
+
+class _PartialCallGraphVisitor(CallGraphVisitor):
+    def __init__(self, callgraph, traversed_nodes):
+        self._traversed_nodes = traversed_nodes
+        super().__init__(callgraph)
+
+    def sort_nodes(self, nodes=None):
+        return super().sort_nodes(self._traversed_nodes if nodes is None else nodes)
+
+
+def _loop_graph():
+    # 1 -> 2 -> 3 -> 4, with a loop 3 -> 2
+    g = networkx.DiGraph()
+    g.add_edges_from([ (1, 2), (2, 3), (3, 2), (3, 4) ])
+    return g
+
+
+def test_graph_visitor_order():
+    visitor = CallGraphVisitor(_loop_graph())
+
+    nose.tools.assert_equal([ visitor.next_node() for _ in range(4) ], [ 1, 2, 3, 4 ])
+    nose.tools.assert_is_none(visitor.next_node())
+
+    # revisited nodes come out in traversal order, once each
+    visitor.revisit_node(4)
+    visitor.revisit_successors(1)
+    visitor.revisit_node(2)
+    nose.tools.assert_equal([ visitor.next_node() for _ in range(3) ], [ 1, 2, 4 ])
+    nose.tools.assert_is_none(visitor.next_node())
+
+
+def test_graph_visitor_widening_points():
+    visitor = CallGraphVisitor(_loop_graph())
+
+    nose.tools.assert_equal(visitor.widening_points, { 2 })
+    nose.tools.assert_true(visitor.is_widening_point(2))
+    nose.tools.assert_false(visitor.is_widening_point(3))
+
+    visitor.widening_points = [ 3 ]
+    nose.tools.assert_true(visitor.is_widening_point(3))
+    nose.tools.assert_false(visitor.is_widening_point(2))
+
+
+def test_graph_visitor_widening_points_outside_predecessors():
+    # only nodes 2, 3, and 4 are traversed. node 3 has a predecessor, 0, outside of the traversal
+    g = _loop_graph()
+    g.add_edge(0, 3)
+    visitor = _PartialCallGraphVisitor(g, { 2, 3, 4 })
+
+    nose.tools.assert_equal(visitor.widening_points, { 2 })
+    nose.tools.assert_false(visitor.is_widening_point(3))
+
+
+def test_job_info_queue():
+    a, b, c, d = [ JobInfo(i, i) for i in (3, 1, 2, 1) ]
+
+    # first in, first out
+    q = JobInfoQueue()
+    for ji in (a, b, c, d):
+        q.append(ji)
+    q.remove(c)
+    nose.tools.assert_not_in(c, q)
+    nose.tools.assert_equal(list(q), [ a, b, d ])
+    nose.tools.assert_equal([ q.pop() for _ in range(3) ], [ a, b, d ])
+    nose.tools.assert_equal(len(q), 0)
+
+    # ordered by sort keys. the job info that is appended last comes first among equal keys.
+    q = JobInfoQueue(key=lambda job: job)
+    for ji in (a, b, c, d):
+        q.append(ji)
+    nose.tools.assert_is(q[0], d)
+    nose.tools.assert_equal(list(q), [ d, b, c, a ])
+    q.remove(d)
+    q.append(b)
+    nose.tools.assert_equal([ q.pop() for _ in range(3) ], [ b, c, a ])
+    nose.tools.assert_raises(IndexError, q.pop)
+
+
+if __name__ == "__main__":
+    test_graph_visitor_order()
+    test_graph_visitor_widening_points()
+    test_graph_visitor_widening_points_outside_predecessors()
+    test_job_info_queue()
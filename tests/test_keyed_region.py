@@ -0,0 +1,95 @@
+import copy
+
+import nose
+
+from angr.keyed_region import KeyedRegion
+from angr.knowledge_plugins.key_definitions.uses import Uses
+
+
+class _Obj:
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def __repr__(self):
+        return self.name
+
+
+def _contents(kr):
+    return [ (ro.start, ro.size, sorted(ro.internal_objects, key=repr)) for ro in kr ]
+
+
+def test_keyed_region_copy_on_write():
+    a, b, c = _Obj('a', 8), _Obj('b', 4), _Obj('c', 1)
+
+    kr = KeyedRegion()
+    kr.set_variable(0, a)
+    kr.add_variable(8, b)
+
+    kr2 = kr.copy()
+    nose.tools.assert_true(kr == kr2)
+    nose.tools.assert_is(kr._storage, kr2._storage)
+
+    # updates to either side are not visible to the other
+    kr2.set_variable(2, c)
+    kr.add_variable(8, c)
+    nose.tools.assert_equal(_contents(kr), [ (0, 8, [a]), (8, 1, [b, c]), (9, 3, [b]) ])
+    nose.tools.assert_equal(_contents(kr2), [ (0, 2, [a]), (2, 6, [c]), (8, 4, [b]) ])
+    nose.tools.assert_false(kr == kr2)
+
+    # copies of copies
+    kr3 = kr2.copy()
+    kr3.set_variable(8, c)
+    nose.tools.assert_equal(_contents(kr2), [ (0, 2, [a]), (2, 6, [c]), (8, 4, [b]) ])
+    nose.tools.assert_equal(_contents(kr3), [ (0, 2, [a]), (2, 6, [c]), (8, 1, [c]), (9, 3, [b]) ])
+
+    # merging does not modify the other region, or the region objects it shares
+    kr4 = kr2.copy()
+    kr4.merge(kr3)
+    nose.tools.assert_is_not(kr4._storage, kr2._storage)
+    nose.tools.assert_equal(_contents(kr2), [ (0, 2, [a]), (2, 6, [c]), (8, 4, [b]) ])
+    nose.tools.assert_equal(_contents(kr3), [ (0, 2, [a]), (2, 6, [c]), (8, 1, [c]), (9, 3, [b]) ])
+    nose.tools.assert_equal(_contents(kr), [ (0, 8, [a]), (8, 1, [b, c]), (9, 3, [b]) ])
+
+
+def test_keyed_region_deepcopy_shared_storage():
+    a, b, c = _Obj('a', 8), _Obj('b', 4), _Obj('c', 1)
+
+    kr = KeyedRegion()
+    kr.set_variable(0, a)
+    kr.add_variable(8, b)
+    kr2 = kr.copy()
+
+    # deepcopy (like pickle) memoizes the shared storage, so the copies share it, too
+    kr_copy, kr2_copy = copy.deepcopy([ kr, kr2 ])
+    nose.tools.assert_is(kr_copy._storage, kr2_copy._storage)
+    kr2_copy.set_variable(8, c)
+    nose.tools.assert_equal([ (ro.start, ro.size) for ro in kr_copy ], [ (0, 8), (8, 4) ])
+    nose.tools.assert_equal([ (ro.start, ro.size) for ro in kr2_copy ], [ (0, 8), (8, 1), (9, 3) ])
+    nose.tools.assert_equal(len(list(kr_copy)[1].internal_objects), 1)
+
+
+def test_uses_copy_on_write():
+    u = Uses()
+    u.add_use('d0', 1)
+    u2 = u.copy()
+    u2.add_use('d0', 2)
+    u.add_use('d1', 3)
+
+    nose.tools.assert_equal(u.get_uses('d0'), {1})
+    nose.tools.assert_equal(u2.get_uses('d0'), {1, 2})
+    nose.tools.assert_equal(u2.get_uses('d1'), set())
+
+    u3 = Uses()
+    u3.merge(u2)
+    u3.add_use('d0', 4)
+    nose.tools.assert_equal(u2.get_uses('d0'), {1, 2})
+    u2.remove_uses('d0')
+    nose.tools.assert_equal(u3.get_uses('d0'), {1, 2, 4})
+    nose.tools.assert_equal(u3.get_uses_by_location(1), {'d0'})
+
+
+if __name__ == '__main__':
+    test_keyed_region_copy_on_write()
+    test_keyed_region_deepcopy_shared_storage()
+    test_uses_copy_on_write()
@@ -0,0 +1,57 @@
+import json
+import subprocess
+import sys
+
+import nose
+import angr
+
+# modules that must not be imported by "import angr" alone
+LAZY_MODULES = [
+    'angr.procedures.definitions.glibc',
+    'angr.procedures.definitions.linux_kernel',
+    'angr.procedures.definitions.kernel32',
+    'angr.analyses.cfg',
+    'angr.analyses.decompiler',
+    'angr.analyses.identifier',
+    'angr.exploration_techniques.tracer',
+    'angr.exploration_techniques.symbion',
+]
+
+
+def _loaded_modules(code):
+    out = subprocess.check_output([ sys.executable, '-c', code + '\nimport sys, json\n'
+                                    'print(json.dumps(sorted(m for m in sys.modules if m.startswith("angr"))))' ])
+    return set(json.loads(out.decode().splitlines()[-1]))
+
+
+def test_lazy_imports():
+    loaded = _loaded_modules("import angr")
+    for module in LAZY_MODULES:
+        nose.tools.assert_not_in(module, loaded)
+
+    loaded = _loaded_modules("import angr\n"
+                             "angr.SIM_LIBRARIES['libc.so.6']\n"
+                             "angr.analyses.Decompiler\n"
+                             "angr.exploration_techniques.Tracer\n")
+    nose.tools.assert_in('angr.procedures.definitions.glibc', loaded)
+    nose.tools.assert_not_in('angr.procedures.definitions.kernel32', loaded)
+    nose.tools.assert_in('angr.analyses.decompiler', loaded)
+    nose.tools.assert_in('angr.exploration_techniques.tracer', loaded)
+
+
+def test_lazy_registries():
+    nose.tools.assert_in('libc.so.6', angr.SIM_LIBRARIES)
+    nose.tools.assert_not_in('libdoesnotexist.so', angr.SIM_LIBRARIES)
+    nose.tools.assert_is_none(angr.SIM_LIBRARIES.get('libdoesnotexist.so'))
+    nose.tools.assert_in('kernel32.dll', list(angr.SIM_LIBRARIES))
+
+    hub = angr.analyses.AnalysesHub._presets['default']
+    nose.tools.assert_in('Decompiler', hub.list_default_plugins())
+    nose.tools.assert_is(hub.request_plugin('CFGFast'), angr.analyses.CFGFast)
+    nose.tools.assert_is(hub.copy().request_plugin('Typehoon'), angr.analyses.Typehoon)
+    nose.tools.assert_is(angr.exploration_techniques.DFS, angr.exploration_techniques.dfs.DFS)
+
+
+if __name__ == '__main__':
+    test_lazy_imports()
+    test_lazy_registries()
@@ -12,10 +12,14 @@ from angr.storage.memory_mixins import (
     ListPagesMixin,
     PagedMemoryMixin,
 )
-from angr import SimState, SIM_PROCEDURES
+from angr import SimState, SIM_PROCEDURES, Project
 from angr import options as o
 from angr.state_plugins import SimSystemPosix, SimLightRegisters
 from angr.storage.file import SimFile
+from angr.storage.memory_mixins.paged_memory.page_backer_mixins import FileBackedRegions, MappedFile
+from angr.storage.memory_mixins.paged_memory.paged_memory_mixin import LayeredPageTable
+
+test_location = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'binaries', 'tests')
 
 class UltraPageMemory(
     DataNormalizationMixin,
@@ -494,6 +498,123 @@ def test_symbolic_write():
     for i in range(0x10, 0x20):
         assert len(s2.solver.eval_upto(s2.memory.load(i, 1), 10)) == 3
 
+def test_cow_page_table():
+    s = SimState(arch="AMD64", mode="symbolic", add_options={o.COW_PAGE_TABLE})
+    s.memory.store(0x1000, b"ABCDEFGH")
+    s.memory.store(0x2000, b"IJKLMNOP")
+
+    s1 = s.copy()
+    s2 = s.copy()
+    # copies share all page table entries, and only write into their own private layer
+    nose.tools.assert_equal(len(s1.memory._pages._top), 0)
+    nose.tools.assert_equal(len(s2.memory._pages._top), 0)
+    nose.tools.assert_is(s1.memory._pages._layers, s.memory._pages._layers)
+
+    s1.memory.store(0x1000, b"XX")
+    nose.tools.assert_equal(set(s1.memory._pages._top), { 1 })
+    nose.tools.assert_equal(len(s.memory._pages._top), 0)
+    nose.tools.assert_is_not(s1.memory._pages[1], s.memory._pages[1])
+    # untouched pages are still shared
+    nose.tools.assert_is(s1.memory._pages[2], s.memory._pages[2])
+
+    nose.tools.assert_equal(s1.solver.eval(s1.memory.load(0x1000, 8), cast_to=bytes), b"XXCDEFGH")
+    nose.tools.assert_equal(s.solver.eval(s.memory.load(0x1000, 8), cast_to=bytes), b"ABCDEFGH")
+    nose.tools.assert_equal(s2.solver.eval(s2.memory.load(0x1000, 8), cast_to=bytes), b"ABCDEFGH")
+
+    # the parent does not own its pages after a fork either
+    s.memory.store(0x2000, b"YY")
+    nose.tools.assert_equal(s.solver.eval(s.memory.load(0x2000, 8), cast_to=bytes), b"YYKLMNOP")
+    nose.tools.assert_equal(s1.solver.eval(s1.memory.load(0x2000, 8), cast_to=bytes), b"IJKLMNOP")
+    nose.tools.assert_equal(s2.solver.eval(s2.memory.load(0x2000, 8), cast_to=bytes), b"IJKLMNOP")
+
+    # pages are only copied once
+    page = s1.memory._pages[1]
+    s1.memory.store(0x1004, b"ZZ")
+    nose.tools.assert_is(s1.memory._pages[1], page)
+    nose.tools.assert_equal(s1.solver.eval(s1.memory.load(0x1000, 8), cast_to=bytes), b"XXCDZZGH")
+
+    # long chains of copies are collapsed into a single shared layer
+    state = s1
+    for i in range(LayeredPageTable.MAX_LAYERS * 2):
+        state = state.copy()
+        state.memory.store(0x3000 + i, b"Q")
+    nose.tools.assert_less_equal(len(state.memory._pages._layers), LayeredPageTable.MAX_LAYERS)
+    nose.tools.assert_equal(state.solver.eval(state.memory.load(0x1000, 8), cast_to=bytes), b"XXCDZZGH")
+    nose.tools.assert_equal(state.solver.eval(state.memory.load(0x3000, 2), cast_to=bytes), b"QQ")
+
+def test_mmap_page_backer():
+    p = Project(os.path.join(test_location, 'x86_64', 'static'), auto_load_libs=False)
+    regions = FileBackedRegions.for_loader(p.loader)
+    nose.tools.assert_greater(len(regions), 0)
+    start = regions._regions[0][0]
+    addr = (start + 0xfff) & ~0xfff
+
+    s = p.factory.blank_state(add_options={o.MMAP_PAGE_BACKER})
+    s_ref = p.factory.blank_state(remove_options={o.MMAP_PAGE_BACKER})
+
+    data = s.solver.eval(s.memory.load(addr, 0x20), cast_to=bytes)
+    nose.tools.assert_equal(data, s_ref.solver.eval(s_ref.memory.load(addr, 0x20), cast_to=bytes))
+    # the page references the file mapping instead of holding its own copy of the data
+    page = s.memory._pages[addr // 0x1000]
+    nose.tools.assert_is_instance(page.concrete_data.obj, MappedFile)
+
+    # writing materializes the page, and does not touch the shared mapping
+    s2 = s.copy()
+    s2.memory.store(addr, b"AAAA")
+    nose.tools.assert_equal(s2.solver.eval(s2.memory.load(addr, 4), cast_to=bytes), b"AAAA")
+    nose.tools.assert_equal(s.solver.eval(s.memory.load(addr, 0x20), cast_to=bytes), data)
+    nose.tools.assert_is(type(s2.memory._pages[addr // 0x1000].concrete_data), bytearray)
+
+def test_mmap_page_backer_relocated():
+    p = Project(os.path.join(test_location, 'x86_64', 'fauxware'), auto_load_libs=False)
+    nose.tools.assert_greater(len(p.loader.main_object.relocs), 0)
+    main_addr = p.loader.find_symbol('main').rebased_addr & ~0xfff
+    reloc_addr = p.loader.main_object.relocs[0].rebased_addr & ~0xfff
+    # write to the loader's memory before any page is served from the file
+    p.loader.memory.store(main_addr + 0x10, b"\xcc\xcc")
+    reloc_pages = { r.rebased_addr & ~0xfff for r in p.loader.main_object.relocs }
+    other_addr = next(a for a in range(p.loader.main_object.min_addr & ~0xfff, p.loader.main_object.max_addr, 0x1000)
+                      if a != main_addr and a not in reloc_pages
+                      and FileBackedRegions.for_loader(p.loader).find(a, 0x1000) is not None)
+
+    s = p.factory.blank_state(add_options={o.MMAP_PAGE_BACKER})
+    s_ref = p.factory.blank_state(remove_options={o.MMAP_PAGE_BACKER})
+    for addr in (main_addr, reloc_addr, other_addr):
+        nose.tools.assert_equal(s.solver.eval(s.memory.load(addr, 0x1000), cast_to=bytes),
+                                s_ref.solver.eval(s_ref.memory.load(addr, 0x1000), cast_to=bytes))
+
+    # pages that differ from the file go through the regular backers, and the rest are still mapped
+    for addr in (main_addr, reloc_addr):
+        nose.tools.assert_not_is_instance(getattr(s.memory._pages[addr // 0x1000].concrete_data, 'obj', None),
+                                          MappedFile)
+    nose.tools.assert_is_instance(s.memory._pages[other_addr // 0x1000].concrete_data.obj, MappedFile)
+
+def test_changed_bytes_digest():
+    s = SimState(arch="AMD64", mode="symbolic")
+    s.memory.store(0x1000, b"A" * 0x1000)
+    s.memory.store(0x3000, b"B" * 0x10)
+
+    s2 = s.copy()
+    # copies start out with identical digests, so nothing has to be compared
+    nose.tools.assert_equal(s.memory._pages[1].content_digest, s2.memory._pages[1].content_digest)
+    nose.tools.assert_equal(s.memory.changed_bytes(s2.memory), set())
+    nose.tools.assert_equal(s.memory.changed_pages(s2.memory), set())
+
+    s2.memory.store(0x1010, b"AAXA")
+    nose.tools.assert_not_equal(s.memory._pages[1].content_digest, s2.memory._pages[1].content_digest)
+    nose.tools.assert_equal(s.memory.changed_bytes(s2.memory), {0x1012})
+    nose.tools.assert_equal(s.memory.changed_pages(s2.memory), {1})
+
+    s2.memory.store(0x3004, s2.solver.BVS('x', 8))
+    nose.tools.assert_equal(s.memory.changed_pages(s2.memory), {1, 3})
+
+    # filling in default values on a load modifies the page in place as well
+    page = s.memory._pages[3]
+    page_copy = page.copy({})
+    nose.tools.assert_equal(page.content_digest, page_copy.content_digest)
+    page_copy.load(0x20, size=4, page_addr=0x3000, endness='Iend_BE', memory=s.memory)
+    nose.tools.assert_not_equal(page.content_digest, page_copy.content_digest)
+
 def test_concrete_memset():
     def _individual_test(state, base, val, size):
         # time it
@@ -769,9 +890,26 @@ def test_concrete_load():
         assert data_bytes == b"b\x00\x00b"
         assert bitmap.tobytes() == b"\x00\x01\x01\x00"
 
+def test_concrete_load_multipage_bitmap():
+    for memcls in [UltraPageMemory, ListPageMemory]:
+        state = SimState(arch='AMD64', mode='symbolic', plugins={'memory': memcls()})
+        state.memory.store(0x20ff8, b"aaaabbbbccccdddd")
+        state.memory.store(0x21002, claripy.BVS("flag", 8))
+
+        data, bitmap = state.memory.concrete_load(0x20ffc, 12, with_bitmap=True)
+        data_bytes = bytes(d if b == 0 else 0 for d, b in zip(data, bitmap))
+        assert data_bytes == b"bbbbcc\x00cdddd"
+        assert bitmap.tobytes() == b"\x00" * 6 + b"\x01" + b"\x00" * 5
+
+        # without the bitmap, loading stops at the first symbolic byte
+        data = state.memory.concrete_load(0x20ffc, 12)
+        assert bytes(data) == b"bbbbcc"
+
+
 if __name__ == '__main__':
     test_address_wrap()
     test_concrete_load()
+    test_concrete_load_multipage_bitmap()
     test_crosspage_store()
     test_crosspage_read()
     test_fast_memory()
@@ -785,6 +923,10 @@ if __name__ == '__main__':
     test_abstract_memory_find()
     test_registers()
     test_concrete_memset()
+    test_cow_page_table()
+    test_changed_bytes_digest()
+    test_mmap_page_backer()
+    test_mmap_page_backer_relocated()
     test_underconstrained()
     test_hex_dump()
     test_concrete_load_non_adjacent_pages()
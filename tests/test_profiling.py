@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+
+import nose
+import angr
+from angr.misc import profiling
+
+location = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'binaries', 'tests')
+
+
+def test_profiler():
+    p = angr.Project(os.path.join(location, 'x86_64', 'fauxware'), auto_load_libs=False)
+    simgr = p.factory.simulation_manager(p.factory.entry_state())
+
+    with profiling.Profiler() as prof:
+        simgr.run(n=10)
+        profiling.count('test.counter', 3)
+
+    nose.tools.assert_is_none(profiling.active_profiler())
+    nose.tools.assert_false(profiling._installed)
+
+    nose.tools.assert_in('engine', prof.subsystems)
+    nose.tools.assert_in('vex', prof.subsystems)
+    nose.tools.assert_greater(len(prof.blocks), 0)
+    nose.tools.assert_equal(prof.counters['test.counter'], 3)
+    engine_calls, engine_total, _ = prof.subsystems['engine']
+    nose.tools.assert_equal(engine_calls, sum(steps for steps, _, _ in prof.blocks.values()))
+    nose.tools.assert_less_equal(engine_total, prof.wall_time)
+
+    report = json.loads(json.dumps(prof.report(max_blocks=5)))
+    nose.tools.assert_less_equal(len(report['blocks']), 5)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'angr.folded')
+        prof.dump_flamegraph(path)
+        with open(path) as f:
+            lines = f.read().splitlines()
+        nose.tools.assert_true(any(line.startswith('engine;vex ') for line in lines))
+
+    # nothing is recorded once the profiler is gone
+    simgr.step()
+    nose.tools.assert_equal(engine_calls, prof.subsystems['engine'][0])
+
+
+def test_profile_steps_option():
+    p = angr.Project(os.path.join(location, 'x86_64', 'fauxware'), auto_load_libs=False)
+    state = p.factory.entry_state(add_options={angr.options.PROFILE_STEPS})
+    profiling.default_profiler.clear()
+
+    simgr = p.factory.simulation_manager(state)
+    simgr.run(n=5)
+
+    nose.tools.assert_is_none(profiling.active_profiler())
+    nose.tools.assert_greater_equal(profiling.default_profiler.subsystems['engine'][0], 5)
+    # the instrumentation is installed once, and stays installed until it is removed
+    nose.tools.assert_true(profiling._installed)
+    profiling.uninstall()
+    nose.tools.assert_false(profiling._installed)
+
+
+if __name__ == '__main__':
+    test_profiler()
+    test_profile_steps_option()
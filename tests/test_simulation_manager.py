@@ -1,3 +1,6 @@
+import gc
+import weakref
+
 import nose
 import angr
 
@@ -121,7 +124,45 @@ def test_explore_with_cfg():
     nose.tools.assert_equal(pg.found[1].addr, 0x4006ED)
     nose.tools.assert_equal(pg.avoid[0].addr, 0x4007C9)
 
+def test_step_parallel():
+    p = angr.Project(os.path.join(location, 'x86_64', 'fauxware'), load_options={'auto_load_libs': False})
+
+    serial = p.factory.simulation_manager()
+    serial.run(n=40)
+    parallel = p.factory.simulation_manager()
+    parallel.run(n=40, parallel=2)
+
+    nose.tools.assert_equal(sorted(s.addr for s in parallel.active), sorted(s.addr for s in serial.active))
+    nose.tools.assert_equal(sorted(s.addr for s in parallel.deadended), sorted(s.addr for s in serial.deadended))
+    nose.tools.assert_equal(len(parallel.errored), len(serial.errored))
+
+    # successors are attached to the history of the states they were stepped from
+    for state in parallel.active:
+        nose.tools.assert_equal(state.history.bbl_addrs.hardcopy[0], p.entry)
+        nose.tools.assert_equal(len(list(state.history.parents)), state.history.depth)
+
+    angr.misc.stepping_pool.SteppingPool.shutdown(p)
+
+def test_step_parallel_project_collected():
+    p = angr.Project(os.path.join(location, 'x86_64', 'fauxware'), load_options={'auto_load_libs': False})
+    simgr = p.factory.simulation_manager()
+    simgr.run(n=5, parallel=2)
+
+    workers = list(angr.misc.stepping_pool.SteppingPool.get(p, 2)._pool._pool)
+    nose.tools.assert_true(all(w.is_alive() for w in workers))
+
+    # the stepping pool does not keep its project alive, and its workers are terminated with the project
+    project_ref = weakref.ref(p)
+    del p, simgr
+    gc.collect()
+    nose.tools.assert_is_none(project_ref())
+    nose.tools.assert_false(any(w.is_alive() for w in workers))
+
 if __name__ == "__main__":
+    print('step_parallel')
+    test_step_parallel()
+    print('step_parallel_project_collected')
+    test_step_parallel_project_collected()
     logging.getLogger('angr.sim_manager').setLevel('DEBUG')
     print('explore_with_cfg')
     test_explore_with_cfg()
@@ -63,8 +63,41 @@ def test_palindrome2():
         for state in pg.cut
     )
 
+@nose.with_setup(setup, teardown)
+def test_work_stealing():
+    from angr.distributed.work_stealing import WorkStealingPool, WorkStealingStates
+
+    project = angr.Project(_bin('tests', 'cgc', 'sc2_0b32aa01_01'))
+    pool = WorkStealingPool(2)
+    states_0 = WorkStealingStates(pool, 0, project, batch_size=2)
+    states_1 = WorkStealingStates(pool, 1, project, batch_size=2)
+
+    spiller = angr.exploration_techniques.Spiller(
+        pickle_callback=pickle_callback, unpickle_callback=unpickle_callback,
+        vault=states_0, states_collection=states_0,
+    )
+    state = project.factory.entry_state()
+    spiller._pickle([ state.copy() for _ in range(4) ])
+    nose.tools.assert_equal(pool.size(), 4)
+
+    # worker 1 has nothing of its own, so it steals half of worker 0's states
+    popped = states_1.pop_n(1)
+    nose.tools.assert_equal(len(popped), 1)
+    nose.tools.assert_equal(pool.stats()['stolen'], 2)
+    stolen = states_1.load(popped[0][1])
+    # the project is not serialized with the state
+    nose.tools.assert_is(stolen.project, project)
+    nose.tools.assert_true(stolen.globals['pickled'])
+    nose.tools.assert_equal(stolen.addr, state.addr)
+
+    # worker 0 drains its own queue first, then steals back what worker 1 left behind
+    nose.tools.assert_equal(len(spiller._unpickle(4)), 2)
+    nose.tools.assert_equal(len(spiller._unpickle(4)), 1)
+    nose.tools.assert_equal(pool.size(), 0)
+
 if __name__ == '__main__':
     setup()
     test_basic()
     test_palindrome2()
+    test_work_stealing()
     teardown()
@@ -1,6 +1,7 @@
 
 import logging
 import os
+import networkx
 import nose
 
 import angr
@@ -38,8 +39,24 @@ def test_stack_pointer_tracker_just_sp():
     sp_result = run_tracker(track_mem=False, use_bp=False)
     nose.tools.assert_equal(sp_result, None)
 
+def test_stack_pointer_tracker_loop():
+    # input states at loop heads are merged, so the analysis terminates and keeps tracking memory
+    p = angr.Project(os.path.join(test_location, 'x86_64', 'loop'), auto_load_libs=False)
+    p.analyses.CFGFast()
+    main = p.kb.functions['main']
+    nose.tools.assert_true(list(networkx.simple_cycles(main.graph)))
+
+    sp, bp = p.arch.sp_offset, p.arch.bp_offset
+    sptracker = p.analyses.StackPointerTracker(main, {sp, bp}, track_memory=True)
+    nose.tools.assert_true(main.ret_sites)
+    for ret_site in main.ret_sites:
+        ret_addr = p.factory.block(ret_site.addr, size=ret_site.size).instruction_addrs[-1]
+        nose.tools.assert_equal(sptracker.offset_after(ret_addr, sp), 8)
+        nose.tools.assert_equal(sptracker.offset_after(ret_addr, bp), 0)
+
 if __name__ == '__main__':
     logging.getLogger('angr.analyses.stack_pointer_tracker').setLevel(logging.INFO)
     test_stack_pointer_tracker()
     test_stack_pointer_tracker_no_mem()
     test_stack_pointer_tracker_just_sp()
+    test_stack_pointer_tracker_loop()
@@ -248,6 +248,91 @@ def test_global_condition():
         nose.tools.assert_sequence_equal(s.solver.eval_upto(s.regs.rax, 10), [ 25 ])
 
 
+def test_solver_query_cache():
+    from angr.state_plugins.solver import query_cache
+    query_cache.clear()
+
+    s = SimState(arch="AMD64", add_options={angr.options.SOLVER_QUERY_CACHE})
+    x = s.solver.BVS('x', 32)
+    s.add_constraints(x > 10, x < 20)
+
+    s1 = s.copy()
+    s2 = s.copy()
+    nose.tools.assert_equal(s1.solver.max(x), 19)
+    misses = query_cache.misses
+    # the sibling state asks the same question about the same constraints
+    nose.tools.assert_equal(s2.solver.max(x), 19)
+    nose.tools.assert_equal(query_cache.misses, misses)
+    nose.tools.assert_greater(query_cache.hits, 0)
+
+    # different constraints are different queries
+    s2.add_constraints(x < 15)
+    nose.tools.assert_equal(s2.solver.max(x), 14)
+    nose.tools.assert_equal(s1.solver.max(x), 19)
+    nose.tools.assert_equal(s1.solver.min(x), 11)
+    nose.tools.assert_false(s2.solver.satisfiable(extra_constraints=(x == 16,)))
+    nose.tools.assert_true(s1.solver.satisfiable(extra_constraints=(x == 16,)))
+    nose.tools.assert_equal(sorted(s2.solver.eval_upto(x, 10)), list(range(11, 15)))
+
+def test_constraint_independence():
+    s = SimState(arch="AMD64", add_options={angr.options.CONSTRAINT_INDEPENDENCE},
+                 remove_options={angr.options.COMPOSITE_SOLVER})
+    x = s.solver.BVS('x', 32)
+    y = s.solver.BVS('y', 32)
+    z = s.solver.BVS('z', 32)
+    s.add_constraints(x > 10, x < 20, y == z + 1, z < 5)
+
+    nose.tools.assert_equal(s.solver.max(x), 19)
+    nose.tools.assert_equal(s.solver.max(y), 5)
+    nose.tools.assert_true(s.solver.solution(x, 15))
+    nose.tools.assert_false(s.solver.solution(x, 25))
+    nose.tools.assert_true(s.solver.satisfiable())
+    nose.tools.assert_false(s.solver.satisfiable(extra_constraints=(y == 0,)))
+    nose.tools.assert_equal(sorted(len(comp.constraints) for comp in s.solver._partition.components), [2, 2])
+
+    # copies extend the partition of their parent incrementally, without affecting it
+    s2 = s.copy()
+    s2.add_constraints(x == y + 12)
+    nose.tools.assert_equal(s2.solver.max(x), 17)
+    nose.tools.assert_equal([ len(comp.constraints) for comp in s2.solver._partition.components ], [5])
+    nose.tools.assert_equal(s.solver.max(x), 19)
+    nose.tools.assert_equal(sorted(len(comp.constraints) for comp in s.solver._partition.components), [2, 2])
+
+    # an unsatisfiable component makes every query unsatisfiable, even if it is unrelated
+    s.add_constraints(z > 10)
+    nose.tools.assert_false(s.solver.satisfiable())
+    nose.tools.assert_false(s.solver.satisfiable(extra_constraints=(x == 15,)))
+
+def test_history_flattened_logs():
+    s = SimState(arch="AMD64")
+    hist = s.history
+    expected = [ ]
+    for i in range(200):
+        hist = hist.make_child()
+        hist.add_bbl_addr(0x400000 + i)
+        hist.add_bbl_addr(0x500000 + i)
+        expected += [ 0x400000 + i, 0x500000 + i ]
+
+    nose.tools.assert_equal(hist.recent_bbl_addrs.typecode, 'Q')
+    nose.tools.assert_equal(list(hist.bbl_addrs.flattened()), expected)
+    nose.tools.assert_equal(hist.bbl_addrs.hardcopy, expected)
+    nose.tools.assert_equal(hist.bbl_addrs.count(0x400010), 1)
+    # chunk boundaries cache their flattened logs
+    nose.tools.assert_true(any(h._flat_logs for h in hist.lineage))
+    # ... of their own chunk only
+    nose.tools.assert_true(all(len(h._flat_logs['recent_bbl_addrs'][0]) <= 2 * hist.FLATTEN_CHUNK_SIZE
+                               for h in hist.lineage if h._flat_logs))
+    # the cache is not affected by children that are created later
+    child = hist.make_child()
+    child.add_bbl_addr(0x600000)
+    nose.tools.assert_equal(list(child.bbl_addrs.flattened()), expected + [ 0x600000 ])
+    nose.tools.assert_equal(list(hist.bbl_addrs.flattened()), expected)
+
+    # addresses that do not fit in the array switch the log to a list
+    child.add_bbl_addr(-1)
+    nose.tools.assert_is_instance(child.recent_bbl_addrs, list)
+    nose.tools.assert_equal(child.bbl_addrs.hardcopy, expected + [ 0x600000, -1 ])
+
 def test_successors_catch_arbitrary_interrupts():
 
     # int 0xd2 should fail on x86/amd64 since it's an unsupported interrupt
@@ -308,5 +393,8 @@ if __name__ == '__main__':
     test_state_merge_static()
     test_state_pickle()
     test_global_condition()
+    test_solver_query_cache()
+    test_constraint_independence()
+    test_history_flattened_logs()
     test_successors_catch_arbitrary_interrupts()
     test_bypass_errored_irstmt()
@@ -6,6 +6,7 @@ from angr import options as so
 from nose.plugins.attrib import attr
 import gc
 import os
+from array import array
 
 test_location = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
 
@@ -128,6 +129,21 @@ def test_fauxware():
         b'Username: \nPassword: \nWelcome to the admin console, trusted user!\n'
     )))
 
+def test_context_snapshot():
+    from angr.state_plugins.unicorn_engine import _uc_pool
+    p = angr.Project(os.path.join(test_location, 'binaries', 'tests', 'i386', 'fauxware'))
+    s_unicorn = p.factory.entry_state(add_options=so.unicorn)
+    pg = p.factory.simulation_manager(s_unicorn)
+    pg.explore()
+    nose.tools.assert_equal(len(pg.deadended), 3)
+
+    # read-only pages stay mapped across runs, but only for states that have the same pages
+    uc = _uc_pool().contexts[-1]
+    nose.tools.assert_true(uc.snapshot)
+    nose.tools.assert_greater(uc.restore(pg.deadended[0].memory), 0)
+    nose.tools.assert_equal(uc.restore(p.factory.entry_state(add_options=so.unicorn).memory), 0)
+    nose.tools.assert_false(uc.snapshot)
+
 def test_fauxware_aggressive():
     p = angr.Project(os.path.join(test_location, 'binaries', 'tests', 'i386', 'fauxware'))
     s_unicorn = p.factory.entry_state(
@@ -324,6 +340,19 @@ def test_single_step():
     nose.tools.assert_equal(len(successors2), 1)
     nose.tools.assert_equal(successors2[0].addr, step5)
 
+def test_trace_state_copy():
+    p = angr.Project(os.path.join(test_location, 'binaries', 'tests', 'i386', 'fauxware'))
+    s = p.factory.entry_state(add_options=so.unicorn)
+    s.unicorn.follow_trace(array('Q', [ s.addr ]), 0, 0)
+    s.unicorn.trace_idx = 1
+    s.unicorn.trace_blocks = 1
+
+    # the progress along the trace is copied along with the trace itself
+    s2 = s.copy()
+    nose.tools.assert_equal(s2.unicorn.trace_start_idx, 0)
+    nose.tools.assert_equal(s2.unicorn.trace_idx, 1)
+    nose.tools.assert_equal(s2.unicorn.trace_blocks, 1)
+
 if __name__ == '__main__':
     import logging
     logging.getLogger('angr.state_plugins.unicorn_engine').setLevel('DEBUG')
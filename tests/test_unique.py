@@ -31,11 +31,52 @@ def run_unique(binary, arch):
     input_found = simgr.active[0].posix.dumps(0)
     nose.tools.assert_true(criteria[binary](input_found))
 
+def _state_with_blocks(*runs):
+    state = angr.SimState(arch='AMD64')
+    hist = state.history
+    for run in runs:
+        hist = hist.make_child()
+        for addr in run:
+            hist.add_bbl_addr(addr)
+    state.register_plugin('history', hist)
+    return state
+
+def test_similarity_vectors():
+    from collections import Counter
+    from angr.exploration_techniques.unique import BlockCountVector
+
+    a = _state_with_blocks([0x1000, 0x1010], [0x1000, 0x1020])
+    b = _state_with_blocks([0x1000, 0x1010], [0x1030])
+    c = _state_with_blocks([0x1000, 0x1010], [0x1000, 0x1020])
+
+    # the sparse vectors agree with a dense computation over the whole history
+    count_a = Counter(a.history.bbl_addrs)
+    count_b = Counter(b.history.bbl_addrs)
+    dist = sum((count_a[k] - count_b[k]) ** 2 for k in set(count_a) | set(count_b)) ** 0.5
+    nose.tools.assert_almost_equal(angr.exploration_techniques.UniqueSearch.similarity(a, b), 1.0 / (1 + dist))
+    nose.tools.assert_equal(BlockCountVector.of(a.history).counts, count_a)
+
+    # vectors of children are built from the cached vector of their parent
+    child = a.history.make_child()
+    child.add_bbl_addr(0x1040)
+    nose.tools.assert_equal(BlockCountVector.of(child).counts, count_a + Counter([0x1040]))
+    # ... by copying only their differences from a shared base
+    nose.tools.assert_is(BlockCountVector.of(child).base, BlockCountVector.of(a.history).base)
+    nose.tools.assert_equal(BlockCountVector.of(child).dot(BlockCountVector.of(a.history)),
+                            sum(v * count_a[k] for k, v in (count_a + Counter([0x1040])).items()))
+
+    nose.tools.assert_equal(angr.exploration_techniques.UniqueSearch.similarity(a, c), 1.0)
+    nose.tools.assert_almost_equal(angr.exploration_techniques.UniqueSearch.cosine_similarity(a, c), 1.0)
+    nose.tools.assert_less(angr.exploration_techniques.UniqueSearch.cosine_similarity(a, b), 1.0)
+    nose.tools.assert_equal(angr.exploration_techniques.UniqueSearch.minhash_similarity(a, c), 1.0)
+    nose.tools.assert_less(angr.exploration_techniques.UniqueSearch.minhash_similarity(a, b), 1.0)
+
 def test_unique():
     for binary in find:
         for arch in find[binary]:
             yield run_unique, binary, arch
 
 if __name__ == "__main__":
+    test_similarity_vectors()
     for test_func, test_binary, test_arch in test_unique():
         test_func(test_binary, test_arch)
@@ -133,6 +133,65 @@ def test_project():
 	assert sum(1 for k in v.keys() if k.startswith('Project')) == 1
 
 
+def test_page_dedup():
+	v = angr.vaults.VaultDict()
+	s = angr.SimState(arch="AMD64")
+	for i in range(8):
+		s.memory.store(0x10000 + i * 0x1000, b"A" * 0x10)
+
+	s1 = s.copy()
+	s2 = s.copy()
+	s2.memory.store(0x10000, b"BBBB")
+
+	sid1 = v.store(s1)
+	pages = sum(1 for k in v.keys() if k.startswith('UltraPage'))
+	assert pages >= 8
+	sid2 = v.store(s2)
+	# only the page that s2 has modified is stored again
+	assert sum(1 for k in v.keys() if k.startswith('UltraPage')) == pages + 1
+
+	del s1, s2
+	import gc
+	gc.collect()
+	ss1 = v.load(sid1)
+	ss2 = v.load(sid2)
+	assert ss1.solver.eval(ss1.memory.load(0x10000, 4), cast_to=bytes) == b"AAAA"
+	assert ss2.solver.eval(ss2.memory.load(0x10000, 4), cast_to=bytes) == b"BBBB"
+	# loaded pages are not shared between states
+	ss1.memory.store(0x11000, b"CCCC")
+	assert ss2.solver.eval(ss2.memory.load(0x11000, 4), cast_to=bytes) == b"AAAA"
+
+def test_page_dedup_content():
+	v = angr.vaults.VaultDict()
+	s = angr.SimState(arch="AMD64")
+	s.memory.store(0x10000, b"A" * 0x10)
+	v.store(s.copy())
+	pages = sum(1 for k in v.keys() if k.startswith('UltraPage'))
+
+	# pages are keyed on their contents, so changes that did not replace the digest are stored, too
+	page = s.memory._pages[0x10]
+	page.concrete_data[0] = ord('Z')
+	sid = v.store(s.copy())
+	assert sum(1 for k in v.keys() if k.startswith('UltraPage')) == pages + 1
+	ss = v.load(sid)
+	assert ss.solver.eval(ss.memory.load(0x10000, 2), cast_to=bytes) == b"ZA"
+
+def test_history_dedup():
+	v = angr.vaults.VaultDict()
+	h = angr.state_plugins.SimStateHistory()
+	for _ in range(200):
+		h = angr.state_plugins.SimStateHistory(parent=h)
+	hid = v.store(h)
+
+	# every node only refers to its parent, so the size of a node does not depend on its depth
+	sizes = [ len(v._dict[k]) for k in v.keys() if k.startswith('SimStateHistory') ]
+	assert len(sizes) == 201
+	assert max(sizes) < 2 * min(sizes)
+
+	hh = v.load(hid)
+	assert hh.depth == 200
+	assert sum(1 for _ in hh.parents) == 200
+
 
 if __name__ == '__main__':
 	for _a,_b in test_vault():
@@ -140,3 +199,6 @@ if __name__ == '__main__':
 	for _a,_b in test_ast_vault():
 		_a(_b)
 	test_project()
+	test_page_dedup()
+	test_page_dedup_content()
+	test_history_dedup()